@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Rebuild the study streak columns on profiles from quiz_attempts and study_sessions.
+
+Runs as one streaming pass: both activity tables are read in
+(user_id, completed_at) order and merged, then joined against profiles in
+id order. Each user's activity is folded day by day with the same
+services.streaks.advance used for live updates. Memory holds one page per
+table and one batch of pending profile writes, however large the history is.
+
+Usage:
+    python backfill_streaks.py [--dry-run]
+
+Needs SUPABASE_SERVICE_ROLE_KEY: with the anon key, row level security hides
+other users' rows.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+from database import SupabaseDatabase
+from services.streaks import StreakState, advance, local_day
+
+# Profiles written per upsert
+WRITE_BATCH = 500
+
+Event = Tuple[str, datetime]
+
+async def _events(db: SupabaseDatabase, table: str) -> AsyncIterator[Event]:
+    async for page in db.iter_all_activity(table):
+        for row in page:
+            yield row["user_id"], datetime.fromisoformat(row["completed_at"])
+
+async def _merge(left: AsyncIterator[Event], right: AsyncIterator[Event]) -> AsyncIterator[Event]:
+    """Merge two (user_id, completed_at)-ordered streams into one"""
+    a = await anext(left, None)
+    b = await anext(right, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a <= b):
+            yield a
+            a = await anext(left, None)
+        else:
+            yield b
+            b = await anext(right, None)
+
+async def backfill(db: SupabaseDatabase, dry_run: bool = False) -> Dict[str, int]:
+    events = _merge(_events(db, "quiz_attempts"), _events(db, "study_sessions"))
+    event: Optional[Event] = await anext(events, None)
+    stats = {"profiles": 0, "events": 0, "with_streak": 0}
+    batch = []
+
+    async for page in db.iter_all_profiles():
+        for profile in page:
+            # Skip activity of users without a profile
+            while event is not None and event[0] < profile["id"]:
+                event = await anext(events, None)
+
+            state = StreakState(None, 0, 0)
+            while event is not None and event[0] == profile["id"]:
+                state = advance(state, local_day(event[1], profile.get("timezone")))
+                stats["events"] += 1
+                event = await anext(events, None)
+
+            stats["profiles"] += 1
+            stats["with_streak"] += 1 if state.last_day else 0
+            batch.append({"id": profile["id"], "email": profile["email"], **state.to_row()})
+            if len(batch) >= WRITE_BATCH:
+                if not dry_run:
+                    await db.save_streaks(batch)
+                batch = []
+
+    if batch and not dry_run:
+        await db.save_streaks(batch)
+    return stats
+
+def main():
+    load_dotenv()
+    from supabase import create_client
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        sys.exit("SUPABASE_SERVICE_ROLE_KEY is required to read every user's history")
+    db = SupabaseDatabase(create_client(os.getenv("SUPABASE_URL"), key))
+    stats = asyncio.run(backfill(db, dry_run="--dry-run" in sys.argv))
+    print(f"{'Would update' if '--dry-run' in sys.argv else 'Updated'} {stats['profiles']} profiles "
+          f"({stats['with_streak']} with activity) from {stats['events']} events")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Rebuild study_daily_rollups from study_sessions.
+
+Live writes keep the rollups current with an atomic increment per session;
+this job recomputes settled days from the sessions themselves, so an
+increment that failed or ran twice is corrected. Run it periodically
+(e.g. nightly from cron), or once with --all to build rollups for
+existing history.
+
+Only local days that are over in every timezone are rebuilt (up to two
+days before today in UTC), so the job never races live increments.
+It streams sessions in (user_id, completed_at) order and holds one user's
+buckets at a time.
+
+Usage:
+    python compact_rollups.py [--days N | --all] [--dry-run]    (default --days 7)
+
+Needs SUPABASE_SERVICE_ROLE_KEY: with the anon key, row level security hides
+other users' rows.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+from database import SupabaseDatabase
+from services.rollups import DayTotals
+from services.streaks import local_day
+
+# Rollup rows written per upsert
+WRITE_BATCH = 500
+
+async def _timezones(db: SupabaseDatabase):
+    async for page in db.iter_all_profiles():
+        for profile in page:
+            yield profile["id"], profile.get("timezone")
+
+async def compact(db: SupabaseDatabase, days: Optional[int], dry_run: bool = False) -> Dict[str, int]:
+    today = datetime.now(timezone.utc).date()
+    last_day = today - timedelta(days=2)
+    first_day = last_day - timedelta(days=days - 1) if days else None
+    # Pad the UTC window by a day on each side to cover every timezone's view of the range
+    since = datetime.combine(first_day - timedelta(days=1), datetime.min.time(), timezone.utc) if first_day else None
+    until = datetime.combine(last_day + timedelta(days=2), datetime.min.time(), timezone.utc)
+
+    profiles = _timezones(db)
+    profile: Optional[Tuple[str, Optional[str]]] = await anext(profiles, None)
+    stats = {"sessions": 0, "rows": 0}
+    batch = []
+    user_id = None
+    buckets: Dict[Tuple[date, str], DayTotals] = {}
+
+    async def flush_user():
+        nonlocal batch
+        for (day, subject), totals in buckets.items():
+            batch.append(totals.to_row(user_id, day, subject))
+        stats["rows"] += len(buckets)
+        buckets.clear()
+        if len(batch) >= WRITE_BATCH:
+            if not dry_run:
+                await db.save_rollups(batch)
+            batch = []
+
+    async for page in db.iter_all_activity("study_sessions", "subject, duration, score", since, until):
+        for session in page:
+            if session["user_id"] != user_id:
+                await flush_user()
+                user_id = session["user_id"]
+                while profile is not None and profile[0] < user_id:
+                    profile = await anext(profiles, None)
+            tz_name = profile[1] if profile is not None and profile[0] == user_id else None
+            day = local_day(datetime.fromisoformat(session["completed_at"]), tz_name)
+            if day > last_day or (first_day and day < first_day):
+                continue
+            buckets.setdefault((day, session["subject"]), DayTotals()).add(session["duration"], session["score"])
+            stats["sessions"] += 1
+
+    await flush_user()
+    if batch and not dry_run:
+        await db.save_rollups(batch)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild study_daily_rollups from study_sessions")
+    parser.add_argument("--days", type=int, default=7, help="settled days to rebuild (default 7)")
+    parser.add_argument("--all", action="store_true", help="rebuild every day in the history")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    load_dotenv()
+    from supabase import create_client
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        sys.exit("SUPABASE_SERVICE_ROLE_KEY is required to read every user's sessions")
+    db = SupabaseDatabase(create_client(os.getenv("SUPABASE_URL"), key))
+    stats = asyncio.run(compact(db, None if args.all else args.days, args.dry_run))
+    print(f"{'Would write' if args.dry_run else 'Wrote'} {stats['rows']} rollup rows from {stats['sessions']} sessions")
+
+if __name__ == "__main__":
+    main()
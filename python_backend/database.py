@@ -1,13 +1,85 @@
-from supabase import Client
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple, TYPE_CHECKING
 from models import *
 import json
-from datetime import datetime
+import asyncio
+import logging
+import os
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from services.answer_keys import AnswerKey, answer_keys, attempt_score
+from services.short_answer import profile as answer_profile
+from services.circuit_breaker import supabase_breaker, db_last_good, serve_stale
+from services.mastery import MasteryModel, Outcome, flashcard_item, mastery_models, question_item, rating_outcome
+from services.collection_versions import collection_versions, QUIZZES, QUIZ_ATTEMPTS, FLASHCARDS, STUDY_GUIDES, MASTERY
+from services.question_dedup import question_indexes, QuestionIndex
+from services.search_index import search_index
+from services.shared_cache import cache_key, shared_cache
+from services.singleflight import db_flight, coalesce
+from services.rollups import activity_series
+from services.streaks import StreakState, advance, local_day, streak_days
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per page when streaming a user's history
+EXPORT_PAGE_SIZE = 1000
+# Players whose stats are updated concurrently after a live room finishes
+LIVE_FOLLOW_UP_BATCH = 20
+# Times a mastery update is reapplied when another request saved the model first
+MASTERY_SAVE_ATTEMPTS = 3
+# Seconds a cached read is trusted. Writes through this class invalidate
+# cached reads at once; the TTL bounds staleness after writes made elsewhere.
+READ_CACHE_TTL = float(os.getenv("DB_READ_CACHE_TTL", 300))
 
 class SupabaseDatabase:
-    def __init__(self, supabase_client: Client):
+    def __init__(self, supabase_client: "Client"):
         self.client = supabase_client
     
+    @staticmethod
+    async def _execute(query):
+        """Run a blocking Supabase query in a worker thread so the event loop stays free.
+
+        Goes through the Supabase circuit breaker, so while it is open this
+        raises CircuitOpenError without touching the network; reads marked
+        with serve_stale answer from their last good result instead.
+        """
+        return await supabase_breaker.call(lambda: asyncio.to_thread(query.execute))
+    
+    # Shared read cache. Rows are cached as returned by PostgREST, keyed by
+    # the query and a generation counter that every worker on the host sees,
+    # so a write in one worker invalidates the other workers' cached reads.
+    # A None key (the generation couldn't be read) skips the cache.
+    async def _cached_rows(self, key: Optional[str], query) -> List[Dict[str, Any]]:
+        rows = shared_cache.get_json(key) if key is not None else None
+        if rows is None:
+            rows = (await self._execute(query)).data
+            if key is not None:
+                shared_cache.set_json(key, rows, READ_CACHE_TTL)
+        return rows
+    
+    @staticmethod
+    def _versioned_key(name: str, *parts: Any) -> Optional[str]:
+        generation = shared_cache.generation(name)
+        return cache_key("rows", name, generation, *parts) if generation is not None else None
+    
+    @staticmethod
+    def _collection_key(user_id: str, collection: str, *parts: Any) -> Optional[str]:
+        version = collection_versions.get(user_id, collection)
+        return cache_key("rows", collection, user_id, version, *parts) if version is not None else None
+    
+    # Row conversion (rows were validated on the way in, so skip re-validation)
+    @staticmethod
+    def _quiz_from_row(quiz_data: Dict[str, Any]) -> Quiz:
+        quiz_data["questions"] = [QuizQuestion.from_row(q) for q in quiz_data["questions"]]
+        return Quiz.from_row(quiz_data)
+    
+    @staticmethod
+    def _attempt_from_row(attempt_data: Dict[str, Any]) -> QuizAttempt:
+        attempt_data["answers"] = [QuizAnswer.from_row(a) for a in attempt_data["answers"]]
+        return QuizAttempt.from_row(attempt_data)
+    
     # User operations
     async def create_user_profile(self, user_id: str, email: str, full_name: Optional[str] = None):
         """Create user profile in profiles table"""
@@ -20,14 +92,14 @@ class SupabaseDatabase:
             "study_streak": 0,
             "total_study_time": 0.0
         }
-        result = self.client.table("profiles").insert(data).execute()
+        result = await self._execute(self.client.table("profiles").insert(data))
         return result.data[0] if result.data else None
     
     async def get_user_profile(self, user_id: str) -> Optional[UserProfile]:
         """Get user profile by ID"""
-        result = self.client.table("profiles").select("*").eq("id", user_id).execute()
+        result = await self._execute(self.client.table("profiles").select("*").eq("id", user_id))
         if result.data:
-            return UserProfile(**result.data[0])
+            return UserProfile.from_row(result.data[0])
         return None
     
     async def update_user_stats(self, user_id: str, quiz_score: float, time_taken: int):
@@ -44,40 +116,230 @@ class SupabaseDatabase:
                 "total_study_time": round(new_study_time, 2)
             }
             
-            self.client.table("profiles").update(update_data).eq("id", user_id).execute()
+            await self._execute(self.client.table("profiles").update(update_data).eq("id", user_id))
+    
+    async def record_activity_day(self, user_id: str, when: Optional[datetime] = None) -> date:
+        """Count a day of study activity towards the user's streak.
+
+        Constant work per event: repeat activity on a day this worker has
+        already counted does nothing, otherwise it is one profile read and
+        at most one update. Failures are logged rather than raised, since
+        the activity itself has already been saved. Returns the activity's
+        day in the user's timezone (UTC if it couldn't be looked up).
+        """
+        when = when or datetime.now(timezone.utc)
+        known = streak_days.get(user_id)
+        if known and known[1] == local_day(when, known[0]):
+            return known[1]
+        try:
+            result = await self._execute(
+                self.client.table("profiles").select("timezone, study_streak, longest_streak, streak_last_day").eq("id", user_id)
+            )
+            if not result.data:
+                return local_day(when, None)
+            row = result.data[0]
+            state = StreakState.from_row(row)
+            day = local_day(when, row.get("timezone"))
+            updated = advance(state, day)
+            if updated != state:
+                await self._execute(self.client.table("profiles").update(updated.to_row()).eq("id", user_id))
+            streak_days.put(user_id, row.get("timezone"), updated.last_day)
+            return day
+        except Exception:
+            logger.warning("Failed to update study streak for %s", user_id, exc_info=True)
+            return local_day(when, None)
     
     # Quiz operations
-    async def create_quiz(self, quiz_data: QuizCreate, user_id: str) -> str:
-        """Create a new quiz"""
-        data = {
+    @staticmethod
+    def _question_ids(quiz_data: QuizCreate) -> List[str]:
+        """A stable id per question, shared by the quiz document and its quiz_questions row"""
+        ids = []
+        seen = set()
+        for q in quiz_data.questions:
+            question_id = q.id if q.id and q.id not in seen else str(uuid.uuid4())
+            seen.add(question_id)
+            ids.append(question_id)
+        return ids
+    
+    @staticmethod
+    def _quiz_row(quiz_data: QuizCreate, user_id: str, question_ids: List[str]) -> Dict[str, Any]:
+        return {
             "title": quiz_data.title,
             "subject": quiz_data.subject,
             "difficulty": quiz_data.difficulty.value,
             "quiz_type": quiz_data.quiz_type.value,
-            "questions": [q.dict() for q in quiz_data.questions],
+            "questions": [{**q.dict(), "id": question_id} for q, question_id in zip(quiz_data.questions, question_ids)],
             "estimated_time": quiz_data.estimated_time,
             "user_id": user_id
         }
-        result = self.client.table("quizzes").insert(data).execute()
+    
+    @staticmethod
+    def _question_rows(quiz_data: QuizCreate, quiz_id: str, user_id: str, question_ids: List[str]) -> List[Dict[str, Any]]:
+        return [
+            {
+                "id": question_id,
+                "quiz_id": quiz_id,
+                "user_id": user_id,
+                "position": position,
+                "question": q.question,
+                "options": q.options,
+                "correct_answer": q.correct_answer,
+                "explanation": q.explanation,
+                "difficulty": q.difficulty.value,
+                "question_type": q.question_type.value,
+                # Comparison forms for fuzzy grading, computed once here rather than per attempt
+                "answer_profile": answer_profile(q.correct_answer).to_json() if q.question_type == QuizType.SHORT_ANSWER else None
+            }
+            for position, (q, question_id) in enumerate(zip(quiz_data.questions, question_ids), start=1)
+        ]
+    
+    async def _insert_question_rows(self, quiz_ids: List[str], rows: List[Dict[str, Any]]):
+        """Insert the quiz_questions rows of just-created quizzes.
+
+        The quiz documents are written first, in a separate request; if
+        their questions can't be written the quizzes are deleted again so
+        no quiz is left without questions.
+        """
+        if not rows:
+            return
+        try:
+            await self._execute(self.client.table("quiz_questions").insert(rows))
+        except Exception:
+            try:
+                await self._execute(self.client.table("quizzes").delete().in_("id", quiz_ids))
+            except Exception:
+                logger.error("Failed to remove quizzes %s left without questions", quiz_ids, exc_info=True)
+            raise
+    
+    async def create_quiz(self, quiz_data: QuizCreate, user_id: str) -> str:
+        """Create a new quiz"""
+        question_ids = self._question_ids(quiz_data)
+        result = await self._execute(self.client.table("quizzes").insert(self._quiz_row(quiz_data, user_id, question_ids)))
+        if result.data:
+            quiz_id = result.data[0]["id"]
+            await self._insert_question_rows([quiz_id], self._question_rows(quiz_data, quiz_id, user_id, question_ids))
+        generation = collection_versions.bump(user_id, QUIZZES)
+        question_indexes.add_questions(user_id, quiz_data.subject, [q.question for q in quiz_data.questions], generation)
+        if result.data:
+            await asyncio.to_thread(search_index.index_quiz, user_id, result.data[0]["id"], [q.question for q in quiz_data.questions])
         return result.data[0]["id"] if result.data else None
     
+    async def create_quizzes_bulk(self, quizzes: List[QuizCreate], user_id: str) -> List[str]:
+        """Create several quizzes with a single multi-row insert"""
+        if not quizzes:
+            return []
+        question_ids = [self._question_ids(quiz_data) for quiz_data in quizzes]
+        rows = [self._quiz_row(quiz_data, user_id, ids) for quiz_data, ids in zip(quizzes, question_ids)]
+        result = await self._execute(self.client.table("quizzes").insert(rows))
+        question_rows = [
+            row
+            for quiz_data, ids, quiz_row in zip(quizzes, question_ids, result.data)
+            for row in self._question_rows(quiz_data, quiz_row["id"], user_id, ids)
+        ]
+        await self._insert_question_rows([row["id"] for row in result.data], question_rows)
+        try:
+            generation = collection_versions.bump(user_id, QUIZZES)
+            for quiz_data, row in zip(quizzes, result.data):
+                question_indexes.add_questions(user_id, quiz_data.subject, [q.question for q in quiz_data.questions], generation)
+                await asyncio.to_thread(search_index.index_quiz, user_id, row["id"], [q.question for q in quiz_data.questions])
+        except Exception:
+            # The quizzes are committed; raising now would make bulk imports insert them again
+            logger.warning("Failed to index new quizzes for %s", user_id, exc_info=True)
+        return [row["id"] for row in result.data]
+    
+    @serve_stale(db_last_good, key=lambda quiz_id: quiz_id)
+    @coalesce(db_flight)
     async def get_quiz(self, quiz_id: str) -> Optional[Quiz]:
-        """Get quiz by ID"""
-        result = self.client.table("quizzes").select("*").eq("id", quiz_id).execute()
-        if result.data:
-            quiz_data = result.data[0]
-            quiz_data["questions"] = [QuizQuestion(**q) for q in quiz_data["questions"]]
-            return Quiz(**quiz_data)
+        """Get quiz by ID (quizzes are never edited, so the cached copy never goes stale)"""
+        rows = await self._cached_rows(
+            cache_key("rows", "quiz", quiz_id),
+            self.client.table("quizzes").select("*").eq("id", quiz_id)
+        )
+        if rows:
+            return self._quiz_from_row(rows[0])
         return None
     
+    @coalesce(db_flight)
+    async def load_answer_key(self, quiz_id: str) -> Optional[AnswerKey]:
+        """Get a quiz's answer key, reading only the answer columns the first time"""
+        key = answer_keys.get(quiz_id)
+        if key is not None:
+            return key
+        rows = await self._cached_rows(
+            cache_key("rows", "answer_key", quiz_id),
+            self.client.table("quiz_questions")
+            .select("id, position, correct_answer, explanation, question_type, answer_profile, difficulty, user_id, quizzes(subject)")
+            .eq("quiz_id", quiz_id)
+        )
+        if rows:
+            key = AnswerKey.from_rows(quiz_id, rows[0]["user_id"], rows, (rows[0].get("quizzes") or {}).get("subject"))
+        else:
+            # Quizzes stored before quiz_questions existed only have the document
+            quiz = await self.get_quiz(quiz_id)
+            if not quiz:
+                return None
+            key = AnswerKey.from_rows(quiz_id, quiz.user_id, [
+                {
+                    "id": q.id or str(position),
+                    "position": position,
+                    "correct_answer": q.correct_answer,
+                    "explanation": q.explanation,
+                    "question_type": q.question_type,
+                    "difficulty": getattr(q.difficulty, "value", q.difficulty)
+                }
+                for position, q in enumerate(quiz.questions, start=1)
+            ], quiz.subject)
+        answer_keys.put(key)
+        return key
+    
+    @coalesce(db_flight)
+    async def get_quiz_question(self, quiz_id: str, position: int) -> Optional[Dict[str, Any]]:
+        """Get one question of a quiz by 1-based position, without its answer or explanation"""
+        result = await self._execute(
+            self.client.table("quiz_questions")
+            .select("id, quiz_id, position, question, options, difficulty, question_type")
+            .eq("quiz_id", quiz_id)
+            .eq("position", position)
+        )
+        if result.data:
+            return result.data[0]
+        quiz = await self.get_quiz(quiz_id)
+        if not quiz or not 1 <= position <= len(quiz.questions):
+            return None
+        q = quiz.questions[position - 1]
+        return {
+            "id": q.id or str(position),
+            "quiz_id": quiz_id,
+            "position": position,
+            "question": q.question,
+            "options": q.options,
+            "difficulty": q.difficulty,
+            "question_type": q.question_type
+        }
+    
+    # Collection reads are coalesced per collection version, so a read that
+    # starts after a write never joins one that started before it
+    @serve_stale(db_last_good, key=lambda user_id: user_id)
+    @coalesce(db_flight, key=lambda user_id: (user_id, collection_versions.get(user_id, QUIZZES)))
     async def get_user_quizzes(self, user_id: str) -> List[Quiz]:
         """Get all quizzes for a user"""
-        result = self.client.table("quizzes").select("*").eq("user_id", user_id).execute()
-        quizzes = []
-        for quiz_data in result.data:
-            quiz_data["questions"] = [QuizQuestion(**q) for q in quiz_data["questions"]]
-            quizzes.append(Quiz(**quiz_data))
-        return quizzes
+        rows = await self._cached_rows(
+            self._collection_key(user_id, QUIZZES),
+            self.client.table("quizzes").select("*").eq("user_id", user_id)
+        )
+        return [self._quiz_from_row(quiz_data) for quiz_data in rows]
+    
+    async def load_question_index(self, user_id: str, subject: str) -> QuestionIndex:
+        """Get the near-duplicate index for a user's subject, building it from stored quizzes
+        the first time and again whenever any worker has saved a quiz for the user since"""
+        # Read the generation before the rows, so a save in between only causes an early rebuild
+        generation = collection_versions.get(user_id, QUIZZES)
+        index = question_indexes.get(user_id, subject, generation)
+        if index is None:
+            result = await self._execute(self.client.table("quizzes").select("questions").eq("user_id", user_id).eq("subject", subject))
+            questions = [q["question"] for row in result.data for q in row["questions"]]
+            index = question_indexes.build(user_id, subject, questions, generation)
+        return index
     
     # Quiz attempt operations
     async def create_quiz_attempt(self, attempt_data: QuizAttemptCreate, user_id: str) -> str:
@@ -85,7 +347,7 @@ class SupabaseDatabase:
         # Calculate score
         correct_count = sum(1 for answer in attempt_data.answers if answer.is_correct)
         total_questions = len(attempt_data.answers)
-        score = (correct_count / total_questions) * 100 if total_questions > 0 else 0
+        score = attempt_score(attempt_data.answers)
         
         data = {
             "quiz_id": attempt_data.quiz_id,
@@ -95,22 +357,58 @@ class SupabaseDatabase:
             "total_questions": total_questions,
             "correct_answers": correct_count
         }
-        result = self.client.table("quiz_attempts").insert(data).execute()
+        result = await self._execute(self.client.table("quiz_attempts").insert(data))
+        collection_versions.bump(user_id, QUIZ_ATTEMPTS)
+        await self.record_activity_day(user_id)
         return result.data[0]["id"] if result.data else None
     
+    async def create_quiz_attempts_bulk(self, rows: List[Dict[str, Any]]) -> List[str]:
+        """Record already graded attempts of several users with a single multi-row insert"""
+        if not rows:
+            return []
+        result = await self._execute(self.client.table("quiz_attempts").insert(rows))
+        for user_id in {row["user_id"] for row in rows}:
+            collection_versions.bump(user_id, QUIZ_ATTEMPTS)
+        return [row["id"] for row in result.data]
+    
+    async def record_live_attempts(self, rows: List[Dict[str, Any]], outcomes: Dict[str, List[Outcome]]) -> List[str]:
+        """Record a finished live room's attempts with one insert, then update each
+        player's stats, streak and mastery as a submitted attempt does"""
+        ids = await self.create_quiz_attempts_bulk(rows)
+        
+        async def follow_up(row: Dict[str, Any]):
+            user_id = row["user_id"]
+            try:
+                await self.update_user_stats(user_id, row["score"], row.get("time_taken", 0))
+                await self.record_activity_day(user_id)
+                await self.record_mastery(user_id, outcomes.get(user_id, []))
+            except Exception:
+                # The attempt itself is saved; the profile catches up on the next one
+                logger.exception("Failed to update stats for live attempt of %s", user_id)
+        
+        for start in range(0, len(rows), LIVE_FOLLOW_UP_BATCH):
+            await asyncio.gather(*(follow_up(row) for row in rows[start:start + LIVE_FOLLOW_UP_BATCH]))
+        return ids
+    
+    async def save_live_answers(self, rows: List[Dict[str, Any]]):
+        """Store every answer to one live-room question in one request"""
+        if rows:
+            await self._execute(self.client.table("live_answers").insert(rows))
+    
+    @serve_stale(db_last_good, key=lambda user_id: user_id)
+    @coalesce(db_flight, key=lambda user_id: (user_id, collection_versions.get(user_id, QUIZ_ATTEMPTS)))
     async def get_user_quiz_attempts(self, user_id: str) -> List[QuizAttempt]:
         """Get all quiz attempts for a user"""
-        result = self.client.table("quiz_attempts").select("*").eq("user_id", user_id).execute()
-        attempts = []
-        for attempt_data in result.data:
-            attempt_data["answers"] = [QuizAnswer(**a) for a in attempt_data["answers"]]
-            attempts.append(QuizAttempt(**attempt_data))
-        return attempts
+        rows = await self._cached_rows(
+            self._collection_key(user_id, QUIZ_ATTEMPTS),
+            self.client.table("quiz_attempts").select("*").eq("user_id", user_id)
+        )
+        return [self._attempt_from_row(attempt_data) for attempt_data in rows]
     
     # Flashcard operations
-    async def create_flashcard(self, flashcard_data: FlashcardCreate, user_id: str) -> str:
-        """Create a new flashcard"""
-        data = {
+    @staticmethod
+    def _flashcard_row(flashcard_data: FlashcardCreate, user_id: str) -> Dict[str, Any]:
+        return {
             "front": flashcard_data.front,
             "back": flashcard_data.back,
             "subject": flashcard_data.subject,
@@ -118,17 +416,50 @@ class SupabaseDatabase:
             "tags": flashcard_data.tags,
             "user_id": user_id
         }
-        result = self.client.table("flashcards").insert(data).execute()
+    
+    async def create_flashcard(self, flashcard_data: FlashcardCreate, user_id: str) -> str:
+        """Create a new flashcard"""
+        data = self._flashcard_row(flashcard_data, user_id)
+        result = await self._execute(self.client.table("flashcards").insert(data))
+        collection_versions.bump(user_id, FLASHCARDS)
+        if result.data:
+            await asyncio.to_thread(search_index.index_flashcard, user_id, result.data[0]["id"], flashcard_data.front, flashcard_data.back, flashcard_data.tags or [])
         return result.data[0]["id"] if result.data else None
     
+    async def create_flashcards_bulk(self, flashcards: List[FlashcardCreate], user_id: str) -> List[str]:
+        """Create several flashcards with a single multi-row insert"""
+        if not flashcards:
+            return []
+        rows = [self._flashcard_row(flashcard_data, user_id) for flashcard_data in flashcards]
+        result = await self._execute(self.client.table("flashcards").insert(rows))
+        try:
+            collection_versions.bump(user_id, FLASHCARDS)
+            for flashcard_data, row in zip(flashcards, result.data):
+                await asyncio.to_thread(search_index.index_flashcard, user_id, row["id"], flashcard_data.front, flashcard_data.back, flashcard_data.tags or [])
+        except Exception:
+            # The flashcards are committed; raising now would make bulk imports insert them again
+            logger.warning("Failed to index new flashcards for %s", user_id, exc_info=True)
+        return [row["id"] for row in result.data]
+    
+    @serve_stale(db_last_good, key=lambda user_id, subject=None: (user_id, subject))
+    @coalesce(db_flight, key=lambda user_id, subject=None: (user_id, subject, collection_versions.get(user_id, FLASHCARDS)))
     async def get_user_flashcards(self, user_id: str, subject: Optional[str] = None) -> List[Flashcard]:
         """Get flashcards for a user, optionally filtered by subject"""
         query = self.client.table("flashcards").select("*").eq("user_id", user_id)
         if subject:
             query = query.eq("subject", subject)
         
-        result = query.execute()
-        return [Flashcard(**card) for card in result.data]
+        rows = await self._cached_rows(self._collection_key(user_id, FLASHCARDS, subject), query)
+        return [Flashcard.from_row(card) for card in rows]
+    
+    async def delete_flashcard(self, flashcard_id: str, user_id: str) -> bool:
+        """Delete one of a user's flashcards"""
+        result = await self._execute(self.client.table("flashcards").delete().eq("id", flashcard_id).eq("user_id", user_id))
+        if not result.data:
+            return False
+        collection_versions.bump(user_id, FLASHCARDS)
+        await asyncio.to_thread(search_index.remove_flashcard, user_id, flashcard_id)
+        return True
     
     async def record_flashcard_review(self, review_data: FlashcardReview, user_id: str):
         """Record a flashcard review session"""
@@ -138,12 +469,25 @@ class SupabaseDatabase:
             "rating": review_data.rating,
             "time_taken": review_data.time_taken
         }
-        self.client.table("flashcard_reviews").insert(data).execute()
+        await self._execute(self.client.table("flashcard_reviews").insert(data))
+        
+        item = flashcard_item(review_data.flashcard_id)
+        model = mastery_models.get(user_id, collection_versions.get(user_id, MASTERY))
+        subject = model.subject_of(item) if model else None
+        difficulty = None
+        if subject is None:
+            card = await self._execute(
+                self.client.table("flashcards").select("subject, difficulty").eq("id", review_data.flashcard_id).eq("user_id", user_id)
+            )
+            if not card.data:
+                return
+            subject, difficulty = card.data[0]["subject"], card.data[0]["difficulty"]
+        await self.record_mastery(user_id, [Outcome(item, subject, rating_outcome(review_data.rating), difficulty)])
     
     # Study guide operations
-    async def create_study_guide(self, guide_data: StudyGuideCreate, user_id: str) -> str:
-        """Create a new study guide"""
-        data = {
+    @staticmethod
+    def _study_guide_row(guide_data: StudyGuideCreate, user_id: str) -> Dict[str, Any]:
+        return {
             "title": guide_data.title,
             "subject": guide_data.subject,
             "content": guide_data.content,
@@ -153,21 +497,195 @@ class SupabaseDatabase:
             "estimated_time": guide_data.estimated_time,
             "user_id": user_id
         }
-        result = self.client.table("study_guides").insert(data).execute()
+    
+    async def create_study_guide(self, guide_data: StudyGuideCreate, user_id: str) -> str:
+        """Create a new study guide"""
+        data = self._study_guide_row(guide_data, user_id)
+        result = await self._execute(self.client.table("study_guides").insert(data))
+        collection_versions.bump(user_id, STUDY_GUIDES)
+        if result.data:
+            await asyncio.to_thread(search_index.index_study_guide, user_id, result.data[0]["id"], guide_data.title, guide_data.content, guide_data.key_topics)
         return result.data[0]["id"] if result.data else None
     
+    async def update_study_guide(self, guide_id: str, guide_data: StudyGuideCreate, user_id: str) -> bool:
+        """Replace the contents of one of a user's study guides"""
+        data = self._study_guide_row(guide_data, user_id)
+        result = await self._execute(self.client.table("study_guides").update(data).eq("id", guide_id).eq("user_id", user_id))
+        if not result.data:
+            return False
+        collection_versions.bump(user_id, STUDY_GUIDES)
+        shared_cache.bump(f"study_guide:{guide_id}")
+        await asyncio.to_thread(search_index.index_study_guide, user_id, guide_id, guide_data.title, guide_data.content, guide_data.key_topics)
+        return True
+    
+    async def delete_study_guide(self, guide_id: str, user_id: str) -> bool:
+        """Delete one of a user's study guides"""
+        result = await self._execute(self.client.table("study_guides").delete().eq("id", guide_id).eq("user_id", user_id))
+        if not result.data:
+            return False
+        collection_versions.bump(user_id, STUDY_GUIDES)
+        shared_cache.bump(f"study_guide:{guide_id}")
+        await asyncio.to_thread(search_index.remove_study_guide, user_id, guide_id)
+        return True
+    
+    @serve_stale(db_last_good, key=lambda user_id: user_id)
+    @coalesce(db_flight, key=lambda user_id: (user_id, collection_versions.get(user_id, STUDY_GUIDES)))
     async def get_user_study_guides(self, user_id: str) -> List[StudyGuide]:
         """Get study guides for a user"""
-        result = self.client.table("study_guides").select("*").eq("user_id", user_id).execute()
-        return [StudyGuide(**guide) for guide in result.data]
+        rows = await self._cached_rows(
+            self._collection_key(user_id, STUDY_GUIDES),
+            self.client.table("study_guides").select("*").eq("user_id", user_id)
+        )
+        return [StudyGuide.from_row(guide) for guide in rows]
+    
+    @serve_stale(db_last_good, key=lambda guide_id: guide_id)
+    async def get_study_guide(self, guide_id: str) -> Optional[StudyGuide]:
+        """Get study guide by ID"""
+        rows = await self._cached_rows(
+            self._versioned_key(f"study_guide:{guide_id}"),
+            self.client.table("study_guides").select("*").eq("id", guide_id)
+        )
+        if rows:
+            return StudyGuide.from_row(rows[0])
+        return None
+    
+    # Search
+    async def ensure_search_index(self, user_id: str):
+        """Index a user's existing collections the first time they search"""
+        if await asyncio.to_thread(search_index.is_indexed, user_id):
+            return
+        await asyncio.to_thread(
+            search_index.rebuild_user,
+            user_id,
+            await self.get_user_study_guides(user_id),
+            await self.get_user_flashcards(user_id),
+            await self.get_user_quizzes(user_id)
+        )
+    
+    # History export
+    async def iter_user_history(
+        self,
+        table: str,
+        user_id: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of a user's quiz_attempts or study_sessions rows, oldest first.
+
+        Pages are keyset-paginated on (completed_at, id), so each page is an
+        index range scan no matter how deep into the history it is, and only
+        one page is held in memory at a time.
+        """
+        last = None
+        while True:
+            query = self.client.table(table).select("*").eq("user_id", user_id)
+            if since:
+                query = query.gte("completed_at", since.isoformat())
+            if until:
+                query = query.lt("completed_at", until.isoformat())
+            if last:
+                completed_at, row_id = last
+                query = query.or_(f'completed_at.gt."{completed_at}",and(completed_at.eq."{completed_at}",id.gt.{row_id})')
+            result = await self._execute(query.order("completed_at").order("id").limit(page_size))
+            if not result.data:
+                return
+            yield result.data
+            if len(result.data) < page_size:
+                return
+            last = (result.data[-1]["completed_at"], result.data[-1]["id"])
+    
+    async def iter_all_activity(
+        self,
+        table: str,
+        columns: str = "",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of every user's rows, ordered by user then time.
+
+        Rows carry user_id, completed_at and id plus any extra `columns`.
+        For maintenance jobs running with the service role key; keyset-paginated
+        on the (user_id, completed_at, id) index.
+        """
+        select = "user_id, completed_at, id" + (f", {columns}" if columns else "")
+        last = None
+        while True:
+            query = self.client.table(table).select(select)
+            if since:
+                query = query.gte("completed_at", since.isoformat())
+            if until:
+                query = query.lt("completed_at", until.isoformat())
+            if last:
+                user_id, completed_at, row_id = last
+                query = query.or_(
+                    f'user_id.gt.{user_id},'
+                    f'and(user_id.eq.{user_id},completed_at.gt."{completed_at}"),'
+                    f'and(user_id.eq.{user_id},completed_at.eq."{completed_at}",id.gt.{row_id})'
+                )
+            result = await self._execute(query.order("user_id").order("completed_at").order("id").limit(page_size))
+            if not result.data:
+                return
+            yield result.data
+            if len(result.data) < page_size:
+                return
+            row = result.data[-1]
+            last = (row["user_id"], row["completed_at"], row["id"])
+    
+    async def iter_all_by_time(
+        self,
+        table: str,
+        columns: str = "*",
+        after: Optional[Tuple[str, str]] = None,
+        until: Optional[datetime] = None,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of every user's rows in (completed_at, id) order, starting after the
+        `after` (completed_at, id) key. For maintenance jobs running with the service role key."""
+        last = after
+        while True:
+            query = self.client.table(table).select(columns)
+            if until:
+                query = query.lt("completed_at", until.isoformat())
+            if last:
+                completed_at, row_id = last
+                query = query.or_(f'completed_at.gt."{completed_at}",and(completed_at.eq."{completed_at}",id.gt.{row_id})')
+            result = await self._execute(query.order("completed_at").order("id").limit(page_size))
+            if not result.data:
+                return
+            yield result.data
+            if len(result.data) < page_size:
+                return
+            last = (result.data[-1]["completed_at"], result.data[-1]["id"])
+    
+    async def iter_all_profiles(self, page_size: int = EXPORT_PAGE_SIZE) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of every profile's id, email and timezone, ordered by id"""
+        last_id = None
+        while True:
+            query = self.client.table("profiles").select("id, email, timezone")
+            if last_id:
+                query = query.gt("id", last_id)
+            result = await self._execute(query.order("id").limit(page_size))
+            if not result.data:
+                return
+            yield result.data
+            if len(result.data) < page_size:
+                return
+            last_id = result.data[-1]["id"]
+    
+    async def save_streaks(self, rows: List[Dict[str, Any]]):
+        """Write recomputed streak columns for many profiles in one request"""
+        if rows:
+            await self._execute(self.client.table("profiles").upsert(rows, on_conflict="id"))
     
     # Progress tracking
     async def get_subject_progress(self, user_id: str, subject: str) -> Optional[SubjectProgress]:
         """Get progress for a specific subject"""
         # Get quiz attempts for this subject
-        attempts_result = self.client.table("quiz_attempts").select("""
+        attempts_result = await self._execute(self.client.table("quiz_attempts").select("""
             *, quizzes!inner(subject)
-        """).eq("user_id", user_id).eq("quizzes.subject", subject).execute()
+        """).eq("user_id", user_id).eq("quizzes.subject", subject))
         
         if not attempts_result.data:
             return None
@@ -198,4 +716,147 @@ class SupabaseDatabase:
             "duration": duration,
             "score": score
         }
-        self.client.table("study_sessions").insert(data).execute()
\ No newline at end of file
+        await self._execute(self.client.table("study_sessions").insert(data))
+        day = await self.record_activity_day(user_id)
+        try:
+            # Atomic upsert-increment of the (user, day, subject) rollup row
+            await self._execute(self.client.rpc("increment_study_rollup", {
+                "p_user_id": user_id,
+                "p_day": day.isoformat(),
+                "p_subject": subject,
+                "p_duration": duration,
+                "p_score": score
+            }))
+        except Exception:
+            # Periodic compaction rebuilds the rollup from the sessions themselves
+            logger.warning("Failed to update study rollup for %s", user_id, exc_info=True)
+    
+    async def get_activity(self, user_id: str, days: int = 7, tz_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Daily study totals for the last `days` days (today included), oldest first.
+
+        Reads the pre-aggregated daily rollups, so the work is bounded by
+        days x subjects rather than by the number of sessions logged.
+        """
+        today = local_day(datetime.now(timezone.utc), tz_name)
+        first = today - timedelta(days=days - 1)
+        result = await self._execute(
+            self.client.table("study_daily_rollups")
+            .select("day, subject, sessions, duration, score_sum, scored_sessions")
+            .eq("user_id", user_id)
+            .gte("day", first.isoformat())
+            .lte("day", today.isoformat())
+        )
+        return activity_series(result.data, first, today)
+    
+    async def save_rollups(self, rows: List[Dict[str, Any]]):
+        """Overwrite rebuilt rollup rows in one request"""
+        if rows:
+            await self._execute(self.client.table("study_daily_rollups").upsert(rows, on_conflict="user_id,day,subject"))    
+    # Mastery model
+    @coalesce(db_flight)
+    async def load_mastery(self, user_id: str) -> MasteryModel:
+        """Get a user's mastery model, building it from their history the first time"""
+        model = await self._stored_mastery(user_id)
+        if model is None:
+            model = await self._replay_mastery(user_id)
+            if not await self.save_mastery(model):
+                # Another request stored the first model meanwhile
+                model = await self._stored_mastery(user_id) or model
+        return model
+    
+    async def _stored_mastery(self, user_id: str) -> Optional[MasteryModel]:
+        # Read the counter before the row: a save landing in between leaves the
+        # model filed under an old generation, so it is only ever reloaded early
+        generation = collection_versions.get(user_id, MASTERY)
+        model = mastery_models.get(user_id, generation)
+        if model is None:
+            result = await self._execute(self.client.table("user_mastery").select("state, version").eq("user_id", user_id))
+            if result.data:
+                model = MasteryModel.from_state(user_id, result.data[0]["state"], result.data[0]["version"])
+                mastery_models.put(model, generation)
+        return model
+    
+    async def _replay_mastery(self, user_id: str) -> MasteryModel:
+        """Fold a user's quiz attempts and flashcard reviews into a new model, oldest first"""
+        def timestamp(value) -> float:
+            return (value if isinstance(value, datetime) else datetime.fromisoformat(value)).timestamp()
+        
+        events = []
+        quizzes = {quiz.id: quiz for quiz in await self.get_user_quizzes(user_id)}
+        for attempt in await self.get_user_quiz_attempts(user_id):
+            quiz = quizzes.get(attempt.quiz_id)
+            if not quiz:
+                continue
+            by_id = {q.id: position for position, q in enumerate(quiz.questions, start=1) if q.id}
+            outcomes = []
+            for i, answer in enumerate(attempt.answers):
+                position = by_id.get(answer.question_id) or (i + 1 if i < len(quiz.questions) else None)
+                if position is None:
+                    continue
+                q = quiz.questions[position - 1]
+                outcomes.append(Outcome(
+                    question_item(quiz.id, q.id or str(position)),
+                    quiz.subject,
+                    answer.credit if answer.credit is not None else float(bool(answer.is_correct)),
+                    getattr(q.difficulty, "value", q.difficulty)
+                ))
+            events.append((timestamp(attempt.completed_at), outcomes))
+        
+        cards = {card.id: card for card in await self.get_user_flashcards(user_id)}
+        reviews = await self._execute(
+            self.client.table("flashcard_reviews").select("flashcard_id, rating, reviewed_at").eq("user_id", user_id)
+        )
+        for review in reviews.data:
+            card = cards.get(review["flashcard_id"])
+            if card:
+                events.append((timestamp(review["reviewed_at"]), [Outcome(
+                    flashcard_item(card.id), card.subject, rating_outcome(review["rating"]), getattr(card.difficulty, "value", card.difficulty)
+                )]))
+        
+        model = MasteryModel(user_id)
+        for at, outcomes in sorted(events, key=lambda event: event[0]):
+            model.update(outcomes, at)
+        return model
+    
+    async def save_mastery(self, model: MasteryModel) -> bool:
+        """Store a model over the row version it was read from.
+
+        Returns False, storing nothing, when another request has written
+        the row since; the caller reloads and reapplies its answers.
+        """
+        row = {
+            "state": model.to_state(),
+            "version": model.version + 1,
+            "updated_at": datetime.now(timezone.utc).isoformat()
+        }
+        table = self.client.table("user_mastery")
+        if model.version:
+            result = await self._execute(table.update(row).eq("user_id", model.user_id).eq("version", model.version))
+        else:
+            result = await self._execute(table.upsert({"user_id": model.user_id, **row}, on_conflict="user_id", ignore_duplicates=True))
+        if not result.data:
+            return False
+        model.version += 1
+        mastery_models.put(model, collection_versions.bump(model.user_id, MASTERY))
+        return True
+    
+    async def record_mastery(self, user_id: str, outcomes: List[Outcome]):
+        """Apply graded answers, already written to the history tables, to the user's mastery model and store it"""
+        if not outcomes:
+            return
+        try:
+            for _ in range(MASTERY_SAVE_ATTEMPTS):
+                model = await self._stored_mastery(user_id)
+                if model is None:
+                    # Replaying the history picks these answers up too
+                    await self.load_mastery(user_id)
+                    return
+                # Cached models are shared with concurrent readers; update a copy
+                model = model.copy()
+                model.update(outcomes)
+                if await self.save_mastery(model):
+                    return
+                mastery_models.discard(user_id)
+            logger.warning("Gave up updating mastery model for %s after %d conflicting writes", user_id, MASTERY_SAVE_ATTEMPTS)
+        except Exception:
+            logger.warning("Failed to update mastery model for %s", user_id, exc_info=True)
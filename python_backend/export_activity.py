@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Export every quiz_attempts and study_sessions row for offline analytics.
+
+Rows are written in a columnar layout partitioned by UTC completion date:
+
+    <out>/<table>/date=YYYY-MM-DD/part-<first row>.parquet
+
+Parquet (zstd) needs pyarrow. Without it, each part is a gzipped JSON
+object of column arrays (.columns.json.gz), which loads directly into a
+DataFrame. Rows are read in keyset-paged (completed_at, id) order, so
+only one page and one part file's worth of columns are held in memory.
+
+Each run resumes after the last exported row. The high-water mark is kept
+per table in <out>/_export_state.json and advanced after every part file.
+Rows newer than --settle-seconds are left for the next run, so rows from
+transactions still in flight aren't skipped. Part files are named after
+their first row, so a run that restarts from a saved mark overwrites a part
+written after the mark was last saved instead of duplicating it.
+
+Usage:
+    python export_activity.py [--out DIR] [--table NAME ...] [--rows-per-file N] [--full]
+
+Needs SUPABASE_SERVICE_ROLE_KEY: with the anon key, row level security hides
+other users' rows.
+"""
+
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; fall back to gzipped JSON columns
+    pa = None
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+from database import SupabaseDatabase
+
+# Column name -> type for each exported table
+COLUMNS: Dict[str, Dict[str, str]] = {
+    "quiz_attempts": {
+        "id": "string",
+        "quiz_id": "string",
+        "user_id": "string",
+        "score": "float",
+        "total_questions": "int",
+        "correct_answers": "int",
+        "time_taken": "int",
+        "completed_at": "timestamp",
+        "answers": "json"
+    },
+    "study_sessions": {
+        "id": "string",
+        "user_id": "string",
+        "activity_type": "string",
+        "subject": "string",
+        "duration": "int",
+        "score": "float",
+        "completed_at": "timestamp"
+    }
+}
+STATE_FILE = "_export_state.json"
+
+def _arrow_type(kind: str):
+    return {
+        "string": pa.string(),
+        "json": pa.string(),
+        "float": pa.float64(),
+        "int": pa.int32(),
+        "timestamp": pa.timestamp("us", tz="UTC")
+    }[kind]
+
+def _convert(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if kind == "timestamp":
+        return datetime.fromisoformat(value).astimezone(timezone.utc)
+    if kind == "float":
+        return float(value)
+    if kind == "json":
+        return orjson.dumps(value).decode()
+    return value
+
+def _write_part(path: str, table: str, columns: Dict[str, List[Any]]):
+    tmp = path + ".tmp"
+    if pa is not None:
+        schema = pa.schema([(name, _arrow_type(kind)) for name, kind in COLUMNS[table].items()])
+        pq.write_table(pa.Table.from_pydict(columns, schema=schema), tmp, compression="zstd")
+    else:
+        with gzip.open(tmp, "wb") as f:
+            f.write(orjson.dumps(columns))
+    os.replace(tmp, path)
+
+def _load_state(out: str) -> Dict[str, Any]:
+    try:
+        with open(os.path.join(out, STATE_FILE), "rb") as f:
+            return orjson.loads(f.read())
+    except FileNotFoundError:
+        return {}
+
+def _save_state(out: str, state: Dict[str, Any]):
+    path = os.path.join(out, STATE_FILE)
+    with open(path + ".tmp", "wb") as f:
+        f.write(orjson.dumps(state, option=orjson.OPT_INDENT_2))
+    os.replace(path + ".tmp", path)
+
+async def export_table(
+    db: SupabaseDatabase,
+    table: str,
+    out: str,
+    state: Dict[str, Any],
+    until: datetime,
+    rows_per_file: int
+) -> Dict[str, int]:
+    kinds = COLUMNS[table]
+    mark = state.get(table)
+    after: Optional[Tuple[str, str]] = (mark["completed_at"], mark["id"]) if mark else None
+    suffix = ".parquet" if pa is not None else ".columns.json.gz"
+    stats = {"rows": 0, "files": 0}
+
+    columns: Dict[str, List[Any]] = {name: [] for name in kinds}
+    part_day = None
+    first_key = None
+    last_row = None
+
+    def flush():
+        nonlocal columns, first_key
+        if not columns["id"]:
+            return
+        completed_at, row_id = first_key
+        directory = os.path.join(out, table, f"date={part_day.isoformat()}")
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{completed_at.strftime('%H%M%S%f')}-{row_id[:8]}{suffix}"
+        _write_part(os.path.join(directory, name), table, columns)
+        stats["files"] += 1
+        stats["rows"] += len(columns["id"])
+        state[table] = {"completed_at": last_row["completed_at"], "id": last_row["id"]}
+        _save_state(out, state)
+        columns = {name: [] for name in kinds}
+        first_key = None
+
+    async for page in db.iter_all_by_time(table, ", ".join(kinds), after, until):
+        for row in page:
+            completed_at = _convert("timestamp", row["completed_at"])
+            if completed_at.date() != part_day or len(columns["id"]) >= rows_per_file:
+                flush()
+                part_day = completed_at.date()
+            if first_key is None:
+                first_key = (completed_at, row["id"])
+            for name, kind in kinds.items():
+                columns[name].append(completed_at if name == "completed_at" else _convert(kind, row.get(name)))
+            last_row = row
+    flush()
+    return stats
+
+async def export(db: SupabaseDatabase, out: str, tables: List[str], rows_per_file: int, settle_seconds: int, full: bool):
+    os.makedirs(out, exist_ok=True)
+    state = {} if full else _load_state(out)
+    until = datetime.now(timezone.utc) - timedelta(seconds=settle_seconds)
+    return {table: await export_table(db, table, out, state, until, rows_per_file) for table in tables}
+
+def main():
+    parser = argparse.ArgumentParser(description="Export quiz attempts and study sessions in a columnar layout")
+    parser.add_argument("--out", default="exports", help="output directory (default ./exports)")
+    parser.add_argument("--table", action="append", choices=list(COLUMNS), help="table to export (default: all)")
+    parser.add_argument("--rows-per-file", type=int, default=100_000, help="rows per part file (default 100000)")
+    parser.add_argument("--settle-seconds", type=int, default=300, help="skip rows newer than this (default 300)")
+    parser.add_argument("--full", action="store_true", help="ignore the high-water mark and export everything")
+    args = parser.parse_args()
+
+    load_dotenv()
+    from supabase import create_client
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        sys.exit("SUPABASE_SERVICE_ROLE_KEY is required to read every user's history")
+    db = SupabaseDatabase(create_client(os.getenv("SUPABASE_URL"), key))
+    stats = asyncio.run(export(db, args.out, args.table or list(COLUMNS), args.rows_per_file, args.settle_seconds, args.full))
+    for table, counts in stats.items():
+        print(f"{table}: {counts['rows']} rows in {counts['files']} files")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the OpenAI chat completions API, for exercising
+model routing, request hedging and failure handling without real calls.
+
+Run it and point the backend at it:
+
+    python fake_openai_server.py                      # listens on 127.0.0.1:8100
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=test python start_server.py
+
+Behaviour (environment variables):
+    FAKE_OPENAI_PORT          listen port (default 8100)
+    FAKE_OPENAI_LATENCY       typical response latency in seconds (default 0.2)
+    FAKE_OPENAI_TAIL_RATE     share of requests that are slow (default 0.05)
+    FAKE_OPENAI_TAIL_LATENCY  latency of slow requests in seconds (default 5)
+    FAKE_OPENAI_ERROR_RATE    share of requests answered with a 500 (default 0)
+
+Prompt caching is simulated like the real API: prompt tokens are estimated
+at 4 characters each, and a request whose prompt shares a prefix of at
+least 1024 tokens with a recent prompt reports that prefix (in 128-token
+steps) as cached_tokens and responds proportionally faster.
+
+GET /stats reports how many requests each model received.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, deque
+from fastapi import FastAPI, HTTPException, Request
+
+LATENCY = float(os.getenv("FAKE_OPENAI_LATENCY", 0.2))
+TAIL_RATE = float(os.getenv("FAKE_OPENAI_TAIL_RATE", 0.05))
+TAIL_LATENCY = float(os.getenv("FAKE_OPENAI_TAIL_LATENCY", 5))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", 0))
+
+app = FastAPI(title="Fake OpenAI")
+requests_by_model = Counter()
+recent_prompts = deque(maxlen=64)
+
+def _prompt_usage(body: dict) -> tuple:
+    """(prompt tokens, cached prompt tokens) for a request"""
+    prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+    shared = max((len(os.path.commonprefix([prompt, previous])) for previous in recent_prompts), default=0)
+    recent_prompts.append(prompt)
+    prompt_tokens = max(1, len(prompt) // 4)
+    cached = shared // 4 // 128 * 128
+    return prompt_tokens, cached if cached >= 1024 else 0
+
+def _content_for(body: dict) -> str:
+    """Canned content shaped like what the requesting prompt asks for"""
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        return json.dumps({"decks": []})
+    prompt = body["messages"][-1]["content"] if body.get("messages") else ""
+    if response_format.get("type") == "json_object" and '"messages"' in prompt:
+        return json.dumps({"messages": [
+            f"Great work, {{name}}! Message {i} for your {{streak}}-day streak." for i in range(10)
+        ]})
+    if response_format.get("type") == "json_object":
+        return json.dumps({"questions": [{
+            "question": "What is 2 + 2?",
+            "options": ["A) 3", "B) 4", "C) 5", "D) 22"],
+            "correct_answer": "B",
+            "explanation": "Two plus two is four."
+        }]})
+    return "Keep going - every session brings you closer to your goal!"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "")
+    requests_by_model[model] += 1
+    prompt_tokens, cached_tokens = _prompt_usage(body)
+
+    latency = TAIL_LATENCY if random.random() < TAIL_RATE else LATENCY
+    await asyncio.sleep(latency * (1 - 0.5 * cached_tokens / prompt_tokens))
+    if random.random() < ERROR_RATE:
+        raise HTTPException(status_code=500, detail="Injected failure")
+
+    return {
+        "id": f"chatcmpl-fake-{int(time.time() * 1000)}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": _content_for(body)},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": 10,
+            "total_tokens": prompt_tokens + 10,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens}
+        }
+    }
+
+@app.get("/stats")
+async def stats():
+    return {"requests_by_model": dict(requests_by_model)}
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FAKE_OPENAI_PORT", 8100)))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Report cold-start import time for the FastAPI app.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter and
+prints the slowest modules by cumulative import time, plus a per-package
+rollup, so regressions in worker start-up time are easy to spot.
+
+Usage: python import_report.py [--module main] [--top 25]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+def run_importtime(module: str):
+    env = dict(os.environ)
+    # main refuses to import without these; the clients themselves are created lazily
+    env.setdefault("SUPABASE_URL", "http://localhost")
+    env.setdefault("SUPABASE_ANON_KEY", "import-report")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=25, help="number of modules to list")
+    args = parser.parse_args()
+
+    rows = run_importtime(args.module)
+    total_us = next((cumulative for name, _, cumulative in reversed(rows) if name.strip() == args.module), 0)
+
+    print(f"Total import time for {args.module}: {total_us / 1000:.1f} ms\n")
+
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name}")
+
+    # Self time summed by top-level package
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.strip().split(".")[0]] += self_us
+    print(f"\n{'self ms':>14}  package")
+    for package, self_us in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {package}")
+
+if __name__ == "__main__":
+    main()
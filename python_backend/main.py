@@ -3,16 +3,32 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional, List
+from contextlib import asynccontextmanager
 import os
 from dotenv import load_dotenv
-from supabase import create_client, Client
-import uvicorn
+from responses import ORJSONResponse
+from services.lifecycle import lifecycle
 
 # Load environment variables
 load_dotenv()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from services.motivation_pool import motivation_pool
+    # Keep pre-generated motivation messages topped up in the background
+    motivation_pool.start()
+    yield
+    await motivation_pool.stop()
+    # Let in-flight AI generations finish and flush buffered writes before the worker exits
+    await lifecycle.drain(float(os.getenv("GRACEFUL_TIMEOUT", 30)))
+
 # Initialize FastAPI app
-app = FastAPI(title="AI Quiz & Study Assistant API", version="1.0.0")
+app = FastAPI(
+    title="AI Quiz & Study Assistant API",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
+)
 
 # CORS middleware for frontend integration
 app.add_middleware(
@@ -30,13 +46,27 @@ supabase_key = os.getenv("SUPABASE_ANON_KEY")
 if not supabase_url or not supabase_key:
     raise Exception("Missing SUPABASE_URL or SUPABASE_ANON_KEY environment variables")
 
-supabase: Client = create_client(supabase_url, supabase_key)
+_supabase = None
+
+def get_supabase():
+    """Shared Supabase client, created on first use so workers start without it"""
+    global _supabase
+    if _supabase is None:
+        from supabase import create_client
+        _supabase = create_client(supabase_url, supabase_key)
+    return _supabase
+
+def __getattr__(name):
+    # Keep `main.supabase` working without constructing the client at import time
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Security
 security = HTTPBearer()
 
 # Import routes
-from routes import auth, quizzes, flashcards, progress, study_guides, ai
+from routes import auth, quizzes, flashcards, progress, study_guides, ai, search, live
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
@@ -45,6 +75,8 @@ app.include_router(flashcards.router, prefix="/api/flashcards", tags=["flashcard
 app.include_router(progress.router, prefix="/api/progress", tags=["progress"])
 app.include_router(study_guides.router, prefix="/api/study-guides", tags=["study-guides"])
 app.include_router(ai.router, prefix="/api/ai", tags=["ai-features"])
+app.include_router(search.router, prefix="/api/search", tags=["search"])
+app.include_router(live.router, prefix="/api/live", tags=["live-quizzes"])
 
 @app.get("/")
 async def root():
@@ -54,5 +86,26 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "AI Quiz & Study Assistant API"}
 
+@app.get("/metrics")
+async def metrics():
+    """Per-worker metrics: circuit breakers, stale reads served, AI load and prompt caching, message pool, live rooms, shared cache"""
+    from services.ai_service import ai_service
+    from services.circuit_breaker import breakers, db_last_good
+    from services.live_rooms import live_rooms
+    from services.motivation_pool import motivation_pool
+    from services.rate_limit import ai_admission
+    from services.shared_cache import shared_cache
+    return {
+        "circuit_breakers": breakers.snapshot(),
+        "db_stale_reads": db_last_good.stats(),
+        "ai_admission": ai_admission.stats(),
+        "ai_hedging": ai_service.hedger.stats,
+        "ai_prompt_cache": ai_service.prompt_cache.snapshot(),
+        "motivation_pool": {**motivation_pool.stats, "buckets": motivation_pool.sizes()},
+        "live_rooms": {**live_rooms.stats, "open": len(live_rooms.rooms)},
+        "shared_cache": shared_cache.stats()
+    }
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,8 +1,15 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 
+# Base for models loaded from our own database rows
+class RowModel(BaseModel):
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]):
+        """Build from a trusted DB row without re-running validation"""
+        return cls.model_construct(**row)
+
 # User Models
 class UserCreate(BaseModel):
     email: EmailStr
@@ -19,13 +26,16 @@ class User(BaseModel):
     full_name: Optional[str]
     created_at: datetime
     
-class UserProfile(BaseModel):
+class UserProfile(RowModel):
     id: str
     email: str
     full_name: Optional[str]
     total_quizzes: int = 0
     average_score: float = 0.0
     study_streak: int = 0
+    longest_streak: int = 0
+    streak_last_day: Optional[date] = None  # in the user's timezone
+    timezone: Optional[str] = None  # IANA name, e.g. "Europe/Berlin"; UTC if unset
     total_study_time: float = 0.0
 
 # Quiz Models
@@ -39,7 +49,7 @@ class QuizType(str, Enum):
     TRUE_FALSE = "true_false"
     SHORT_ANSWER = "short_answer"
 
-class QuizQuestion(BaseModel):
+class QuizQuestion(RowModel):
     id: Optional[str] = None
     question: str
     options: Optional[List[str]] = None  # For multiple choice
@@ -56,7 +66,7 @@ class QuizCreate(BaseModel):
     questions: List[QuizQuestion]
     estimated_time: Optional[int] = None  # in minutes
 
-class Quiz(BaseModel):
+class Quiz(RowModel):
     id: str
     title: str
     subject: str
@@ -67,17 +77,44 @@ class Quiz(BaseModel):
     created_at: datetime
     user_id: str
 
+class QuizQuestionView(BaseModel):
+    """One question as shown while taking a quiz: no answer or explanation"""
+    id: str
+    quiz_id: str
+    position: int  # 1-based
+    total_questions: int
+    question: str
+    options: Optional[List[str]] = None
+    difficulty: QuizDifficulty
+    question_type: QuizType
+
+class QuestionAnswerSubmit(BaseModel):
+    user_answer: str
+
+class QuestionAnswerResult(BaseModel):
+    question_id: str
+    position: int
+    is_correct: bool
+    credit: float  # 0-1, partial for close short answers
+    correct_answer: str
+    explanation: Optional[str] = None
+
+class LiveRoomCreate(BaseModel):
+    quiz_id: str
+    question_seconds: Optional[int] = None  # defaults to LIVE_QUESTION_SECONDS
+
 # Quiz Attempt Models
-class QuizAnswer(BaseModel):
+class QuizAnswer(RowModel):
     question_id: str
     user_answer: str
     is_correct: Optional[bool] = None
+    credit: Optional[float] = None  # 0-1, set by grading
 
 class QuizAttemptCreate(BaseModel):
     quiz_id: str
     answers: List[QuizAnswer]
 
-class QuizAttempt(BaseModel):
+class QuizAttempt(RowModel):
     id: str
     quiz_id: str
     user_id: str
@@ -96,7 +133,7 @@ class FlashcardCreate(BaseModel):
     difficulty: QuizDifficulty
     tags: Optional[List[str]] = []
 
-class Flashcard(BaseModel):
+class Flashcard(RowModel):
     id: str
     front: str
     back: str
@@ -121,7 +158,7 @@ class StudyGuideCreate(BaseModel):
     difficulty: QuizDifficulty
     estimated_time: Optional[int]  # in minutes
 
-class StudyGuide(BaseModel):
+class StudyGuide(RowModel):
     id: str
     title: str
     subject: str
@@ -160,6 +197,7 @@ class ProgressSummary(BaseModel):
     total_quizzes: int
     average_score: float
     current_streak: int
+    longest_streak: int = 0
     subjects: List[SubjectProgress]
     recent_sessions: List[StudySession]
     weekly_activity: List[Dict[str, Any]]
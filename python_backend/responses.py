@@ -0,0 +1,53 @@
+from typing import Any, Optional
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import orjson
+
+def _orjson_default(obj: Any):
+    """Serialize pydantic models by their field values (no validation, no model_dump)"""
+    if isinstance(obj, BaseModel):
+        return dict(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+def dump_json(content: Any) -> bytes:
+    """Serialize content (including RowModel instances) to JSON bytes"""
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Returning this directly from a route skips FastAPI's response_model
+    validation and jsonable_encoder pass, so rows built with
+    RowModel.from_row are serialized exactly once.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dump_json(content)
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Check the request's If-None-Match header against an ETag"""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so ignore any W/ prefix
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return etag in candidates
+
+def not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """Return a 304 response if the client already holds this version"""
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
+    return None
+
+def cache_headers(etag: Optional[str]) -> dict:
+    """Headers for versioned per-user resources: cacheable, but always revalidated.
+
+    Without a tag (versions unavailable) the response isn't stored at all.
+    """
+    if etag is None:
+        return {"Cache-Control": "private, no-store"}
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
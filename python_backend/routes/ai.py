@@ -1,12 +1,28 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from typing import Optional
+from textwrap import dedent
 from models import APIResponse, UserProfile
 from database import SupabaseDatabase
 from routes.auth import get_current_user, get_database
+from services.motivation_pool import bucket_for, motivation_pool
+from services.rate_limit import ai_rate_limit
+from services.streaks import current_streak
 
 router = APIRouter()
 
-@router.post("/motivation", response_model=APIResponse)
+STUDY_TIPS_SYSTEM_PROMPT = dedent("""
+    You are an expert study coach. Provide practical, actionable study tips tailored to the student's needs.
+
+    Focus on:
+    - Practical techniques they can use immediately
+    - Subject-specific strategies
+    - Ways to improve retention and understanding
+    - Tips tailored to their learning style
+
+    Keep each tip concise but detailed enough to be actionable.
+""").strip()
+
+@router.post("/motivation", response_model=APIResponse, dependencies=[Depends(ai_rate_limit("motivation", per_minute=6, burst=3))])
 async def get_motivation_message(
     preferred_tone: str = "encouraging",
     current_user = Depends(get_current_user),
@@ -43,13 +59,23 @@ async def get_motivation_message(
         # Import AI service
         from services.ai_service import ai_service
         
-        # Generate motivation message
-        motivation_message = await ai_service.generate_motivation_message(
-            user_name=user_profile.full_name if user_profile else None,
-            recent_performance=recent_performance,
-            study_streak=user_profile.study_streak if user_profile else 0,
-            preferred_tone=preferred_tone
-        )
+        user_name = user_profile.full_name if user_profile else None
+        study_streak = current_streak(user_profile) if user_profile else 0
+        
+        # Serve a pre-generated message for this kind of student when one is ready
+        motivation_message = None
+        bucket = bucket_for(preferred_tone, study_streak, recent_performance)
+        if bucket is not None:
+            motivation_message = motivation_pool.take(bucket, user_name, study_streak)
+        
+        # Otherwise generate one now
+        if motivation_message is None:
+            motivation_message = await ai_service.generate_motivation_message(
+                user_name=user_name,
+                recent_performance=recent_performance,
+                study_streak=study_streak,
+                preferred_tone=preferred_tone
+            )
         
         return APIResponse(
             success=True,
@@ -57,7 +83,7 @@ async def get_motivation_message(
             data={
                 "motivation_message": motivation_message,
                 "user_context": {
-                    "study_streak": user_profile.study_streak if user_profile else 0,
+                    "study_streak": study_streak,
                     "total_quizzes": user_profile.total_quizzes if user_profile else 0,
                     "average_score": user_profile.average_score if user_profile else 0
                 }
@@ -87,7 +113,7 @@ async def get_motivation_message(
             }
         )
 
-@router.post("/study-tips", response_model=APIResponse)
+@router.post("/study-tips", response_model=APIResponse, dependencies=[Depends(ai_rate_limit("study_tips", per_minute=6, burst=3))])
 async def get_study_tips(
     subject: str,
     difficulty_level: str = "medium",
@@ -98,26 +124,18 @@ async def get_study_tips(
     try:
         from services.ai_service import ai_service
         
-        # Create prompt for study tips
-        prompt = f"""
-        Generate 3-5 specific, actionable study tips for {subject} at {difficulty_level} level.
-        The student prefers {learning_style} learning style.
-        
-        Focus on:
-        - Practical techniques they can use immediately
-        - Subject-specific strategies
-        - Ways to improve retention and understanding
-        - Tips tailored to their learning style
-        
-        Keep each tip concise but detailed enough to be actionable.
-        """
+        # Static guidance goes in the system prompt so it forms a cacheable prefix
+        prompt = (
+            f"Generate 3-5 specific, actionable study tips for {subject} at {difficulty_level} level.\n"
+            f"The student prefers {learning_style} learning style."
+        )
         
-        response = ai_service.client.chat.completions.create(
-            model="gpt-5",  # the newest OpenAI model is "gpt-5" which was released August 7, 2025. do not change this unless explicitly requested by the user
+        response = await ai_service.chat_completion(
+            task="study_tips",
             messages=[
                 {
                     "role": "system",
-                    "content": "You are an expert study coach. Provide practical, actionable study tips tailored to the student's needs."
+                    "content": STUDY_TIPS_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -141,6 +159,8 @@ async def get_study_tips(
             }
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import Client
 from typing import Optional
+import asyncio
 import os
 from models import UserCreate, UserLogin, User, TokenResponse, APIResponse
 from database import SupabaseDatabase
+from services.circuit_breaker import supabase_breaker
 
 router = APIRouter()
 security = HTTPBearer()
@@ -17,12 +18,27 @@ def get_supabase_client():
 def get_database():
     return SupabaseDatabase(get_supabase_client())
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current authenticated user"""
+def get_service_database() -> Optional[SupabaseDatabase]:
+    """Database with the service role key, or None if it isn't configured.
+
+    For writes the server makes on behalf of several users at once (a live
+    room's answers and attempts): row level security only lets a session
+    write its own rows, so these can't go through any one user's client.
+    """
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        return None
+    from supabase import create_client
+    return SupabaseDatabase(create_client(os.getenv("SUPABASE_URL"), key))
+
+async def verify_token(token: str):
+    """Resolve a Supabase access token to its user, or raise 401"""
     try:
         supabase = get_supabase_client()
-        # Verify the JWT token
-        user_response = supabase.auth.get_user(credentials.credentials)
+        # Verify the JWT token (fails fast with 503 while Supabase is unreachable)
+        user_response = await supabase_breaker.call(
+            lambda: asyncio.to_thread(supabase.auth.get_user, token)
+        )
         if not user_response.user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -30,6 +46,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 headers={"WWW-Authenticate": "Bearer"},
             )
         return user_response.user
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -37,6 +55,10 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Get current authenticated user"""
+    return await verify_token(credentials.credentials)
+
 @router.post("/register", response_model=APIResponse)
 async def register(user_data: UserCreate, db: SupabaseDatabase = Depends(get_database)):
     """Register a new user"""
@@ -1,11 +1,24 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+import os
+from fastapi import APIRouter, HTTPException, Depends, status, Request, UploadFile, File, Body, Query
 from typing import List, Optional
 from models import Flashcard, FlashcardCreate, FlashcardReview, APIResponse
 from database import SupabaseDatabase
+from responses import ORJSONResponse, not_modified, cache_headers
+from services.collection_versions import collection_versions, FLASHCARDS
+from services.bulk_import import iter_upload_records, flashcard_csv_records, bulk_insert, insert_in_batches
+from services.lifecycle import lifecycle
+from services.rate_limit import ai_rate_limit
+from services.text_compaction import compact_text
 from routes.auth import get_current_user, get_database
 
 router = APIRouter()
 
+# Bounds on one generation request: cards asked of each section, study guides
+# read, and sections sent to the AI (sections past the cap are left out)
+MAX_CARDS_PER_SECTION = 30
+MAX_GUIDES = 20
+MAX_SECTIONS = int(os.getenv("FLASHCARD_MAX_SECTIONS", 24))
+
 @router.post("/", response_model=APIResponse)
 async def create_flashcard(
     flashcard_data: FlashcardCreate,
@@ -26,16 +39,181 @@ async def create_flashcard(
             detail=f"Failed to create flashcard: {str(e)}"
         )
 
+@router.post("/bulk", response_model=APIResponse)
+async def bulk_create_flashcards(
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Create many flashcards from a JSON array, NDJSON stream or CSV upload.
+
+    CSV uploads need a header row with front, back, subject, difficulty and
+    optionally tags (pipe-separated). Rows are validated as they stream in
+    and invalid rows are reported without failing the rest.
+    """
+    try:
+        kind, records = iter_upload_records(request)
+        if kind == "csv":
+            records = flashcard_csv_records(records)
+        
+        result = await bulk_insert(
+            records,
+            FlashcardCreate,
+            lambda batch: db.create_flashcards_bulk(batch, current_user.id)
+        )
+        return APIResponse(
+            success=result["failed"] == 0,
+            message=f"Created {result['created']} flashcards, {result['failed']} failed",
+            data=result
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import flashcards: {str(e)}"
+        )
+
+@router.post("/generate-from-pdf", response_model=APIResponse, dependencies=[Depends(ai_rate_limit("generate_flashcards", per_minute=2, burst=3))])
+async def generate_flashcards_from_pdf(
+    file: UploadFile = File(...),
+    subject: str = "General",
+    difficulty: str = "medium",
+    cards_per_section: int = Query(10, ge=1, le=MAX_CARDS_PER_SECTION),
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Generate flashcards from an uploaded PDF using AI"""
+    try:
+        if file.content_type != "application/pdf":
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Only PDF files are supported"
+            )
+        
+        max_size = 10 * 1024 * 1024  # 10MB
+        if file.size and file.size > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File size must be less than 10MB"
+            )
+        
+        content = await file.read()
+        
+        from services.ai_service import ai_service
+        
+        extracted_text = ai_service.extract_text_from_pdf(content)
+        if not extracted_text.strip():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Could not extract text from PDF. Please ensure the PDF contains readable text."
+            )
+        
+        # Each section becomes one deck; sections are packed into as few AI requests as fit
+        sections = ai_service.split_into_sections(compact_text(extracted_text))
+        sources = [
+            {"id": f"section-{n}", "subject": subject, "content": section}
+            for n, section in enumerate(sections[:MAX_SECTIONS], start=1)
+        ]
+        skipped = len(sections) - len(sources)
+        async with lifecycle.inflight():
+            decks = await ai_service.generate_flashcards(sources, difficulty, cards_per_section)
+        flashcards = [card for source in sources for card in decks[source["id"]]]
+        
+        if not flashcards:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to generate flashcards from the content"
+            )
+        
+        result = await insert_in_batches(
+            flashcards,
+            lambda batch: db.create_flashcards_bulk(batch, current_user.id)
+        )
+        return APIResponse(
+            success=True,
+            message="Flashcards generated successfully from PDF!" if not skipped else
+                f"Flashcards generated from the first {len(sources)} sections of the PDF; {skipped} more were skipped",
+            data={**result, "sections": len(sources), "skipped_sections": skipped, "subject": subject}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process PDF and generate flashcards: {str(e)}"
+        )
+
+@router.post("/generate-from-study-guides", response_model=APIResponse, dependencies=[Depends(ai_rate_limit("generate_flashcards", per_minute=2, burst=3))])
+async def generate_flashcards_from_study_guides(
+    guide_ids: List[str] = Body(..., embed=True, min_length=1, max_length=MAX_GUIDES),
+    difficulty: str = "medium",
+    cards_per_section: int = Query(10, ge=1, le=MAX_CARDS_PER_SECTION),
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Generate flashcards from one or more of the user's study guides using AI"""
+    try:
+        from services.ai_service import ai_service
+        
+        sources = []
+        for guide_id in guide_ids:
+            guide = await db.get_study_guide(guide_id)
+            if not guide or guide.user_id != current_user.id:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Study guide {guide_id} not found"
+                )
+            
+            for n, section in enumerate(ai_service.split_into_sections(guide.content), start=1):
+                sources.append({"id": f"{guide.id}:{n}", "subject": guide.subject, "content": section})
+        
+        if not sources:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="The selected study guides have no content"
+            )
+        skipped = max(0, len(sources) - MAX_SECTIONS)
+        sources = sources[:MAX_SECTIONS]
+        
+        async with lifecycle.inflight():
+            decks = await ai_service.generate_flashcards(sources, difficulty, cards_per_section)
+        flashcards = [card for source in sources for card in decks[source["id"]]]
+        
+        result = await insert_in_batches(
+            flashcards,
+            lambda batch: db.create_flashcards_bulk(batch, current_user.id)
+        )
+        return APIResponse(
+            success=True,
+            message="Flashcards generated successfully from study guides!" if not skipped else
+                f"Flashcards generated from the first {len(sources)} sections; {skipped} more were skipped",
+            data={**result, "sections": len(sources), "skipped_sections": skipped}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate flashcards: {str(e)}"
+        )
+
 @router.get("/", response_model=List[Flashcard])
 async def get_flashcards(
+    request: Request,
     subject: Optional[str] = None,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get flashcards for the current user, optionally filtered by subject"""
     try:
+        etag = collection_versions.etag(current_user.id, FLASHCARDS, subject or "")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
         flashcards = await db.get_user_flashcards(current_user.id, subject)
-        return flashcards
+        return ORJSONResponse(flashcards, headers=cache_headers(etag))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -69,11 +247,18 @@ async def delete_flashcard(
 ):
     """Delete a flashcard"""
     try:
-        # TODO: Implement delete functionality
+        deleted = await db.delete_flashcard(flashcard_id, current_user.id)
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Flashcard not found"
+            )
         return APIResponse(
             success=True,
             message="Flashcard deleted successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
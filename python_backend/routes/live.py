@@ -0,0 +1,125 @@
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect, status
+from typing import Optional
+import orjson
+from models import APIResponse, LiveRoomCreate
+from database import SupabaseDatabase
+from routes.auth import get_current_user, get_database, get_service_database, verify_token
+from services.live_rooms import QUESTION_SECONDS, live_rooms
+
+router = APIRouter()
+
+@router.post("/rooms", response_model=APIResponse)
+async def create_live_room(
+    room_data: LiveRoomCreate,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Open a live room for one of the current user's quizzes, hosted by them"""
+    try:
+        # Players' answers and attempts are written by the server, for every
+        # player at once, so rooms need the service role
+        service_db = get_service_database()
+        if service_db is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Live rooms are not configured on this server"
+            )
+        
+        seconds = room_data.question_seconds or QUESTION_SECONDS
+        if not 5 <= seconds <= 600:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="question_seconds must be between 5 and 600"
+            )
+
+        key = await db.load_answer_key(room_data.quiz_id)
+        quiz = await db.get_quiz(room_data.quiz_id) if key else None
+        if not key or not quiz:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Quiz not found"
+            )
+        if key.owner_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+
+        # Questions are loaded once for the whole room; players never read the quiz themselves
+        questions = [
+            {
+                "id": entry.question_id,
+                "position": entry.position,
+                "total_questions": len(key),
+                "question": q.question,
+                "options": q.options,
+                "question_type": getattr(q.question_type, "value", q.question_type)
+            }
+            for entry, q in zip(key.entries, quiz.questions)
+        ]
+        room = live_rooms.create(room_data.quiz_id, current_user.id, key, questions, seconds, service_db)
+        if room is None:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many live rooms are open; try again later"
+            )
+
+        return APIResponse(
+            success=True,
+            message="Live room created",
+            data={"room_code": room.code, "room_id": room.id, "total_questions": len(questions)}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to create live room: {str(e)}"
+        )
+
+@router.websocket("/rooms/{code}")
+async def live_room_socket(
+    websocket: WebSocket,
+    code: str,
+    token: str = Query(...),
+    name: Optional[str] = None
+):
+    """Join a live room. Browsers can't set headers on WebSocket requests, so
+    the access token comes in the query string.
+
+    Players send {"type": "answer", "answer": ...}; the host sends
+    {"type": "start" | "next" | "reveal" | "end"}. The server pushes state,
+    question, answer_count (host only), reveal, result and finished messages.
+    """
+    try:
+        user = await verify_token(token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid authentication credentials")
+        return
+
+    room = live_rooms.get(code)
+    if room is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Room not found")
+        return
+
+    await websocket.accept()
+    connection = room.join(user.id, (name or user.email or "Player")[:40], websocket)
+    if connection is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Room is full or finished")
+        return
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                message = orjson.loads(raw)
+            except orjson.JSONDecodeError:
+                message = None
+            if not isinstance(message, dict):
+                room.send_to(user.id, {"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            room.handle(user.id, message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room.leave(user.id, connection)
@@ -1,8 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
 from models import ProgressSummary, SubjectProgress, StudySession, UserProfile, APIResponse
 from database import SupabaseDatabase
 from routes.auth import get_current_user, get_database
+from services.progress_export import EXPORT_FORMATS, EXPORT_SOURCES, encode_export, primed
+from services.streaks import current_streak
 
 router = APIRouter()
 
@@ -24,15 +28,18 @@ async def get_progress_summary(
         # TODO: Implement comprehensive progress calculation
         # For now, return mock data structure
         
+        weekly_activity = await db.get_activity(current_user.id, 7, user_profile.timezone)
+        
         return ProgressSummary(
             user_id=current_user.id,
             total_study_time=int(user_profile.total_study_time),
             total_quizzes=user_profile.total_quizzes,
             average_score=user_profile.average_score,
-            current_streak=user_profile.study_streak,
+            current_streak=current_streak(user_profile),
+            longest_streak=user_profile.longest_streak,
             subjects=[],  # Will be populated with actual data
             recent_sessions=[],  # Will be populated with actual data
-            weekly_activity=[]  # Will be populated with actual data
+            weekly_activity=weekly_activity
         )
     except HTTPException:
         raise
@@ -65,6 +72,29 @@ async def get_subject_progress(
             detail=f"Failed to fetch subject progress: {str(e)}"
         )
 
+@router.get("/activity", response_model=APIResponse)
+async def get_activity(
+    days: int = Query(30, ge=1, le=366),
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Daily study totals for charts (sessions, minutes, average score, minutes per subject)"""
+    try:
+        user_profile = await db.get_user_profile(current_user.id)
+        activity = await db.get_activity(current_user.id, days, user_profile.timezone if user_profile else None)
+        return APIResponse(
+            success=True,
+            message="Activity retrieved successfully",
+            data={"days": days, "activity": activity}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch activity: {str(e)}"
+        )
+
 @router.post("/sessions", response_model=APIResponse)
 async def record_study_session(
     activity_type: str,
@@ -100,15 +130,15 @@ async def get_analytics(
 ):
     """Get detailed analytics and insights"""
     try:
-        # TODO: Implement detailed analytics
-        # This would include trends, predictions, recommendations, etc.
+        # TODO: Implement trends and insights
+        model = await db.load_mastery(current_user.id)
         
         return APIResponse(
             success=True,
             message="Analytics data retrieved successfully",
             data={
                 "trends": [],
-                "recommendations": [],
+                "recommendations": model.recommend(limit=5)["subjects"],
                 "insights": []
             }
         )
@@ -116,4 +146,77 @@ async def get_analytics(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch analytics: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/next", response_model=APIResponse)
+async def get_study_next(
+    limit: int = Query(10, ge=1, le=50),
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """What to study next: weakest subjects, then the flashcards and questions
+    the user is least likely to get right, ranked by their mastery model"""
+    try:
+        model = await db.load_mastery(current_user.id)
+        return APIResponse(
+            success=True,
+            message="Recommendations retrieved successfully",
+            data=model.recommend(limit)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch recommendations: {str(e)}"
+        )
+
+@router.get("/export")
+async def export_progress(
+    format: str = "ndjson",
+    include: List[str] = Query(["attempts", "sessions"]),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Stream the user's quiz attempts and study sessions as NDJSON or CSV.
+
+    Rows are read in keyset-paged batches and written out as they arrive,
+    so memory use doesn't grow with the size of the history. `since` and
+    `until` filter on completion time (inclusive / exclusive).
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format; use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    unknown = [name for name in include if name not in EXPORT_SOURCES]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown export source(s): {', '.join(unknown)}"
+        )
+    
+    async def pages():
+        for name in dict.fromkeys(include):
+            table, record_type = EXPORT_SOURCES[name]
+            async for rows in db.iter_user_history(table, current_user.id, since, until):
+                yield record_type, rows
+    
+    try:
+        body = encode_export(await primed(pages()), format)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to export progress: {str(e)}"
+        )
+    
+    filename = f"progress-{datetime.now().strftime('%Y%m%d')}.{format}"
+    return StreamingResponse(
+        body,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
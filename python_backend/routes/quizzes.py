@@ -1,7 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Request
 from typing import List, Optional
-from models import Quiz, QuizCreate, QuizAttempt, QuizAttemptCreate, APIResponse, QuizDifficulty, QuizType
+from models import (
+    Quiz, QuizCreate, QuizAttempt, QuizAttemptCreate, APIResponse, QuizDifficulty, QuizType,
+    QuizQuestionView, QuestionAnswerSubmit, QuestionAnswerResult
+)
 from database import SupabaseDatabase
+from responses import ORJSONResponse, not_modified, cache_headers, dump_json
+from services.answer_keys import AnswerKey, attempt_score, grade_answer, grade_answers
+from services.mastery import Outcome, question_item
+from services.collection_versions import collection_versions, QUIZZES, QUIZ_ATTEMPTS
+from services.response_cache import response_cache
+from services.bulk_import import iter_upload_records, quiz_csv_records, bulk_insert
+from services.lifecycle import lifecycle
+from services.question_dedup import AllDuplicatesError
+from services.rate_limit import ai_rate_limit
 from routes.auth import get_current_user, get_database
 
 router = APIRouter()
@@ -26,15 +38,56 @@ async def create_quiz(
             detail=f"Failed to create quiz: {str(e)}"
         )
 
+@router.post("/bulk", response_model=APIResponse)
+async def bulk_create_quizzes(
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Create many quizzes from a JSON array, NDJSON stream or CSV upload.
+
+    CSV uploads have one question per row (title, subject, difficulty,
+    quiz_type, question, options, correct_answer, explanation); consecutive
+    rows with the same title become one quiz.
+    """
+    try:
+        kind, records = iter_upload_records(request)
+        if kind == "csv":
+            records = quiz_csv_records(records)
+        
+        result = await bulk_insert(
+            records,
+            QuizCreate,
+            lambda batch: db.create_quizzes_bulk(batch, current_user.id)
+        )
+        return APIResponse(
+            success=result["failed"] == 0,
+            message=f"Created {result['created']} quizzes, {result['failed']} failed",
+            data=result
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to import quizzes: {str(e)}"
+        )
+
 @router.get("/", response_model=List[Quiz])
 async def get_user_quizzes(
+    request: Request,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get all quizzes for the current user"""
     try:
+        etag = collection_versions.etag(current_user.id, QUIZZES)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
         quizzes = await db.get_user_quizzes(current_user.id)
-        return quizzes
+        return ORJSONResponse(quizzes, headers=cache_headers(etag))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -44,11 +97,23 @@ async def get_user_quizzes(
 @router.get("/{quiz_id}", response_model=Quiz)
 async def get_quiz(
     quiz_id: str,
+    request: Request,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get a specific quiz by ID"""
     try:
+        # A tag is only ever issued to the quiz's owner, so a match implies access
+        etag = collection_versions.etag(current_user.id, QUIZZES, quiz_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        # Quizzes are immutable once created, so serve the precompressed body
+        entry = response_cache.get(("quiz", quiz_id))
+        if entry and entry.owner_id == current_user.id:
+            return entry.response(request, cache_headers(etag))
+        
         quiz = await db.get_quiz(quiz_id)
         if not quiz:
             raise HTTPException(
@@ -63,7 +128,8 @@ async def get_quiz(
                 detail="Access denied"
             )
         
-        return quiz
+        entry = response_cache.put(("quiz", quiz_id), dump_json(quiz), owner_id=quiz.user_id)
+        return entry.response(request, cache_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
@@ -72,6 +138,96 @@ async def get_quiz(
             detail=f"Failed to fetch quiz: {str(e)}"
         )
 
+async def _owned_answer_key(db: SupabaseDatabase, quiz_id: str, user_id: str) -> AnswerKey:
+    key = await db.load_answer_key(quiz_id)
+    if key is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Quiz not found"
+        )
+    if key.owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    return key
+
+def _question_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Question not found"
+    )
+
+@router.get("/{quiz_id}/questions/{n}", response_model=QuizQuestionView)
+async def get_quiz_question(
+    quiz_id: str,
+    n: int,
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Get question n (1-based) of a quiz, without its answer or explanation"""
+    try:
+        etag = collection_versions.etag(current_user.id, QUIZZES, quiz_id, f"q{n}")
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        entry = response_cache.get(("quiz_question", quiz_id, n))
+        if entry and entry.owner_id == current_user.id:
+            return entry.response(request, cache_headers(etag))
+        
+        key = await _owned_answer_key(db, quiz_id, current_user.id)
+        if not key.at(n):
+            raise _question_not_found()
+        
+        question = await db.get_quiz_question(quiz_id, n)
+        if not question:
+            raise _question_not_found()
+        
+        view = QuizQuestionView(total_questions=len(key), **question)
+        entry = response_cache.put(("quiz_question", quiz_id, n), dump_json(view), owner_id=key.owner_id)
+        return entry.response(request, cache_headers(etag))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to fetch question: {str(e)}"
+        )
+
+@router.post("/{quiz_id}/questions/{n}/answer", response_model=QuestionAnswerResult)
+async def answer_quiz_question(
+    quiz_id: str,
+    n: int,
+    submission: QuestionAnswerSubmit,
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Grade an answer to question n against the quiz's cached answer key"""
+    try:
+        key = await _owned_answer_key(db, quiz_id, current_user.id)
+        entry = key.at(n)
+        if not entry:
+            raise _question_not_found()
+        
+        credit = grade_answer(submission.user_answer, entry)
+        return QuestionAnswerResult(
+            question_id=entry.question_id,
+            position=entry.position,
+            is_correct=credit == 1.0,
+            credit=credit,
+            correct_answer=entry.correct_answer,
+            explanation=entry.explanation
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to grade answer: {str(e)}"
+        )
+
 @router.post("/{quiz_id}/attempts", response_model=APIResponse)
 async def submit_quiz_attempt(
     quiz_id: str,
@@ -82,25 +238,35 @@ async def submit_quiz_attempt(
     """Submit a quiz attempt"""
     try:
         # Verify quiz exists and user has access
-        quiz = await db.get_quiz(quiz_id)
-        if not quiz:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Quiz not found"
-            )
+        key = await _owned_answer_key(db, quiz_id, current_user.id)
         
-        # Grade the answers
+        # Match answers by question id, falling back to answer order
+        graded = []
         for i, answer in enumerate(attempt_data.answers):
-            correct_answer = quiz.questions[i].correct_answer
-            answer.is_correct = answer.user_answer.lower().strip() == correct_answer.lower().strip()
+            entry = key.by_id(answer.question_id) or key.at(i + 1)
+            if not entry:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Answer {i + 1} does not match a question in this quiz"
+                )
+            graded.append((answer.user_answer, entry))
+        
+        # Grade the whole attempt at once
+        for answer, credit in zip(attempt_data.answers, grade_answers(graded)):
+            answer.credit = credit
+            answer.is_correct = credit == 1.0
         
         # Record the attempt
         attempt_id = await db.create_quiz_attempt(attempt_data, current_user.id)
         
         # Update user statistics
         correct_count = sum(1 for answer in attempt_data.answers if answer.is_correct)
-        score = (correct_count / len(attempt_data.answers)) * 100
+        score = attempt_score(attempt_data.answers)
         await db.update_user_stats(current_user.id, score, 0)  # TODO: track time_taken
+        await db.record_mastery(current_user.id, [
+            Outcome(question_item(quiz_id, entry.question_id), key.subject, answer.credit, entry.difficulty)
+            for answer, (_, entry) in zip(attempt_data.answers, graded)
+        ])
         
         return APIResponse(
             success=True,
@@ -122,20 +288,26 @@ async def submit_quiz_attempt(
 
 @router.get("/attempts/history", response_model=List[QuizAttempt])
 async def get_quiz_attempts(
+    request: Request,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get quiz attempt history for the current user"""
     try:
+        etag = collection_versions.etag(current_user.id, QUIZ_ATTEMPTS)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
         attempts = await db.get_user_quiz_attempts(current_user.id)
-        return attempts
+        return ORJSONResponse(attempts, headers=cache_headers(etag))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch quiz attempts: {str(e)}"
         )
 
-@router.post("/generate-from-pdf", response_model=APIResponse)
+@router.post("/generate-from-pdf", response_model=APIResponse, dependencies=[Depends(ai_rate_limit("generate_quiz", per_minute=2, burst=3))])
 async def generate_quiz_from_pdf(
     file: UploadFile = File(...),
     subject: str = "General",
@@ -177,14 +349,26 @@ async def generate_quiz_from_pdf(
                 detail="Could not extract text from PDF. Please ensure the PDF contains readable text."
             )
         
+        # Load the user's question index so near-duplicates of existing questions are dropped
+        question_index = await db.load_question_index(current_user.id, subject)
+        
         # Generate quiz questions using AI
-        questions = await ai_service.generate_quiz_questions(
-            content=extracted_text,
-            subject=subject,
-            difficulty=difficulty,
-            quiz_type=quiz_type,
-            num_questions=num_questions
-        )
+        try:
+            async with lifecycle.inflight():
+                questions = await ai_service.generate_quiz_questions(
+                    content=extracted_text,
+                    subject=subject,
+                    difficulty=difficulty,
+                    quiz_type=quiz_type,
+                    num_questions=num_questions,
+                    question_index=question_index
+                )
+        except AllDuplicatesError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Every question generated from this PDF is already in your {subject} quizzes. "
+                       "Try other content, another difficulty or another quiz type."
+            )
         
         if not questions:
             raise HTTPException(
@@ -0,0 +1,43 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Depends, status, Query
+from typing import List, Optional
+from models import APIResponse
+from database import SupabaseDatabase
+from routes.auth import get_current_user, get_database
+from services.search_index import search_index, STUDY_GUIDE, FLASHCARD, QUESTION
+
+router = APIRouter()
+
+@router.get("/", response_model=APIResponse)
+async def search(
+    q: str,
+    types: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    current_user = Depends(get_current_user),
+    db: SupabaseDatabase = Depends(get_database)
+):
+    """Search the current user's study guides, flashcards and quiz questions"""
+    try:
+        if types:
+            unknown = set(types) - {STUDY_GUIDE, FLASHCARD, QUESTION}
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Unknown result types: {', '.join(sorted(unknown))}"
+                )
+        
+        await db.ensure_search_index(current_user.id)
+        results = await asyncio.to_thread(search_index.search, current_user.id, q, types, limit)
+        
+        return APIResponse(
+            success=True,
+            message=f"Found {len(results)} results",
+            data={"query": q, "results": results}
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Search failed: {str(e)}"
+        )
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, status, Request
 from typing import List
 from models import StudyGuide, StudyGuideCreate, APIResponse
 from database import SupabaseDatabase
+from responses import ORJSONResponse, not_modified, cache_headers, dump_json
+from services.collection_versions import collection_versions, STUDY_GUIDES
+from services.response_cache import response_cache
 from routes.auth import get_current_user, get_database
 
 router = APIRouter()
@@ -28,13 +31,19 @@ async def create_study_guide(
 
 @router.get("/", response_model=List[StudyGuide])
 async def get_study_guides(
+    request: Request,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get all study guides for the current user"""
     try:
+        etag = collection_versions.etag(current_user.id, STUDY_GUIDES)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
         guides = await db.get_user_study_guides(current_user.id)
-        return guides
+        return ORJSONResponse(guides, headers=cache_headers(etag))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -44,16 +53,40 @@ async def get_study_guides(
 @router.get("/{guide_id}", response_model=StudyGuide)
 async def get_study_guide(
     guide_id: str,
+    request: Request,
     current_user = Depends(get_current_user),
     db: SupabaseDatabase = Depends(get_database)
 ):
     """Get a specific study guide by ID"""
     try:
-        # TODO: Implement get single study guide
-        raise HTTPException(
-            status_code=status.HTTP_501_NOT_IMPLEMENTED,
-            detail="Feature not implemented yet"
-        )
+        etag = collection_versions.etag(current_user.id, STUDY_GUIDES, guide_id)
+        cached = not_modified(request, etag)
+        if cached:
+            return cached
+        
+        # Each stored version of a guide is immutable, so the body is cached per
+        # version; an update in any worker changes the tag and so the key
+        entry = response_cache.get(("study_guide", guide_id, etag)) if etag else None
+        if entry and entry.owner_id == current_user.id:
+            return entry.response(request, cache_headers(etag))
+        
+        guide = await db.get_study_guide(guide_id)
+        if not guide:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Study guide not found"
+            )
+        
+        if guide.user_id != current_user.id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
+            )
+        
+        if not etag:
+            return ORJSONResponse(guide, headers=cache_headers(etag))
+        entry = response_cache.put(("study_guide", guide_id, etag), dump_json(guide), owner_id=guide.user_id)
+        return entry.response(request, cache_headers(etag))
     except HTTPException:
         raise
     except Exception as e:
@@ -71,11 +104,18 @@ async def update_study_guide(
 ):
     """Update a study guide"""
     try:
-        # TODO: Implement update functionality
+        updated = await db.update_study_guide(guide_id, guide_data, current_user.id)
+        if not updated:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Study guide not found"
+            )
         return APIResponse(
             success=True,
             message="Study guide updated successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -90,11 +130,18 @@ async def delete_study_guide(
 ):
     """Delete a study guide"""
     try:
-        # TODO: Implement delete functionality
+        deleted = await db.delete_study_guide(guide_id, current_user.id)
+        if not deleted:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Study guide not found"
+            )
         return APIResponse(
             success=True,
             message="Study guide deleted successfully"
         )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,24 +1,296 @@
 import os
 import json
+import asyncio
+import logging
+import time
+from textwrap import dedent
+from types import SimpleNamespace
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
-import PyPDF2
 from io import BytesIO
-from models import QuizQuestion, QuizDifficulty, QuizType
+from models import QuizQuestion, QuizDifficulty, QuizType, FlashcardCreate
+from services.circuit_breaker import CircuitOpenError, openai_breaker
+from services.hedging import Hedger, HedgeBudget
+from services.question_dedup import AllDuplicatesError, QuestionIndex, question_indexes
+from services.shared_cache import cache_key as shared_cache_key, shared_cache
+from services.singleflight import ai_flight
+from services.text_compaction import prepare_content, PAGE_BREAK
+
+logger = logging.getLogger(__name__)
+
+# Per-source content cap, matching the quiz prompt's limit
+FLASHCARD_SOURCE_CHARS = 4000
+# Total source characters packed into one flashcard generation request
+FLASHCARD_BATCH_CHARS = 12000
+
+# the newest OpenAI model is "gpt-5" which was released August 7, 2025. do not change this unless explicitly requested by the user
+# Model per task: the strong model where output quality matters, the fast one for short
+# conversational text. Override with AI_MODEL_<TASK>, e.g. AI_MODEL_MOTIVATION=gpt-5.
+MODEL_ROUTES = {
+    "quiz_generation": "gpt-5",
+    "flashcard_generation": "gpt-5",
+    "motivation": "gpt-5-mini",
+    "study_tips": "gpt-5-mini",
+}
+DEFAULT_MODEL = "gpt-5"
+
+# Tasks that may send a backup request once the primary runs past their p95 latency.
+# Hedging the long generation calls would double the most expensive requests, so only
+# the short ones are hedged unless AI_HEDGE_TASKS says otherwise.
+HEDGED_TASKS = frozenset(
+    task.strip() for task in os.getenv("AI_HEDGE_TASKS", "motivation,study_tips").split(",") if task.strip()
+)
+# Upper bound on backup requests as a fraction of all requests; 0 disables hedging
+HEDGE_MAX_RATIO = float(os.getenv("AI_HEDGE_MAX_RATIO", 0.05))
+
+# Tasks whose completions are kept in the shared cache and reused for identical
+# requests from any worker. Quiz generation is left out by default: asking for
+# another quiz from the same document is how users get fresh questions.
+RESULT_CACHE_TASKS = frozenset(
+    task.strip() for task in os.getenv("AI_RESULT_CACHE_TASKS", "flashcard_generation,study_tips").split(",") if task.strip()
+)
+RESULT_CACHE_TTL = float(os.getenv("AI_RESULT_CACHE_TTL", 7 * 24 * 3600))
+
+def model_for(task: str) -> str:
+    return os.getenv(f"AI_MODEL_{task.upper()}", MODEL_ROUTES.get(task, DEFAULT_MODEL))
+
+FLASHCARD_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "decks": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "source_id": {"type": "string"},
+                    "flashcards": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "front": {"type": "string"},
+                                "back": {"type": "string"},
+                                "tags": {"type": "array", "items": {"type": "string"}}
+                            },
+                            "required": ["front", "back", "tags"],
+                            "additionalProperties": False
+                        }
+                    }
+                },
+                "required": ["source_id", "flashcards"],
+                "additionalProperties": False
+            }
+        }
+    },
+    "required": ["decks"],
+    "additionalProperties": False
+}
+
+# Prompts are laid out static-first: everything that is the same across calls
+# (system prompt, instructions, per-type format and JSON example) comes before
+# anything that varies, so requests share the longest possible prefix and the
+# provider's prompt cache can serve it. Static parts are built once at import.
+QUIZ_SYSTEM_PROMPT = dedent("""
+    You are an expert educational content creator. Generate high-quality quiz questions based on the provided content. Always respond with valid JSON in the exact format requested.
+
+    Requirements:
+    - Match the requested difficulty level
+    - Focus on key concepts and important details
+    - Ensure questions test understanding, not just memorization
+    - Make questions clear and unambiguous
+""").strip()
+
+_QUIZ_FORMATS = {
+    QuizType.MULTIPLE_CHOICE: (
+        """
+        For each question, provide:
+        - question: The question text
+        - options: Array of 4 possible answers (A, B, C, D)
+        - correct_answer: The letter of the correct option (A, B, C, or D)
+        - explanation: Brief explanation of why the answer is correct
+        """,
+        {"question": "Question text here?", "options": ["A", "B", "C", "D"], "correct_answer": "A", "explanation": "Explanation of the correct answer"}
+    ),
+    QuizType.TRUE_FALSE: (
+        """
+        For each question, provide:
+        - question: The question text (should be answerable with true/false)
+        - options: ["True", "False"]
+        - correct_answer: Either "True" or "False"
+        - explanation: Brief explanation of why the answer is correct
+        """,
+        {"question": "Statement or question here?", "options": ["True", "False"], "correct_answer": "True", "explanation": "Explanation of the correct answer"}
+    ),
+    QuizType.SHORT_ANSWER: (
+        """
+        For each question, provide:
+        - question: The question text
+        - options: null (not needed for short answers)
+        - correct_answer: The expected answer
+        - explanation: Brief explanation or key points for the answer
+        """,
+        {"question": "Question text here?", "options": None, "correct_answer": "Expected answer", "explanation": "Key points for the answer"}
+    )
+}
+# Static head of the quiz user message for each quiz type
+QUIZ_INSTRUCTIONS = {
+    quiz_type.value: dedent(fields).strip()
+    + "\n\nRespond with JSON in this exact format:\n"
+    + json.dumps({"questions": [example]})
+    for quiz_type, (fields, example) in _QUIZ_FORMATS.items()
+}
+
+FLASHCARD_SYSTEM_PROMPT = dedent("""
+    You are an expert educational content creator. Write concise, accurate flashcards that each test a single fact or concept from the provided material.
+
+    Requirements:
+    - front: a short question or term
+    - back: a concise answer or definition (1-3 sentences)
+    - tags: 1-3 short topic tags
+    - Only use facts stated in the source
+    - Return one deck per source, with source_id set to the source's id
+""").strip()
+
+MOTIVATION_SYSTEM_PROMPT = dedent("""
+    You are a supportive and knowledgeable study coach. Create personalized, motivating messages that encourage learning and celebrate progress. Keep messages concise (2-3 sentences) and genuinely inspiring.
+
+    The message should:
+    - Be genuine and specific to the student's situation
+    - Acknowledge their progress or effort
+    - Provide encouragement for continued learning
+    - Be 2-3 sentences maximum
+    - Use the tone requested
+
+    Focus on growth mindset and celebrate their learning journey.
+""").strip()
+
+MOTIVATION_TEMPLATE_INSTRUCTIONS = dedent("""
+    Write several different messages that fit every student in this situation.
+    - Use the placeholder {name} for the student's first name, at most once per message
+    - Use the placeholder {streak} if you mention the study streak length
+    - Do not quote any other numbers, since scores differ between students
+    - Vary the wording and angle between messages
+
+    Return JSON: {"messages": ["...", "..."]}
+""").strip()
+
+class PromptCacheStats:
+    """Prompt token usage per task as reported by the API, including the tokens
+    served from the provider's prompt cache, with latency split by cache hits"""
+
+    def __init__(self):
+        self._tasks: Dict[str, Dict[str, float]] = {}
+
+    def record(self, task: str, usage: Any, seconds: float):
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", 0) or 0
+        stats = self._tasks.setdefault(task, {
+            "calls": 0, "prompt_tokens": 0, "cached_tokens": 0,
+            "cache_hit_calls": 0, "hit_seconds": 0.0, "miss_seconds": 0.0
+        })
+        stats["calls"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached_tokens
+        if cached_tokens:
+            stats["cache_hit_calls"] += 1
+            stats["hit_seconds"] += seconds
+        else:
+            stats["miss_seconds"] += seconds
+        logger.debug("%s: %d prompt tokens, %d cached, %.2fs", task, prompt_tokens, cached_tokens, seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        snapshot = {}
+        for task, stats in self._tasks.items():
+            hits, misses = stats["cache_hit_calls"], stats["calls"] - stats["cache_hit_calls"]
+            snapshot[task] = {
+                "calls": stats["calls"],
+                "prompt_tokens": stats["prompt_tokens"],
+                "cached_tokens": stats["cached_tokens"],
+                "cached_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0,
+                "cache_hit_calls": hits,
+                "avg_seconds_hit": round(stats["hit_seconds"] / hits, 3) if hits else None,
+                "avg_seconds_miss": round(stats["miss_seconds"] / misses, 3) if misses else None
+            }
+        return snapshot
+
+def _cached_completion(content: str):
+    """Stand-in for a ChatCompletion rebuilt from a cached message"""
+    return SimpleNamespace(
+        choices=[SimpleNamespace(index=0, message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+        usage=None
+    )
 
 class AIService:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._client = None
+        self.hedger = Hedger(HedgeBudget(HEDGE_MAX_RATIO))
+        self.prompt_cache = PromptCacheStats()
+    
+    @property
+    def client(self):
+        """OpenAI client, imported and constructed on first use"""
+        if self._client is None:
+            from openai import OpenAI
+            # OPENAI_BASE_URL points the client at a proxy or a local fake server
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None)
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+        
+    async def chat_completion(self, task: str, cache_key: Optional[str] = None, **params):
+        """Create a chat completion for `task` off the event loop.
+
+        The model comes from the task's route in MODEL_ROUTES. Concurrent
+        requests with identical parameters (same prompt, model and options,
+        e.g. the same PDF generated with the same settings) share a single
+        upstream call, and calls for hedged tasks that run past their p95
+        latency get one backup request, within HEDGE_MAX_RATIO. While the
+        task's OpenAI circuit breaker is open this raises CircuitOpenError at once.
+        `cache_key` (e.g. the quiz type) is sent as prompt_cache_key so calls
+        sharing a static prompt prefix are routed to the same prompt cache.
+        Completions for RESULT_CACHE_TASKS are answered from the shared cache
+        when any worker has already made the identical request.
+        """
+        params["model"] = model_for(task)
+        if cache_key is not None:
+            params["prompt_cache_key"] = f"{task}:{cache_key}"
+        key = shared_cache_key("ai", params)
+        cache_result = task in RESULT_CACHE_TASKS
+        if cache_result:
+            content = shared_cache.get(key)
+            if content is not None:
+                return _cached_completion(content.decode())
+
+        async def call():
+            response = await openai_breaker(task).call(lambda: self.hedger.run(
+                task,
+                lambda: self._create(task, params),
+                enabled=task in HEDGED_TASKS
+            ))
+            choice = response.choices[0]
+            if cache_result and choice.message.content and choice.finish_reason == "stop":
+                shared_cache.set(key, choice.message.content.encode(), RESULT_CACHE_TTL)
+            return response
+
+        return await ai_flight.do(key, call)
+    
+    async def _create(self, task: str, params: Dict[str, Any]):
+        started = time.perf_counter()
+        response = await asyncio.to_thread(self.client.chat.completions.create, **params)
+        self.prompt_cache.record(task, getattr(response, "usage", None), time.perf_counter() - started)
+        return response
         
     def extract_text_from_pdf(self, pdf_content: bytes) -> str:
-        """Extract text content from PDF file"""
+        """Extract text content from PDF file, with pages separated by form feeds"""
         try:
+            import PyPDF2
+            
             pdf_file = BytesIO(pdf_content)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
             
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            # Keep page boundaries so compaction can spot repeated headers/footers
+            text = PAGE_BREAK.join(page.extract_text() or "" for page in pdf_reader.pages)
             
             return text.strip()
         except Exception as e:
@@ -30,20 +302,32 @@ class AIService:
         subject: str,
         difficulty: str = "medium",
         quiz_type: str = "multiple_choice",
-        num_questions: int = 10
+        num_questions: int = 10,
+        question_index: Optional[QuestionIndex] = None,
+        max_content_tokens: Optional[int] = None
     ) -> List[QuizQuestion]:
-        """Generate quiz questions from content using AI"""
+        """Generate quiz questions from content using AI.
+
+        The content is compacted (page furniture, hyphenation, whitespace)
+        and packed into max_content_tokens (PROMPT_CONTENT_TOKEN_BUDGET by
+        default) before it goes into the prompt. When question_index (the
+        user's index for the subject) is given, near-duplicates of their
+        existing questions are dropped; if that drops every question,
+        AllDuplicatesError is raised.
+        """
         try:
+            content = prepare_content(content, max_content_tokens)
+            
             # Create a detailed prompt for quiz generation
             prompt = self._create_quiz_prompt(content, subject, difficulty, quiz_type, num_questions)
             
-            # the newest OpenAI model is "gpt-5" which was released August 7, 2025. do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-5",
+            response = await self.chat_completion(
+                task="quiz_generation",
+                cache_key=quiz_type,
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are an expert educational content creator. Generate high-quality quiz questions based on the provided content. Always respond with valid JSON in the exact format requested."
+                        "content": QUIZ_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -70,8 +354,16 @@ class AIService:
                 )
                 questions.append(question)
             
+            if question_index is not None:
+                keep = question_indexes.filter_new(question_index, [q.question for q in questions])
+                if questions and not keep:
+                    raise AllDuplicatesError(len(questions))
+                questions = [questions[i] for i in keep]
+            
             return questions
             
+        except (CircuitOpenError, AllDuplicatesError):
+            raise
         except Exception as e:
             raise Exception(f"Failed to generate quiz questions: {str(e)}")
     
@@ -83,59 +375,128 @@ class AIService:
         quiz_type: str, 
         num_questions: int
     ) -> str:
-        """Create a detailed prompt for quiz generation"""
+        """Create the quiz user message: the static instructions for the quiz type,
+        then the content, then the per-request settings"""
         
-        if quiz_type == "multiple_choice":
-            format_instructions = """
-            For each question, provide:
-            - question: The question text
-            - options: Array of 4 possible answers (A, B, C, D)
-            - correct_answer: The letter of the correct option (A, B, C, or D)
-            - explanation: Brief explanation of why the answer is correct
-            """
-        elif quiz_type == "true_false":
-            format_instructions = """
-            For each question, provide:
-            - question: The question text (should be answerable with true/false)
-            - options: ["True", "False"]
-            - correct_answer: Either "True" or "False"
-            - explanation: Brief explanation of why the answer is correct
-            """
-        else:  # short_answer
-            format_instructions = """
-            For each question, provide:
-            - question: The question text
-            - options: null (not needed for short answers)
-            - correct_answer: The expected answer
-            - explanation: Brief explanation or key points for the answer
-            """
-        
-        return f"""
-        Based on the following content about {subject}, create {num_questions} {difficulty} level {quiz_type.replace('_', ' ')} questions.
-
-        Content:
-        {content[:4000]}  # Limit content to avoid token limits
+        return (
+            f"{QUIZ_INSTRUCTIONS.get(quiz_type, QUIZ_INSTRUCTIONS['short_answer'])}\n\n"
+            f"Content:\n{content}\n\n"
+            f"Based on the content above about {subject}, create {num_questions} {difficulty} level "
+            f"{quiz_type.replace('_', ' ')} questions."
+        )
+    
+    def split_into_sections(self, content: str, max_chars: int = FLASHCARD_SOURCE_CHARS) -> List[str]:
+        """Split long content on paragraph boundaries into sections of at most max_chars"""
+        sections = []
+        current = ""
+        for paragraph in content.split("\n\n"):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            while len(paragraph) > max_chars:
+                if current:
+                    sections.append(current)
+                    current = ""
+                sections.append(paragraph[:max_chars])
+                paragraph = paragraph[max_chars:]
+            if current and len(current) + len(paragraph) + 2 > max_chars:
+                sections.append(current)
+                current = ""
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            sections.append(current)
+        return sections
+    
+    def _pack_flashcard_sources(self, sources: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """Group sources into batches that fit one generation request"""
+        batches = []
+        current = []
+        current_chars = 0
+        for source in sources:
+            size = len(source["content"])
+            if current and current_chars + size > FLASHCARD_BATCH_CHARS:
+                batches.append(current)
+                current = []
+                current_chars = 0
+            current.append(source)
+            current_chars += size
+        if current:
+            batches.append(current)
+        return batches
+    
+    async def generate_flashcards(
+        self,
+        sources: List[Dict[str, str]],
+        difficulty: str = "medium",
+        cards_per_source: int = 10
+    ) -> Dict[str, List[FlashcardCreate]]:
+        """Generate flashcards for several sources, packing them into as few requests as possible.
 
-        Requirements:
-        - Questions should be {difficulty} difficulty level
-        - Focus on key concepts and important details
-        - Ensure questions test understanding, not just memorization
-        - Make questions clear and unambiguous
-        
-        {format_instructions}
-
-        Respond with JSON in this exact format:
-        {{
-            "questions": [
-                {{
-                    "question": "Question text here?",
-                    "options": ["A", "B", "C", "D"] or ["True", "False"] or null,
-                    "correct_answer": "A" or "True" or "Expected answer",
-                    "explanation": "Explanation of the correct answer"
-                }}
-            ]
-        }}
+        Each source is a dict with "id", "subject" and "content" (extracted
+        PDF text, a study guide section, ...). Returns the generated cards
+        keyed by source id.
         """
+        try:
+            by_id = {source["id"]: source for source in sources}
+            flashcards: Dict[str, List[FlashcardCreate]] = {source_id: [] for source_id in by_id}
+            
+            for batch in self._pack_flashcard_sources(sources):
+                prompt = self._create_flashcard_prompt(batch, difficulty, cards_per_source)
+                
+                response = await self.chat_completion(
+                    task="flashcard_generation",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": FLASHCARD_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt
+                        }
+                    ],
+                    response_format={
+                        "type": "json_schema",
+                        "json_schema": {"name": "flashcard_decks", "schema": FLASHCARD_SCHEMA, "strict": True}
+                    },
+                    temperature=0.7
+                )
+                
+                result = json.loads(response.choices[0].message.content)
+                for deck in result.get("decks", []):
+                    source = by_id.get(deck.get("source_id"))
+                    if not source:
+                        continue
+                    for card in deck.get("flashcards", []):
+                        flashcards[source["id"]].append(FlashcardCreate(
+                            front=card["front"],
+                            back=card["back"],
+                            subject=source["subject"],
+                            difficulty=QuizDifficulty(difficulty.lower()),
+                            tags=card.get("tags", [])
+                        ))
+            
+            return flashcards
+            
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            raise Exception(f"Failed to generate flashcards: {str(e)}")
+    
+    def _create_flashcard_prompt(
+        self,
+        sources: List[Dict[str, str]],
+        difficulty: str,
+        cards_per_source: int
+    ) -> str:
+        """Create a prompt covering every source in a batch, with the settings after the sources"""
+        
+        source_blocks = "\n\n".join(
+            f"<source id=\"{source['id']}\" subject=\"{source['subject']}\">\n{source['content'][:FLASHCARD_SOURCE_CHARS]}\n</source>"
+            for source in sources
+        )
+        
+        return f"{source_blocks}\n\nCreate up to {cards_per_source} {difficulty} level flashcards for EACH source above."
     
     async def generate_motivation_message(
         self, 
@@ -148,13 +509,12 @@ class AIService:
         try:
             prompt = self._create_motivation_prompt(user_name, recent_performance, study_streak, preferred_tone)
             
-            # the newest OpenAI model is "gpt-5" which was released August 7, 2025. do not change this unless explicitly requested by the user
-            response = self.client.chat.completions.create(
-                model="gpt-5",
+            response = await self.chat_completion(
+                task="motivation",
                 messages=[
                     {
                         "role": "system",
-                        "content": "You are a supportive and knowledgeable study coach. Create personalized, motivating messages that encourage learning and celebrate progress. Keep messages concise (2-3 sentences) and genuinely inspiring."
+                        "content": MOTIVATION_SYSTEM_PROMPT
                     },
                     {
                         "role": "user",
@@ -178,6 +538,44 @@ class AIService:
             import random
             return random.choice(fallback_messages)
     
+    async def generate_motivation_templates(
+        self,
+        count: int,
+        recent_performance: Optional[Dict[str, Any]] = None,
+        study_streak: int = 0,
+        preferred_tone: str = "encouraging"
+    ) -> List[str]:
+        """Generate varied motivation messages for a whole group of students at once.
+
+        Built from the same prompt as generate_motivation_message, with
+        {name} and {streak} placeholders for the caller to fill in.
+        """
+        prompt = (
+            f"{MOTIVATION_TEMPLATE_INSTRUCTIONS}\n\n"
+            f"{self._create_motivation_prompt('{name}', recent_performance, study_streak, preferred_tone)}\n"
+            f"Write {count} messages."
+        )
+        
+        response = await self.chat_completion(
+            task="motivation",
+            cache_key="templates",
+            messages=[
+                {
+                    "role": "system",
+                    "content": MOTIVATION_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.9
+        )
+        
+        result = json.loads(response.choices[0].message.content)
+        return [message.strip() for message in result.get("messages", []) if isinstance(message, str) and message.strip()]
+    
     def _create_motivation_prompt(
         self,
         user_name: Optional[str],
@@ -185,42 +583,21 @@ class AIService:
         study_streak: int,
         preferred_tone: str
     ) -> str:
-        """Create prompt for motivation message generation"""
+        """Create the variable part of a motivation prompt (the guidance is in the system prompt)"""
         
-        name_part = f"for {user_name}" if user_name else "for this student"
-        
-        performance_context = ""
-        if recent_performance:
-            avg_score = recent_performance.get("average_score", 0)
-            recent_quizzes = recent_performance.get("recent_quizzes", 0)
+        lines = [
+            f"Create a personalized, {preferred_tone} motivational message {f'for {user_name}' if user_name else 'for this student'}.",
+            f"Current study streak: {study_streak} days" if study_streak > 0 else "Just starting their study journey"
+        ]
+        if recent_performance and recent_performance.get("average_score", 0) > 0:
             improvement = recent_performance.get("improvement", 0)
-            
-            if avg_score > 0:
-                performance_context = f"""
-                Recent performance:
-                - Average quiz score: {avg_score}%
-                - Quizzes completed recently: {recent_quizzes}
-                - Performance trend: {'+' if improvement > 0 else ''}{improvement}%
-                """
-        
-        streak_context = f"Current study streak: {study_streak} days" if study_streak > 0 else "Just starting their study journey"
-        
-        return f"""
-        Create a personalized, {preferred_tone} motivational message {name_part}.
-        
-        Context:
-        {streak_context}
-        {performance_context}
-        
-        The message should:
-        - Be genuine and specific to their situation
-        - Acknowledge their progress or effort
-        - Provide encouragement for continued learning
-        - Be 2-3 sentences maximum
-        - Have a {preferred_tone} tone
-        
-        Focus on growth mindset and celebrate their learning journey.
-        """
+            lines += [
+                "Recent performance:",
+                f"- Average quiz score: {recent_performance['average_score']}%",
+                f"- Quizzes completed recently: {recent_performance.get('recent_quizzes', 0)}",
+                f"- Performance trend: {'+' if improvement > 0 else ''}{improvement}%"
+            ]
+        return "\n".join(lines)
 
 # Create a singleton instance
 ai_service = AIService()
\ No newline at end of file
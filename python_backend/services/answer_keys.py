@@ -0,0 +1,108 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from services import short_answer
+from services.short_answer import AnswerProfile
+
+# Quizzes whose answer keys are kept in memory
+MAX_KEYS = int(os.getenv("ANSWER_KEY_CACHE_SIZE", 10000))
+
+class KeyEntry(NamedTuple):
+    question_id: str
+    position: int  # 1-based
+    correct_answer: str
+    explanation: Optional[str]
+    question_type: str
+    profile: Optional[AnswerProfile] = None  # short answers only
+    difficulty: Optional[str] = None
+
+class AnswerKey:
+    """Correct answers for one quiz, addressable by question id or position"""
+
+    __slots__ = ("quiz_id", "owner_id", "subject", "entries", "_by_id")
+
+    def __init__(self, quiz_id: str, owner_id: str, entries: List[KeyEntry], subject: Optional[str] = None):
+        self.quiz_id = quiz_id
+        self.owner_id = owner_id
+        self.subject = subject
+        self.entries = sorted(entries, key=lambda entry: entry.position)
+        self._by_id = {entry.question_id: entry for entry in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def at(self, position: int) -> Optional[KeyEntry]:
+        if 1 <= position <= len(self.entries):
+            return self.entries[position - 1]
+        return None
+
+    def by_id(self, question_id: str) -> Optional[KeyEntry]:
+        return self._by_id.get(question_id)
+
+    @classmethod
+    def from_rows(cls, quiz_id: str, owner_id: str, rows: List[Dict[str, Any]], subject: Optional[str] = None) -> "AnswerKey":
+        return cls(quiz_id, owner_id, [
+            KeyEntry(
+                row["id"], row["position"], row["correct_answer"], row.get("explanation"), row["question_type"],
+                answer_profile(row["question_type"], row["correct_answer"], row.get("answer_profile")),
+                row.get("difficulty")
+            )
+            for row in rows
+        ], subject)
+
+def answer_profile(question_type: str, correct_answer: str, stored: Optional[Dict[str, Any]] = None) -> Optional[AnswerProfile]:
+    """The short-answer profile stored with a question, computed when the row predates it"""
+    if question_type != "short_answer":
+        return None
+    return short_answer.profile_or_none(stored) or short_answer.profile(correct_answer)
+
+def grade_answers(graded: List[tuple]) -> List[float]:
+    """Credit between 0 and 1 for each (user answer, key entry) pair of an attempt.
+    Short answers are scored together in one similarity pass; other types need an exact match."""
+    credits: List[float] = [0.0] * len(graded)
+    fuzzy = []
+    for i, (user_answer, entry) in enumerate(graded):
+        if entry.profile is not None:
+            fuzzy.append(i)
+        elif user_answer.lower().strip() == entry.correct_answer.lower().strip():
+            credits[i] = 1.0
+    for i, credit in zip(fuzzy, short_answer.grade_batch([(graded[i][1].profile, graded[i][0]) for i in fuzzy])):
+        credits[i] = credit
+    return credits
+
+def grade_answer(user_answer: str, entry: KeyEntry) -> float:
+    return grade_answers([(user_answer, entry)])[0]
+
+def attempt_score(answers: List[Any]) -> float:
+    """Percentage score of graded answers, counting partial credit where given"""
+    if not answers:
+        return 0
+    earned = sum(answer.credit if answer.credit is not None else float(bool(answer.is_correct)) for answer in answers)
+    return round(earned / len(answers) * 100, 2)
+
+class AnswerKeyCache:
+    """LRU of answer keys by quiz id. Quizzes are immutable once created, so keys never go stale."""
+
+    def __init__(self, max_keys: int = MAX_KEYS):
+        self.max_keys = max_keys
+        self._keys: "OrderedDict[str, AnswerKey]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id: str) -> Optional[AnswerKey]:
+        with self._lock:
+            key = self._keys.get(quiz_id)
+            if key is not None:
+                self._keys.move_to_end(quiz_id)
+            return key
+
+    def put(self, key: AnswerKey):
+        with self._lock:
+            self._keys[key.quiz_id] = key
+            self._keys.move_to_end(key.quiz_id)
+            if len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+# Create a singleton instance
+answer_keys = AnswerKeyCache()
@@ -0,0 +1,268 @@
+import codecs
+import csv
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, ValidationError
+import orjson
+from services.circuit_breaker import CircuitOpenError
+
+# Rows per multi-row INSERT
+BATCH_SIZE = 500
+# Hard cap on rows accepted by a single bulk request
+MAX_BULK_ROWS = 10000
+# Separator for list-valued CSV cells (flashcard tags, quiz options)
+CSV_LIST_SEPARATOR = "|"
+
+# (row number, parsed record or None, parse error or None)
+RawRecord = Tuple[int, Optional[Dict[str, Any]], Optional[str]]
+
+def _content_kind(request: Request) -> str:
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type == "application/json":
+        return "json"
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Bulk uploads must be application/json, application/x-ndjson or text/csv"
+    )
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    """Decode the request body into lines as chunks arrive"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in request.stream():
+        pending += decoder.decode(chunk)
+        lines = pending.split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+async def _iter_ndjson(request: Request) -> AsyncIterator[RawRecord]:
+    row_number = 0
+    async for line in _iter_lines(request):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row_number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, "Each line must be a JSON object"
+            continue
+        yield row_number, record, None
+
+async def _iter_csv(request: Request) -> AsyncIterator[RawRecord]:
+    header: Optional[List[str]] = None
+    row_number = 0
+    buffered = ""
+    async for line in _iter_lines(request):
+        # A quoted cell may contain newlines; keep joining until quotes balance
+        buffered = f"{buffered}\n{line}" if buffered else line
+        if buffered.count('"') % 2:
+            continue
+        record_line, buffered = buffered, ""
+        if not record_line.strip():
+            continue
+        cells = next(csv.reader([record_line]))
+        if header is None:
+            header = [cell.strip().lower() for cell in cells]
+            continue
+        row_number += 1
+        if len(cells) != len(header):
+            yield row_number, None, f"Expected {len(header)} columns, got {len(cells)}"
+            continue
+        yield row_number, {key: value for key, value in zip(header, cells) if value != ""}, None
+    if buffered:
+        row_number += 1
+        yield row_number, None, "Unterminated quoted field"
+
+async def _iter_json_array(request: Request) -> AsyncIterator[RawRecord]:
+    try:
+        payload = orjson.loads(await request.body())
+    except orjson.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid JSON body: {e}"
+        )
+    if not isinstance(payload, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bulk JSON body must be an array"
+        )
+    for row_number, record in enumerate(payload, start=1):
+        if isinstance(record, dict):
+            yield row_number, record, None
+        else:
+            yield row_number, None, "Each item must be a JSON object"
+
+def iter_upload_records(request: Request) -> Tuple[str, AsyncIterator[RawRecord]]:
+    """Return the upload format and an async iterator over its raw records.
+
+    NDJSON and CSV bodies are decoded incrementally from the request
+    stream; JSON arrays are parsed in one go.
+    """
+    kind = _content_kind(request)
+    if kind == "ndjson":
+        return kind, _iter_ndjson(request)
+    if kind == "csv":
+        return kind, _iter_csv(request)
+    return kind, _iter_json_array(request)
+
+def split_csv_list(value: Any) -> Any:
+    """Turn a 'a|b|c' CSV cell into a list; leave other values untouched"""
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(CSV_LIST_SEPARATOR) if item.strip()]
+    return value
+
+async def flashcard_csv_records(records: AsyncIterator[RawRecord]) -> AsyncIterator[RawRecord]:
+    """Expand pipe-separated tag cells in flashcard CSV rows"""
+    async for row_number, record, parse_error in records:
+        if record and "tags" in record:
+            record["tags"] = split_csv_list(record["tags"])
+        yield row_number, record, parse_error
+
+async def quiz_csv_records(records: AsyncIterator[RawRecord]) -> AsyncIterator[RawRecord]:
+    """Group question-per-row quiz CSV into one QuizCreate-shaped record per quiz.
+
+    Consecutive rows sharing a title form one quiz; quiz-level columns are
+    read from the first row. Questions inherit the quiz's difficulty and
+    type unless the row overrides them.
+    """
+    current: Optional[Dict[str, Any]] = None
+    current_row = 0
+
+    async for row_number, record, parse_error in records:
+        if parse_error:
+            yield row_number, None, parse_error
+            continue
+        if current is None or record.get("title") != current.get("title"):
+            if current is not None:
+                yield current_row, current, None
+            current_row = row_number
+            current = {
+                key: record[key]
+                for key in ("title", "subject", "difficulty", "quiz_type", "estimated_time")
+                if key in record
+            }
+            current["questions"] = []
+        current["questions"].append({
+            "question": record.get("question"),
+            "options": split_csv_list(record.get("options")),
+            "correct_answer": record.get("correct_answer"),
+            "explanation": record.get("explanation"),
+            "difficulty": record.get("question_difficulty", current.get("difficulty")),
+            "question_type": record.get("question_type", current.get("quiz_type"))
+        })
+
+    if current is not None:
+        yield current_row, current, None
+
+def _rejected(exc: BaseException) -> bool:
+    """Whether an insert failed without writing anything.
+
+    PostgREST answering with an error means the statement (one multi-row
+    INSERT, so all or nothing) was rolled back; an open breaker means it
+    was never sent.
+    """
+    from postgrest.exceptions import APIError
+    return isinstance(exc, (APIError, CircuitOpenError))
+
+async def _flush_batch(
+    batch: List[Tuple[int, BaseModel]],
+    insert_batch: Callable[[List[BaseModel]], Awaitable[List[Optional[str]]]],
+    created_ids: List[str],
+    errors: List[Dict[str, Any]]
+):
+    """Insert a batch in one statement, falling back to row-by-row if the database rejected it.
+
+    Only a rejected batch is retried. After a timeout or a dropped
+    connection the insert may have committed, and retrying would create
+    every row twice, so the batch's rows are reported as failed instead.
+    """
+    try:
+        ids = await insert_batch([item for _, item in batch])
+        created_ids.extend(i for i in ids if i)
+    except Exception as e:
+        if not _rejected(e):
+            for row_number, _ in batch:
+                errors.append({"row": row_number, "errors": [f"Insert outcome unknown, check before retrying: {e}"]})
+            batch.clear()
+            return
+        for row_number, item in batch:
+            try:
+                ids = await insert_batch([item])
+                created_ids.extend(i for i in ids if i)
+            except Exception as e:
+                errors.append({"row": row_number, "errors": [str(e)]})
+    batch.clear()
+
+def _bulk_result(created_ids: List[str], errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    errors.sort(key=lambda error: error["row"])
+    return {
+        "created": len(created_ids),
+        "failed": len(errors),
+        "ids": created_ids,
+        "errors": errors
+    }
+
+async def bulk_insert(
+    records: AsyncIterator[RawRecord],
+    model: Type[BaseModel],
+    insert_batch: Callable[[List[BaseModel]], Awaitable[List[Optional[str]]]],
+    batch_size: int = BATCH_SIZE
+) -> Dict[str, Any]:
+    """Validate records as they arrive and insert them in multi-row batches.
+
+    Invalid rows are reported and skipped. If a batch insert fails, its rows
+    are retried one at a time so a single bad row can't sink the others.
+    """
+    created_ids: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    batch: List[Tuple[int, BaseModel]] = []
+    total = 0
+
+    async for row_number, record, parse_error in records:
+        total += 1
+        if total > MAX_BULK_ROWS:
+            errors.append({"row": row_number, "errors": [f"Bulk uploads are limited to {MAX_BULK_ROWS} rows"]})
+            break
+        if parse_error:
+            errors.append({"row": row_number, "errors": [parse_error]})
+            continue
+        try:
+            item = model.model_validate(record)
+        except ValidationError as e:
+            errors.append({
+                "row": row_number,
+                "errors": [f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()]
+            })
+            continue
+        batch.append((row_number, item))
+        if len(batch) >= batch_size:
+            await _flush_batch(batch, insert_batch, created_ids, errors)
+
+    if batch:
+        await _flush_batch(batch, insert_batch, created_ids, errors)
+
+    return _bulk_result(created_ids, errors)
+
+async def insert_in_batches(
+    items: List[BaseModel],
+    insert_batch: Callable[[List[BaseModel]], Awaitable[List[Optional[str]]]],
+    batch_size: int = BATCH_SIZE
+) -> Dict[str, Any]:
+    """Insert already-validated models in multi-row batches (same result shape as bulk_insert)"""
+    created_ids: List[str] = []
+    errors: List[Dict[str, Any]] = []
+    for start in range(0, len(items), batch_size):
+        batch = list(enumerate(items[start:start + batch_size], start=start + 1))
+        await _flush_batch(batch, insert_batch, created_ids, errors)
+    return _bulk_result(created_ids, errors)
@@ -0,0 +1,309 @@
+import functools
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from fastapi import HTTPException, status
+from responses import dump_json
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(HTTPException):
+    """Raised without calling upstream while a breaker is open.
+
+    It is an HTTPException so routes that re-raise HTTPException answer
+    503 with Retry-After instead of wrapping it in a 500.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        self.breaker = name
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{name} is temporarily unavailable, please retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+
+class CircuitBreaker:
+    """Stop calling an upstream that is failing or too slow.
+
+    Closed: calls pass through and their outcomes go into a window of the
+    last `window` calls. A call counts as bad if it raised an error that
+    `is_failure` accepts or took longer than `slow_call_seconds`. Once the
+    window holds at least `min_calls` outcomes and the bad share reaches
+    `failure_threshold`, the breaker opens.
+
+    Open: calls fail immediately with CircuitOpenError for `open_seconds`.
+
+    Half-open: up to `probes` calls are let through; if they all succeed
+    the breaker closes with a fresh window, and any bad probe reopens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: float = 0.5,
+        min_calls: int = 5,
+        window: int = 20,
+        slow_call_seconds: float = 10.0,
+        open_seconds: float = 30.0,
+        probes: int = 1,
+        is_failure: Callable[[BaseException], bool] = lambda exc: True
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.is_failure = is_failure
+
+        self.state = CLOSED
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_passed = 0
+        self.stats = {"calls": 0, "failures": 0, "slow_calls": 0, "rejected": 0, "opened": 0}
+
+    @classmethod
+    def from_env(cls, name: str, *prefixes: str, **defaults) -> "CircuitBreaker":
+        """Build a breaker whose settings can be overridden with <prefix>_BREAKER_* variables.
+
+        With several prefixes, a variable under a later one wins.
+        """
+        settings = {
+            "failure_threshold": float, "min_calls": int, "window": int,
+            "slow_call_seconds": float, "open_seconds": float, "probes": int
+        }
+        for prefix in prefixes:
+            for setting, cast in settings.items():
+                value = os.getenv(f"{prefix}_BREAKER_{setting.upper()}")
+                if value is not None:
+                    defaults[setting] = cast(value)
+        return cls(name, **defaults)
+
+    def _retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def _admit(self):
+        if self.state == OPEN:
+            if self._retry_after() > 0:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.name, self._retry_after())
+            self.state = HALF_OPEN
+            self._probes_started = 0
+            self._probes_passed = 0
+
+        if self.state == HALF_OPEN:
+            if self._probes_started >= self.probes:
+                self.stats["rejected"] += 1
+                raise CircuitOpenError(self.name, 1)
+            self._probes_started += 1
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.stats["opened"] += 1
+
+    def _record(self, bad: bool):
+        if self.state == HALF_OPEN:
+            if bad:
+                self._open()
+                return
+            self._probes_passed += 1
+            if self._probes_passed >= self.probes:
+                self.state = CLOSED
+                self._outcomes.clear()
+            return
+        if self.state != CLOSED:
+            # A call admitted before the breaker opened finished late
+            return
+
+        self._outcomes.append(bad)
+        if len(self._outcomes) >= self.min_calls:
+            if sum(self._outcomes) / len(self._outcomes) >= self.failure_threshold:
+                self._open()
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self._admit()
+        self.stats["calls"] += 1
+        started = time.monotonic()
+        try:
+            result = await fn()
+        except Exception as exc:
+            # Errors the upstream answered with still show that it is up
+            bad = self.is_failure(exc)
+            if bad:
+                self.stats["failures"] += 1
+            self._record(bad)
+            raise
+        except BaseException:
+            # Cancelled before an outcome; free the probe slot if this was one
+            if self.state == HALF_OPEN:
+                self._probes_started -= 1
+            raise
+        slow = time.monotonic() - started > self.slow_call_seconds
+        if slow:
+            self.stats["slow_calls"] += 1
+        self._record(slow)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.state == OPEN and self._retry_after() == 0:
+            state = HALF_OPEN
+        else:
+            state = self.state
+        window = list(self._outcomes)
+        return {
+            "state": state,
+            "failure_rate": round(sum(window) / len(window), 3) if window else 0.0,
+            "window_calls": len(window),
+            "retry_after": round(self._retry_after(), 1) if state == OPEN else 0.0,
+            **self.stats
+        }
+
+class BreakerRegistry:
+    """All circuit breakers in this worker, for the metrics endpoint"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def register(self, breaker: CircuitBreaker) -> CircuitBreaker:
+        self._breakers[breaker.name] = breaker
+        return breaker
+
+    def get(self, name: str) -> Optional[CircuitBreaker]:
+        return self._breakers.get(name)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.snapshot() for name, breaker in self._breakers.items()}
+
+class LastGood:
+    """Most recent successful result per key, kept to answer reads while a breaker is open.
+
+    Eviction is by the approximate serialized size of the results rather
+    than by entry count: one user's full quiz history can outweigh
+    thousands of single study guides. Lists are sized from a few sampled
+    items, so keeping a result never costs a second full serialization.
+    A result larger than an eighth of the budget is not kept at all, so it
+    can't flush everything else.
+    """
+
+    _MISSING = object()
+    # Items of a list result serialized to estimate its size
+    SIZE_SAMPLES = 3
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._results: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self.served = 0
+
+    @classmethod
+    def estimate_size(cls, result: Any) -> int:
+        if isinstance(result, list) and len(result) > cls.SIZE_SAMPLES:
+            step = len(result) / cls.SIZE_SAMPLES
+            sample = [result[int(i * step)] for i in range(cls.SIZE_SAMPLES)]
+            return len(dump_json(sample)) * len(result) // cls.SIZE_SAMPLES
+        return len(dump_json(result))
+
+    def put(self, key: Hashable, result: Any):
+        try:
+            size = self.estimate_size(result)
+        except TypeError:
+            return
+        old = self._results.pop(key, None)
+        if old is not None:
+            self.current_bytes -= old[1]
+        if size > self.max_bytes // 8:
+            return
+        self._results[key] = (result, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted) = self._results.popitem(last=False)
+            self.current_bytes -= evicted
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._results.get(key)
+        return entry[0] if entry is not None else self._MISSING
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._results), "bytes": self.current_bytes, "max_bytes": self.max_bytes, "served": self.served}
+
+def serve_stale(store: LastGood, key: Callable[..., Hashable]):
+    """Decorate an async read so it returns its last good result instead of failing fast.
+
+    Only CircuitOpenError falls back; other errors propagate as before,
+    and a key that was never read successfully still raises.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            result_key = (method.__name__, key(*args, **kwargs))
+            try:
+                result = await method(self, *args, **kwargs)
+            except CircuitOpenError:
+                stale = store.get(result_key)
+                if stale is LastGood._MISSING:
+                    raise
+                store.served += 1
+                return stale
+            store.put(result_key, result)
+            return result
+        return wrapper
+    return decorator
+
+def _openai_outage(exc: BaseException) -> bool:
+    # 4xx other than 429 means the request was bad, not that OpenAI is down
+    status_code = getattr(exc, "status_code", None)
+    return status_code is None or status_code >= 500 or status_code == 429
+
+def _supabase_outage(exc: BaseException) -> bool:
+    # PostgREST answering with an error (constraint, RLS, bad filter) means the
+    # database is up; transport errors and timeouts are what should trip the breaker
+    from postgrest.exceptions import APIError
+    from supabase_auth.errors import AuthError, AuthRetryableError
+    if isinstance(exc, APIError):
+        return False
+    if isinstance(exc, AuthError) and not isinstance(exc, AuthRetryableError):
+        return (getattr(exc, "status", 0) or 0) >= 500
+    return True
+
+# Seconds after which an OpenAI call counts as slow, per task: long generations on
+# the strong model routinely take a minute or more, short texts on the fast one a few seconds
+AI_SLOW_CALL_SECONDS = {
+    "quiz_generation": 180.0,
+    "flashcard_generation": 180.0,
+    "motivation": 20.0,
+    "study_tips": 30.0,
+}
+
+# Create singleton instances
+breakers = BreakerRegistry()
+
+def openai_breaker(task: str) -> CircuitBreaker:
+    """The OpenAI breaker for one task, created on first use.
+
+    Tasks get separate breakers so slow or failing quiz generation can't
+    cut off the short motivation and study-tip calls. Settings come from
+    AI_BREAKER_* and then AI_<TASK>_BREAKER_*, e.g.
+    AI_QUIZ_GENERATION_BREAKER_SLOW_CALL_SECONDS.
+    """
+    name = f"openai:{task}"
+    return breakers.get(name) or breakers.register(CircuitBreaker.from_env(
+        name, "AI", f"AI_{task.upper()}",
+        slow_call_seconds=AI_SLOW_CALL_SECONDS.get(task, 60.0),
+        is_failure=_openai_outage
+    ))
+
+supabase_breaker = breakers.register(CircuitBreaker.from_env(
+    "supabase", "DB",
+    slow_call_seconds=5.0,
+    open_seconds=15.0,
+    is_failure=_supabase_outage
+))
+db_last_good = LastGood(int(os.getenv("DB_STALE_MAX_BYTES", 32 * 1024 * 1024)))
@@ -0,0 +1,54 @@
+import hashlib
+from typing import Optional
+
+from services.shared_cache import CacheBackend, shared_cache
+
+# Collections whose reads are versioned for conditional GETs
+QUIZZES = "quizzes"
+QUIZ_ATTEMPTS = "quiz_attempts"
+FLASHCARDS = "flashcards"
+STUDY_GUIDES = "study_guides"
+# The mastery model row; its counter tells each worker when its in-memory copy is stale
+MASTERY = "mastery"
+
+class CollectionVersions:
+    """Per-user, per-collection write counters used to build strong ETags.
+
+    Every write through SupabaseDatabase bumps the counter for the
+    affected (user, collection) pair, so a read endpoint can tell whether
+    the client's cached copy is still current without querying Supabase.
+    The counters are generations in the shared cache, so a write handled
+    by one worker changes the tags every worker on the host issues. The
+    store's epoch is mixed into each tag so counters that restart from
+    zero in a recreated store never collide with tags issued earlier.
+    While the counters can't be read, no tag is issued at all.
+    """
+
+    def __init__(self, cache: CacheBackend):
+        self.cache = cache
+
+    @staticmethod
+    def _name(user_id: str, collection: str) -> str:
+        return f"{collection}:{user_id}"
+
+    def get(self, user_id: str, collection: str) -> Optional[int]:
+        return self.cache.generation(self._name(user_id, collection))
+
+    def bump(self, user_id: str, collection: str) -> Optional[int]:
+        return self.cache.bump(self._name(user_id, collection))
+
+    def etag(self, user_id: str, collection: str, *parts: str) -> Optional[str]:
+        """Strong ETag for a representation of a user's collection, or None.
+
+        ``parts`` distinguishes representations built from the same
+        collection (a single item id, a subject filter, ...).
+        """
+        epoch = self.cache.epoch
+        version = self.get(user_id, collection)
+        if epoch is None or version is None:
+            return None
+        raw = "|".join([epoch, user_id, collection, str(version), *[str(p) for p in parts]])
+        return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+# Create a singleton instance
+collection_versions = CollectionVersions(shared_cache)
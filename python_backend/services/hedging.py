@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Completed calls needed before a task's p95 is trusted for hedging
+MIN_SAMPLES = 20
+# Latency samples kept per task
+WINDOW = 200
+
+class LatencyTracker:
+    """Rolling window of recent call latencies for one task"""
+
+    def __init__(self, window: int = WINDOW):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self._samples) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+class HedgeBudget:
+    """Caps hedges to a fraction of primary requests.
+
+    Each primary request earns `ratio` of a token (up to `burst` tokens);
+    each hedge spends a whole one, so over time at most `ratio` of
+    requests are duplicated.
+    """
+
+    def __init__(self, ratio: float, burst: float = 10.0):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = burst if ratio > 0 else 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+class Hedger:
+    """Issue a backup request when the primary runs past the task's p95 latency.
+
+    Whichever attempt succeeds first wins and the other is cancelled
+    (a call already running in a worker thread finishes in the background,
+    which is the extra spend the budget accounts for). If one attempt
+    fails, the other still gets a chance to succeed.
+    """
+
+    def __init__(self, budget: HedgeBudget, percentile: float = 0.95):
+        self.budget = budget
+        self.percentile = percentile
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0}
+
+    def tracker(self, task: str) -> LatencyTracker:
+        tracker = self.trackers.get(task)
+        if tracker is None:
+            tracker = self.trackers[task] = LatencyTracker()
+        return tracker
+
+    async def _timed(self, task: str, call: Callable[[], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        result = await call()
+        self.tracker(task).record(time.monotonic() - started)
+        return result
+
+    async def run(self, task: str, call: Callable[[], Awaitable[T]], enabled: bool = True) -> T:
+        self.stats["requests"] += 1
+        self.budget.earn()
+        delay = self.tracker(task).percentile(self.percentile) if enabled else None
+
+        primary = asyncio.ensure_future(self._timed(task, call))
+        attempts = [primary]
+        try:
+            if delay is None:
+                return await primary
+
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not self.budget.try_spend():
+                return await primary
+
+            self.stats["hedges"] += 1
+            backup = asyncio.ensure_future(self._timed(task, call))
+            attempts.append(backup)
+            pending = {primary, backup}
+            first_error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        if attempt is backup:
+                            self.stats["hedge_wins"] += 1
+                        return attempt.result()
+                    first_error = first_error or attempt.exception()
+            raise first_error
+        finally:
+            # Covers the losing attempt and the caller being cancelled
+            for attempt in attempts:
+                if not attempt.done():
+                    attempt.cancel()
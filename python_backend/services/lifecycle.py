@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, List
+
+logger = logging.getLogger(__name__)
+
+class Lifecycle:
+    """Tracks in-flight long-running work and buffered writers for graceful shutdown.
+
+    Routes wrap slow work (AI generation) in ``inflight()``; components that
+    buffer writes register a flush callback. On shutdown ``drain()`` waits
+    for in-flight work to finish, up to a timeout, then runs every flush.
+    """
+
+    def __init__(self):
+        self._inflight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._flushers: List[Callable[[], Awaitable[None]]] = []
+        self.draining = False
+
+    @property
+    def inflight_count(self) -> int:
+        return self._inflight
+
+    @asynccontextmanager
+    async def inflight(self):
+        self._inflight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._inflight -= 1
+            if self._inflight == 0:
+                self._idle.set()
+
+    def register_flush(self, flush: Callable[[], Awaitable[None]]):
+        self._flushers.append(flush)
+
+    async def drain(self, timeout: float):
+        self.draining = True
+        if self._inflight:
+            logger.info("Waiting for %d in-flight requests before shutdown", self._inflight)
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Shutting down with %d requests still in flight", self._inflight)
+        for flush in self._flushers:
+            try:
+                await flush()
+            except Exception:
+                logger.exception("Flush failed during shutdown")
+
+# Create a singleton instance
+lifecycle = Lifecycle()
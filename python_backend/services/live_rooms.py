@@ -0,0 +1,394 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+from services.answer_keys import AnswerKey, attempt_score, grade_answer
+from services.lifecycle import lifecycle
+from services.mastery import Outcome, question_item
+from models import QuizAnswer
+
+logger = logging.getLogger(__name__)
+
+# Default time allowed per question
+QUESTION_SECONDS = int(os.getenv("LIVE_QUESTION_SECONDS", 30))
+# Rooms and players per room held by one worker
+MAX_ROOMS = int(os.getenv("LIVE_MAX_ROOMS", 500))
+MAX_PLAYERS = int(os.getenv("LIVE_MAX_PLAYERS", 200))
+# Messages queued for one client before it is dropped as too slow to keep up
+SEND_QUEUE = int(os.getenv("LIVE_SEND_QUEUE", 32))
+# Rooms with nobody connected are discarded after this long without activity
+IDLE_SECONDS = int(os.getenv("LIVE_ROOM_IDLE_SECONDS", 7200))
+# Longest answer accepted from a player
+MAX_ANSWER_CHARS = int(os.getenv("LIVE_MAX_ANSWER_CHARS", 500))
+# Players listed in broadcast scoreboards
+SCOREBOARD_SIZE = 10
+# Points for a fully correct answer; the slowest correct answer still gets half
+MAX_POINTS = 1000
+
+_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+CODE_LENGTH = 6
+
+LOBBY = "lobby"
+QUESTION = "question"
+REVEAL = "reveal"
+FINISHED = "finished"
+
+# WebSocket close code for a client that can't keep up (RFC 6455 "try again later")
+SLOW_CLIENT = 1013
+
+class Connection:
+    """One client socket. Sends go through a bounded queue drained by the
+    connection's own task, so a broadcast never waits on a slow reader."""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+        self._queue: "asyncio.Queue[Optional[str]]" = asyncio.Queue(SEND_QUEUE)
+        self._writer = asyncio.create_task(self._write())
+
+    def send(self, message: str) -> bool:
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _write(self):
+        try:
+            while True:
+                message = await self._queue.get()
+                if message is None:
+                    return
+                await self.websocket.send_text(message)
+        except Exception:
+            pass
+
+    async def close(self, code: int = 1000):
+        # Let already queued messages (e.g. the final scoreboard) go out first
+        try:
+            self._queue.put_nowait(None)
+            await asyncio.wait_for(self._writer, 1)
+        except (asyncio.QueueFull, asyncio.TimeoutError):
+            self._writer.cancel()
+        try:
+            await self.websocket.close(code)
+        except Exception:
+            pass
+
+class Player:
+    __slots__ = ("user_id", "name", "points", "seconds", "answers")
+
+    def __init__(self, user_id: str, name: str):
+        self.user_id = user_id
+        self.name = name
+        self.points = 0
+        self.seconds = 0.0  # time spent on the questions answered
+        self.answers: Dict[str, QuizAnswer] = {}  # question id -> graded answer
+
+def _encode(payload: Dict[str, Any]) -> str:
+    return orjson.dumps(payload).decode()
+
+class LiveRoom:
+    """A quiz run live by a host for connected players.
+
+    All state is in memory and mutated only from the event loop. Each
+    broadcast is serialized once and queued on every connection. Answers
+    are graded in memory as they arrive; when a question closes, its
+    answers are handed to the registry as one batch, and when the room
+    finishes every player's attempt goes out as one batch.
+    """
+
+    def __init__(self, code: str, quiz_id: str, host_id: str, key: AnswerKey,
+                 questions: List[Dict[str, Any]], question_seconds: int, db):
+        self.id = str(uuid.uuid4())
+        self.code = code
+        self.quiz_id = quiz_id
+        self.host_id = host_id
+        self.key = key
+        self.questions = questions  # public views, in position order
+        self.question_seconds = question_seconds
+        self.db = db
+        self.state = LOBBY
+        self.position = 0
+        self.players: Dict[str, Player] = {}
+        self.connections: Dict[str, Connection] = {}
+        self.last_activity = time.monotonic()
+        self._answered: List[str] = []  # player ids that answered the open question
+        self._opened_at = 0.0
+        self._timer: Optional[asyncio.Task] = None
+
+    # Connections
+    def join(self, user_id: str, name: str, websocket) -> Optional[Connection]:
+        if user_id != self.host_id and user_id not in self.players:
+            if len(self.players) >= MAX_PLAYERS or self.state == FINISHED:
+                return None
+            self.players[user_id] = Player(user_id, name)
+        previous = self.connections.get(user_id)
+        if previous is not None:
+            # Reconnect from another tab or after a network blip: keep the newest socket
+            asyncio.create_task(previous.close())
+        connection = self.connections[user_id] = Connection(websocket)
+        self.last_activity = time.monotonic()
+        connection.send(_encode(self.snapshot(user_id)))
+        self.broadcast({"type": "players", "players": [player.name for player in self.players.values()]})
+        return connection
+
+    def leave(self, user_id: str, connection: Connection):
+        if self.connections.get(user_id) is connection:
+            del self.connections[user_id]
+        self.last_activity = time.monotonic()
+
+    def broadcast(self, payload: Dict[str, Any], host_only: bool = False):
+        message = _encode(payload)
+        for user_id, connection in list(self.connections.items()):
+            if host_only and user_id != self.host_id:
+                continue
+            if not connection.send(message):
+                del self.connections[user_id]
+                asyncio.create_task(connection.close(SLOW_CLIENT))
+
+    def send_to(self, user_id: str, payload: Dict[str, Any]):
+        connection = self.connections.get(user_id)
+        if connection is not None:
+            connection.send(_encode(payload))
+
+    # Messages
+    def handle(self, user_id: str, message: Dict[str, Any]):
+        self.last_activity = time.monotonic()
+        kind = message.get("type")
+        if kind == "answer" and user_id in self.players:
+            self.answer(user_id, message.get("answer", ""))
+        elif user_id != self.host_id:
+            self.send_to(user_id, {"type": "error", "detail": "Only the host can control the room"})
+        elif kind in ("start", "next"):
+            if self.state in (LOBBY, REVEAL):
+                self.open_next()
+        elif kind == "reveal":
+            if self.state == QUESTION:
+                self.close_question()
+        elif kind == "end":
+            self.finish()
+        else:
+            self.send_to(user_id, {"type": "error", "detail": f"Unknown message type: {kind}"})
+
+    def open_next(self):
+        if self.position >= len(self.questions):
+            self.finish()
+            return
+        self.position += 1
+        self.state = QUESTION
+        self._answered = []
+        self._opened_at = time.monotonic()
+        self.broadcast({"type": "question", "seconds": self.question_seconds, **self.questions[self.position - 1]})
+        self._timer = asyncio.create_task(self._close_after(self.position, self.question_seconds))
+
+    async def _close_after(self, position: int, seconds: float):
+        await asyncio.sleep(seconds)
+        if self.state == QUESTION and self.position == position:
+            self.close_question()
+
+    def answer(self, user_id: str, user_answer: Any):
+        if isinstance(user_answer, (int, float)) and not isinstance(user_answer, bool):
+            user_answer = str(user_answer)
+        if not isinstance(user_answer, str) or len(user_answer) > MAX_ANSWER_CHARS:
+            self.send_to(user_id, {"type": "error", "detail": f"Answers must be text of at most {MAX_ANSWER_CHARS} characters"})
+            return
+        if self.state != QUESTION:
+            self.send_to(user_id, {"type": "error", "detail": "No question is open"})
+            return
+        entry = self.key.at(self.position)
+        player = self.players[user_id]
+        if entry.question_id in player.answers:
+            return
+        credit = grade_answer(user_answer, entry)
+        player.answers[entry.question_id] = QuizAnswer(
+            question_id=entry.question_id, user_answer=user_answer, is_correct=credit == 1.0, credit=credit
+        )
+        elapsed = min(time.monotonic() - self._opened_at, self.question_seconds)
+        player.points += round(MAX_POINTS * credit * (1 - elapsed / self.question_seconds / 2))
+        player.seconds += elapsed
+        self._answered.append(user_id)
+        self.send_to(user_id, {"type": "answer_received", "position": self.position})
+        self.broadcast({"type": "answer_count", "answered": len(self._answered), "players": len(self.players)}, host_only=True)
+        if len(self._answered) == len(self.players):
+            self.close_question()
+
+    def close_question(self):
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+        self._timer = None
+        self.state = REVEAL
+        entry = self.key.at(self.position)
+        answered_at = datetime.now(timezone.utc).isoformat()
+        rows = []
+        for user_id in self._answered:
+            answer = self.players[user_id].answers[entry.question_id]
+            rows.append({
+                "room_id": self.id,
+                "quiz_id": self.quiz_id,
+                "question_id": entry.question_id,
+                "user_id": user_id,
+                "user_answer": answer.user_answer,
+                "credit": answer.credit,
+                "answered_at": answered_at
+            })
+        live_rooms.persist(self.db, "answers", rows)
+
+        self.broadcast({
+            "type": "reveal",
+            "position": self.position,
+            "correct_answer": entry.correct_answer,
+            "explanation": entry.explanation,
+            "answered": len(self._answered),
+            "scoreboard": self.scoreboard()
+        })
+        for user_id, player in self.players.items():
+            answer = player.answers.get(entry.question_id)
+            self.send_to(user_id, {
+                "type": "result",
+                "position": self.position,
+                "credit": answer.credit if answer else 0.0,
+                "points": player.points
+            })
+
+    def finish(self):
+        """End the game and save an attempt for every player.
+
+        Attempts cover the questions that were actually asked, so a game the
+        host ends early (or a worker shutting down mid-game) doesn't count
+        the rest of the quiz as wrong; a game that never started saves none.
+        """
+        if self.state == FINISHED:
+            return
+        if self.state == QUESTION:
+            self.close_question()
+        self.state = FINISHED
+        asked = self.key.entries[:self.position]
+        attempts = []
+        outcomes: Dict[str, List[Outcome]] = {}
+        for player in self.players.values() if asked else ():
+            answers = [
+                player.answers.get(entry.question_id)
+                or QuizAnswer(question_id=entry.question_id, user_answer="", is_correct=False, credit=0.0)
+                for entry in asked
+            ]
+            attempts.append({
+                "quiz_id": self.quiz_id,
+                "user_id": player.user_id,
+                "answers": [answer.model_dump() for answer in answers],
+                "score": attempt_score(answers),
+                "total_questions": len(answers),
+                "correct_answers": sum(1 for answer in answers if answer.is_correct),
+                "time_taken": round(player.seconds)
+            })
+            outcomes[player.user_id] = [
+                Outcome(question_item(self.quiz_id, entry.question_id), self.key.subject, answer.credit, entry.difficulty)
+                for entry, answer in zip(asked, answers)
+            ]
+        live_rooms.persist(self.db, "attempts", attempts, outcomes)
+        self.broadcast({"type": "finished", "scoreboard": self.scoreboard(limit=len(self.players))})
+        for connection in self.connections.values():
+            asyncio.create_task(connection.close())
+        self.connections.clear()
+
+    # Views
+    def scoreboard(self, limit: int = SCOREBOARD_SIZE) -> List[Dict[str, Any]]:
+        ranked = sorted(self.players.values(), key=lambda player: -player.points)[:limit]
+        return [{"rank": rank, "name": player.name, "points": player.points} for rank, player in enumerate(ranked, start=1)]
+
+    def snapshot(self, user_id: str) -> Dict[str, Any]:
+        state = {
+            "type": "state",
+            "room": self.code,
+            "state": self.state,
+            "position": self.position,
+            "total_questions": len(self.questions),
+            "host": user_id == self.host_id,
+            "players": [player.name for player in self.players.values()],
+            "scoreboard": self.scoreboard()
+        }
+        if self.state == QUESTION:
+            remaining = self.question_seconds - (time.monotonic() - self._opened_at)
+            state["question"] = {"seconds": max(0, round(remaining)), **self.questions[self.position - 1]}
+        if user_id in self.players:
+            state["points"] = self.players[user_id].points
+        return state
+
+class LiveRoomRegistry:
+    """This worker's live rooms, plus the queue of batched writes they produce.
+
+    Rooms live in one worker's memory, so every client of a room must reach
+    the same worker (run live rooms on a single worker, or route by room
+    code). Writes are applied in order by one background task; anything
+    still queued at shutdown is flushed by the lifecycle drain.
+    """
+
+    def __init__(self):
+        self.rooms: Dict[str, LiveRoom] = {}
+        self._pending: List[Tuple[Any, str, List[Dict[str, Any]], Any]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self.stats = {"rooms_created": 0, "batches_written": 0, "rows_written": 0, "write_failures": 0}
+
+    def create(self, quiz_id: str, host_id: str, key: AnswerKey, questions: List[Dict[str, Any]],
+               question_seconds: int, db) -> Optional[LiveRoom]:
+        self._discard_idle()
+        if len(self.rooms) >= MAX_ROOMS:
+            return None
+        code = "".join(secrets.choice(_CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        while code in self.rooms:
+            code = "".join(secrets.choice(_CODE_ALPHABET) for _ in range(CODE_LENGTH))
+        room = self.rooms[code] = LiveRoom(code, quiz_id, host_id, key, questions, question_seconds, db)
+        self.stats["rooms_created"] += 1
+        return room
+
+    def get(self, code: str) -> Optional[LiveRoom]:
+        return self.rooms.get(code.upper())
+
+    def _discard_idle(self):
+        now = time.monotonic()
+        for code, room in list(self.rooms.items()):
+            if not room.connections and (room.state == FINISHED or now - room.last_activity > IDLE_SECONDS):
+                # An abandoned game still saves what its players answered
+                room.finish()
+                del self.rooms[code]
+
+    def persist(self, db, kind: str, rows: List[Dict[str, Any]], outcomes: Optional[Dict[str, List[Outcome]]] = None):
+        if not rows:
+            return
+        self._pending.append((db, kind, rows, outcomes))
+        if self._writer is None or self._writer.done():
+            self._writer = asyncio.create_task(self.flush())
+
+    async def flush(self):
+        while self._pending:
+            db, kind, rows, outcomes = self._pending.pop(0)
+            try:
+                if kind == "answers":
+                    await db.save_live_answers(rows)
+                else:
+                    await db.record_live_attempts(rows, outcomes or {})
+                self.stats["batches_written"] += 1
+                self.stats["rows_written"] += len(rows)
+            except Exception:
+                self.stats["write_failures"] += 1
+                logger.exception("Failed to write %d live %s rows", len(rows), kind)
+
+    async def shutdown(self):
+        """Finish every game so its answers and attempts are saved, then flush every queued write"""
+        for room in self.rooms.values():
+            if room.state != FINISHED:
+                room.broadcast({"type": "closing"})
+                room.finish()
+        if self._writer is not None and not self._writer.done():
+            await self._writer
+        await self.flush()
+
+# Create a singleton instance
+live_rooms = LiveRoomRegistry()
+lifecycle.register_flush(live_rooms.shutdown)
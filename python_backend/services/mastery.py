@@ -0,0 +1,250 @@
+import heapq
+import math
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Learning rates for subject skill and item difficulty; each shrinks as
+# evidence accumulates (rate / (1 + RATE_DECAY * observations)) down to MIN_RATE
+SKILL_RATE = float(os.getenv("MASTERY_SKILL_RATE", 0.4))
+DIFFICULTY_RATE = float(os.getenv("MASTERY_DIFFICULTY_RATE", 0.3))
+RATE_DECAY = float(os.getenv("MASTERY_RATE_DECAY", 0.05))
+MIN_RATE = 0.05
+# Days for a flashcard's predicted recall to halve since its last review
+CARD_HALF_LIFE_DAYS = float(os.getenv("MASTERY_CARD_HALF_LIFE_DAYS", 7))
+# Users whose models are kept in memory
+MAX_MODELS = int(os.getenv("MASTERY_CACHE_SIZE", 5000))
+# Items (questions and flashcards) a model tracks; past this the ones seen
+# longest ago are forgotten, which bounds the stored row every answer rewrites
+MAX_ITEMS = int(os.getenv("MASTERY_MAX_ITEMS", 1000))
+
+# Starting item difficulty (in logits) for each labelled difficulty
+PRIOR_DIFFICULTY = {"easy": -0.7, "medium": 0.0, "hard": 0.7}
+
+QUESTION = "q"
+FLASHCARD = "c"
+
+def question_item(quiz_id: str, question_id: str) -> str:
+    return f"{QUESTION}:{quiz_id}:{question_id}"
+
+def flashcard_item(flashcard_id: str) -> str:
+    return f"{FLASHCARD}:{flashcard_id}"
+
+def rating_outcome(rating: int) -> float:
+    """Flashcard self-rating (1 = hard ... 5 = easy) as an outcome between 0 and 1"""
+    return (min(max(rating, 1), 5) - 1) / 4
+
+def _sigmoid(x: float) -> float:
+    return 1 / (1 + math.exp(-x))
+
+def _rate(base: float, observations: int) -> float:
+    return max(MIN_RATE, base / (1 + RATE_DECAY * observations))
+
+class Outcome(NamedTuple):
+    item: str  # question_item(...) or flashcard_item(...)
+    subject: str
+    outcome: float  # 0-1, partial credit allowed
+    difficulty: Optional[str] = None  # label used as the prior for a new item
+
+class MasteryModel:
+    """Online Elo / Rasch model of one user's learning.
+
+    The chance of answering item i in subject s is sigmoid(skill[s] - difficulty[i]);
+    every graded answer nudges both towards the observed outcome, so the model
+    stays current without revisiting history. Per-subject and per-item state
+    lives in parallel typed arrays indexed by slot, with one dict per kind
+    mapping names to slots.
+    """
+
+    def __init__(self, user_id: str, version: int = 0):
+        self.user_id = user_id
+        self.version = version  # of the stored row this model was read from (0 = not stored yet)
+        self.subjects: List[str] = []
+        self._subject_slots: Dict[str, int] = {}
+        self.skill = array("d")
+        self.skill_n = array("I")
+        self.items: List[str] = []
+        self._item_slots: Dict[str, int] = {}
+        self.item_subject = array("I")
+        self.difficulty = array("d")
+        self.item_n = array("I")
+        self.last_seen = array("d")  # unix time
+
+    def __len__(self):
+        return len(self.items)
+
+    def _subject_slot(self, subject: str) -> int:
+        slot = self._subject_slots.get(subject)
+        if slot is None:
+            slot = self._subject_slots[subject] = len(self.subjects)
+            self.subjects.append(subject)
+            self.skill.append(0.0)
+            self.skill_n.append(0)
+        return slot
+
+    def _item_slot(self, item: str, subject_slot: int, difficulty: Optional[str]) -> int:
+        slot = self._item_slots.get(item)
+        if slot is None:
+            slot = self._item_slots[item] = len(self.items)
+            self.items.append(item)
+            self.item_subject.append(subject_slot)
+            self.difficulty.append(PRIOR_DIFFICULTY.get(difficulty or "", 0.0))
+            self.item_n.append(0)
+            self.last_seen.append(0.0)
+        return slot
+
+    def knows(self, item: str) -> bool:
+        return item in self._item_slots
+
+    def subject_of(self, item: str) -> Optional[str]:
+        slot = self._item_slots.get(item)
+        return self.subjects[self.item_subject[slot]] if slot is not None else None
+
+    def update(self, outcomes: Iterable[Outcome], at: Optional[float] = None):
+        at = at if at is not None else time.time()
+        for item, subject, outcome, difficulty in outcomes:
+            s = self._subject_slot(subject)
+            i = self._item_slot(item, s, difficulty)
+            surprise = outcome - _sigmoid(self.skill[s] - self.difficulty[i])
+            self.skill[s] += _rate(SKILL_RATE, self.skill_n[s]) * surprise
+            self.difficulty[i] -= _rate(DIFFICULTY_RATE, self.item_n[i]) * surprise
+            self.skill_n[s] += 1
+            self.item_n[i] += 1
+            self.last_seen[i] = at
+        if len(self.items) > MAX_ITEMS:
+            # Drop a tenth at a time so a full model isn't rebuilt on every new item
+            self.prune(MAX_ITEMS - MAX_ITEMS // 10)
+
+    def prune(self, max_items: int):
+        """Forget all but the max_items items seen most recently"""
+        if len(self.items) <= max_items:
+            return
+        keep = sorted(heapq.nlargest(max_items, range(len(self.items)), key=self.last_seen.__getitem__))
+        self.items = [self.items[slot] for slot in keep]
+        self._item_slots = {item: slot for slot, item in enumerate(self.items)}
+        self.item_subject = array("I", (self.item_subject[slot] for slot in keep))
+        self.difficulty = array("d", (self.difficulty[slot] for slot in keep))
+        self.item_n = array("I", (self.item_n[slot] for slot in keep))
+        self.last_seen = array("d", (self.last_seen[slot] for slot in keep))
+
+    def copy(self) -> "MasteryModel":
+        model = MasteryModel(self.user_id, self.version)
+        model.subjects = list(self.subjects)
+        model._subject_slots = dict(self._subject_slots)
+        model.skill = array("d", self.skill)
+        model.skill_n = array("I", self.skill_n)
+        model.items = list(self.items)
+        model._item_slots = dict(self._item_slots)
+        model.item_subject = array("I", self.item_subject)
+        model.difficulty = array("d", self.difficulty)
+        model.item_n = array("I", self.item_n)
+        model.last_seen = array("d", self.last_seen)
+        return model
+
+    def success_probability(self, slot: int, now: float) -> float:
+        p = _sigmoid(self.skill[self.item_subject[slot]] - self.difficulty[slot])
+        if self.items[slot].startswith(FLASHCARD):
+            p *= 0.5 ** ((now - self.last_seen[slot]) / 86400 / CARD_HALF_LIFE_DAYS)
+        return p
+
+    def recommend(self, limit: int = 10, now: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Weakest subjects, then the flashcards and questions least likely to be answered right now"""
+        now = now if now is not None else time.time()
+        subjects = sorted(range(len(self.subjects)), key=lambda s: self.skill[s])[:limit]
+        weakest: Dict[str, List[Tuple[float, int]]] = {QUESTION: [], FLASHCARD: []}
+        for slot in range(len(self.items)):
+            weakest[self.items[slot][0]].append((self.success_probability(slot, now), slot))
+
+        def ranked(kind: str) -> List[Tuple[float, int]]:
+            return heapq.nsmallest(limit, weakest[kind])
+
+        return {
+            "subjects": [
+                {"subject": self.subjects[s], "mastery": round(_sigmoid(self.skill[s]), 3), "answered": self.skill_n[s]}
+                for s in subjects
+            ],
+            "flashcards": [
+                {
+                    "flashcard_id": self.items[slot][2:],
+                    "subject": self.subjects[self.item_subject[slot]],
+                    "recall_probability": round(p, 3)
+                }
+                for p, slot in ranked(FLASHCARD)
+            ],
+            "questions": [
+                {
+                    **dict(zip(("quiz_id", "question_id"), self.items[slot][2:].split(":", 1))),
+                    "subject": self.subjects[self.item_subject[slot]],
+                    "success_probability": round(p, 3)
+                }
+                for p, slot in ranked(QUESTION)
+            ]
+        }
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "subjects": self.subjects,
+            "skill": [round(x, 4) for x in self.skill],
+            "skill_n": self.skill_n.tolist(),
+            "items": self.items,
+            "item_subject": self.item_subject.tolist(),
+            "difficulty": [round(x, 4) for x in self.difficulty],
+            "item_n": self.item_n.tolist(),
+            "last_seen": [int(x) for x in self.last_seen]
+        }
+
+    @classmethod
+    def from_state(cls, user_id: str, state: Dict[str, Any], version: int = 0) -> "MasteryModel":
+        model = cls(user_id, version)
+        model.subjects = list(state["subjects"])
+        model._subject_slots = {subject: slot for slot, subject in enumerate(model.subjects)}
+        model.skill = array("d", state["skill"])
+        model.skill_n = array("I", state["skill_n"])
+        model.items = list(state["items"])
+        model._item_slots = {item: slot for slot, item in enumerate(model.items)}
+        model.item_subject = array("I", state["item_subject"])
+        model.difficulty = array("d", state["difficulty"])
+        model.item_n = array("I", state["item_n"])
+        model.last_seen = array("d", state["last_seen"])
+        return model
+
+class MasteryCache:
+    """LRU of users' mastery models.
+
+    Each model is filed under the generation of the user's mastery counter
+    it was read at, and is only handed back while the counter still has
+    that value: once any worker saves a newer model the copy here is
+    stale. Callers treat returned models as read-only.
+    """
+
+    def __init__(self, max_models: int = MAX_MODELS):
+        self.max_models = max_models
+        self._models: "OrderedDict[str, Tuple[Optional[int], MasteryModel]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, generation: Optional[int]) -> Optional[MasteryModel]:
+        if generation is None:
+            return None
+        with self._lock:
+            entry = self._models.get(user_id)
+            if entry is None or entry[0] != generation:
+                return None
+            self._models.move_to_end(user_id)
+            return entry[1]
+
+    def put(self, model: MasteryModel, generation: Optional[int]):
+        with self._lock:
+            self._models[model.user_id] = (generation, model)
+            self._models.move_to_end(model.user_id)
+            if len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+
+    def discard(self, user_id: str):
+        with self._lock:
+            self._models.pop(user_id, None)
+
+# Create a singleton instance
+mastery_models = MasteryCache()
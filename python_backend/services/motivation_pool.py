@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import os
+import re
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tones served from the pool; any other tone is generated live
+POOL_TONES = tuple(
+    tone.strip() for tone in os.getenv("MOTIVATION_POOL_TONES", "encouraging,enthusiastic,calm").split(",") if tone.strip()
+)
+# Messages generated per refill, and the level at which a bucket is refilled
+POOL_SIZE = int(os.getenv("MOTIVATION_POOL_SIZE", 10))
+LOW_WATER = int(os.getenv("MOTIVATION_POOL_LOW_WATER", 3))
+# Seconds between sweeps for low buckets when nothing asks for a refill sooner
+REFRESH_INTERVAL = float(os.getenv("MOTIVATION_POOL_REFRESH_SECONDS", 60))
+# Refills running at once, so a cold start doesn't burst the OpenAI quota
+MAX_CONCURRENT_REFILLS = 2
+
+# Band edges: (lower bound, band name, representative value used in the prompt)
+STREAK_BANDS = ((30, "long", 45), (7, "month", 14), (3, "week", 4), (1, "short", 1), (0, "none", 0))
+SCORE_BANDS = ((90, "top", 95), (80, "high", 85), (60, "mid", 70), (0, "low", 50))
+# Score changes within this many points count as flat
+TREND_DEAD_ZONE = 2.0
+
+_NAME_LEADING = re.compile(r"^\{name\}[,!]?\s*")
+_NAME_INLINE = re.compile(r",?\s*\{name\}")
+
+class Bucket(NamedTuple):
+    tone: str
+    streak: str
+    score: str
+    trend: int
+
+def _band(value: float, bands) -> tuple:
+    for lower, name, representative in bands:
+        if value >= lower:
+            return name, representative
+    return bands[-1][1], bands[-1][2]
+
+def bucket_for(
+    preferred_tone: str,
+    study_streak: int,
+    recent_performance: Optional[Dict[str, Any]]
+) -> Optional[Bucket]:
+    """Map the inputs of a motivation request to its pool bucket, or None if its tone isn't pooled"""
+    if preferred_tone not in POOL_TONES:
+        return None
+    streak, _ = _band(study_streak, STREAK_BANDS)
+    average = (recent_performance or {}).get("average_score", 0)
+    if average <= 0:
+        # Matches the prompt, which leaves performance out when there is no score yet
+        return Bucket(preferred_tone, streak, "none", 0)
+    score, _ = _band(average, SCORE_BANDS)
+    improvement = recent_performance.get("improvement", 0)
+    trend = 0 if abs(improvement) <= TREND_DEAD_ZONE else (1 if improvement > 0 else -1)
+    return Bucket(preferred_tone, streak, score, trend)
+
+def representative_inputs(bucket: Bucket) -> Dict[str, Any]:
+    """Inputs for AIService._create_motivation_prompt that stand for a whole bucket"""
+    study_streak = next(value for _, name, value in STREAK_BANDS if name == bucket.streak)
+    recent_performance = None
+    if bucket.score != "none":
+        recent_performance = {
+            "average_score": next(value for _, name, value in SCORE_BANDS if name == bucket.score),
+            "recent_quizzes": 5,
+            "improvement": 5 * bucket.trend
+        }
+    return {
+        "recent_performance": recent_performance,
+        "study_streak": study_streak,
+        "preferred_tone": bucket.tone
+    }
+
+def fill_template(template: str, user_name: Optional[str], study_streak: int) -> str:
+    """Personalize a pooled message: first name for {name}, exact streak for {streak}"""
+    message = template.replace("{streak}", str(study_streak))
+    if user_name and user_name.strip():
+        return message.replace("{name}", user_name.split()[0])
+    if _NAME_LEADING.match(message):
+        message = _NAME_LEADING.sub("", message, count=1)
+        message = message[:1].upper() + message[1:]
+    return _NAME_INLINE.sub("", message)
+
+class MotivationPool:
+    """Per-bucket pools of pre-generated motivation message templates.
+
+    A bucket starts empty and is only filled once a request asks for it;
+    from then on a background task tops it up whenever it drops to
+    LOW_WATER, so requests take a message instantly instead of waiting on
+    a completion. Messages are handed out once each, oldest first.
+    """
+
+    def __init__(self):
+        self._pools: Dict[Bucket, Deque[str]] = {}
+        self._refilling = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"served": 0, "misses": 0, "refills": 0, "refill_errors": 0}
+
+    def take(self, bucket: Bucket, user_name: Optional[str], study_streak: int) -> Optional[str]:
+        """Return a personalized message from the bucket's pool, or None if it is empty"""
+        pool = self._pools.setdefault(bucket, deque())
+        if len(pool) <= LOW_WATER:
+            self._wake.set()
+        if not pool:
+            self.stats["misses"] += 1
+            return None
+        self.stats["served"] += 1
+        return fill_template(pool.popleft(), user_name, study_streak)
+
+    def sizes(self) -> Dict[str, int]:
+        return {"/".join(map(str, bucket)): len(pool) for bucket, pool in self._pools.items()}
+
+    async def _refill(self, bucket: Bucket):
+        from services.ai_service import ai_service
+        try:
+            messages = await ai_service.generate_motivation_templates(
+                count=POOL_SIZE, **representative_inputs(bucket)
+            )
+            pool = self._pools[bucket]
+            seen = set(pool)
+            pool.extend(message for message in messages if message not in seen)
+            self.stats["refills"] += 1
+        except Exception:
+            # Usually the OpenAI breaker being open; the next sweep tries again
+            self.stats["refill_errors"] += 1
+            logger.warning("Motivation pool refill failed for %s", bucket, exc_info=True)
+        finally:
+            self._refilling.discard(bucket)
+
+    async def _run(self):
+        limit = asyncio.Semaphore(MAX_CONCURRENT_REFILLS)
+
+        async def refill(bucket: Bucket):
+            async with limit:
+                await self._refill(bucket)
+
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), REFRESH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            low = [
+                bucket for bucket, pool in self._pools.items()
+                if len(pool) <= LOW_WATER and bucket not in self._refilling
+            ]
+            self._refilling.update(low)
+            if low:
+                await asyncio.gather(*(refill(bucket) for bucket in low))
+
+    def start(self):
+        if self._task is None and os.getenv("MOTIVATION_POOL_ENABLED", "true").lower() != "false":
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Create a singleton instance
+motivation_pool = MotivationPool()
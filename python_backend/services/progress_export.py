@@ -0,0 +1,68 @@
+import csv
+import io
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import orjson
+from responses import dump_json
+
+# Export name -> (table, record_type written on every row)
+EXPORT_SOURCES = {
+    "attempts": ("quiz_attempts", "quiz_attempt"),
+    "sessions": ("study_sessions", "study_session"),
+}
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+# Union of quiz_attempts and study_sessions columns; answers is written as a JSON string
+CSV_COLUMNS = [
+    "record_type", "id", "completed_at", "quiz_id", "subject", "activity_type", "duration",
+    "score", "total_questions", "correct_answers", "time_taken", "answers"
+]
+
+Page = Tuple[str, List[Dict[str, Any]]]
+
+def _ndjson_page(record_type: str, rows: List[Dict[str, Any]]) -> bytes:
+    return b"".join(dump_json({"record_type": record_type, **row}) + b"\n" for row in rows)
+
+def _csv_header() -> bytes:
+    return (",".join(CSV_COLUMNS) + "\r\n").encode()
+
+def _csv_page(record_type: str, rows: List[Dict[str, Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS, extrasaction="ignore")
+    for row in rows:
+        row = {**row, "record_type": record_type}
+        if row.get("answers") is not None:
+            row["answers"] = orjson.dumps(row["answers"]).decode()
+        writer.writerow(row)
+    return buffer.getvalue().encode()
+
+async def encode_export(pages: AsyncIterator[Page], export_format: str) -> AsyncIterator[bytes]:
+    """Turn pages of rows into NDJSON or CSV chunks, one chunk per page"""
+    encode = _csv_page if export_format == "csv" else _ndjson_page
+    if export_format == "csv":
+        yield _csv_header()
+    async for record_type, rows in pages:
+        yield encode(record_type, rows)
+
+async def primed(pages: AsyncIterator[Page]) -> AsyncIterator[Page]:
+    """Fetch the first page before the response starts streaming.
+
+    Once the status line is sent a failure can only cut the body short, so
+    pulling the first page up front lets an unreachable database still
+    surface as a proper error response.
+    """
+    try:
+        first = await pages.__anext__()
+    except StopAsyncIteration:
+        return _empty()
+
+    async def chained():
+        yield first
+        async for page in pages:
+            yield page
+    return chained()
+
+async def _empty() -> AsyncIterator[Page]:
+    return
+    yield
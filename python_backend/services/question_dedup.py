@@ -0,0 +1,173 @@
+import hashlib
+import re
+import struct
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# MinHash signature length = BANDS * ROWS_PER_BAND
+BANDS = 16
+ROWS_PER_BAND = 4
+NUM_PERM = BANDS * ROWS_PER_BAND
+# Character shingle size over normalized question text
+SHINGLE_SIZE = 5
+# Estimated Jaccard similarity at or above which two questions count as duplicates
+DUPLICATE_THRESHOLD = 0.7
+# Number of (user, subject) indexes kept in memory
+MAX_INDEXES = 2048
+
+_MAX_HASH = (1 << 32) - 1
+# One shake_128 digest per shingle supplies all NUM_PERM 32-bit hash values
+_UNPACK_HASHES = struct.Struct(f"<{NUM_PERM}I").unpack
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+_SPACES = re.compile(r"\s+")
+
+class AllDuplicatesError(Exception):
+    """Every generated question repeats one the user already has"""
+
+    def __init__(self, generated: int):
+        self.generated = generated
+        super().__init__(f"All {generated} generated questions duplicate existing ones")
+
+def normalize_question(text: str) -> str:
+    text = _NON_WORD.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+def _shingles(text: str) -> Set[str]:
+    normalized = normalize_question(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+def minhash(text: str) -> Tuple[int, ...]:
+    """MinHash signature of a question's character shingles.
+
+    Each shingle is hashed once into NUM_PERM independent 32-bit values
+    (deterministic, so signatures agree across workers and restarts) and
+    the column-wise minimum is taken in C via zip/min.
+    """
+    shingles = _shingles(text)
+    if not shingles:
+        return tuple([_MAX_HASH] * NUM_PERM)
+    rows = [_UNPACK_HASHES(hashlib.shake_128(piece.encode()).digest(NUM_PERM * 4)) for piece in shingles]
+    return tuple(map(min, zip(*rows)))
+
+def estimated_similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+def _band_keys(signature: Tuple[int, ...]) -> List[Tuple[int, int]]:
+    return [
+        (band, hash(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+        for band in range(BANDS)
+    ]
+
+class QuestionIndex:
+    """Locality-sensitive hash index over one user's questions in one subject.
+
+    Signatures are split into bands; two questions become candidates only
+    if they agree on every row of at least one band, so a lookup touches a
+    handful of buckets instead of every stored question. Candidates are
+    then confirmed with the estimated Jaccard similarity.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self._signatures: List[Tuple[int, ...]] = []
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def add(self, signature: Tuple[int, ...]):
+        position = len(self._signatures)
+        self._signatures.append(signature)
+        for key in _band_keys(signature):
+            self._buckets[key].append(position)
+
+    def find_duplicate(self, signature: Tuple[int, ...], threshold: float = DUPLICATE_THRESHOLD) -> bool:
+        seen = set()
+        for key in _band_keys(signature):
+            for position in self._buckets.get(key, ()):
+                if position in seen:
+                    continue
+                seen.add(position)
+                if estimated_similarity(signature, self._signatures[position]) >= threshold:
+                    return True
+        return False
+
+class QuestionIndexRegistry:
+    """Per-(user, subject) question indexes, loaded lazily and updated as quizzes are created.
+
+    Each index is filed under the user's shared QUIZZES generation it was
+    built at and is only handed back while that generation is current, so
+    quizzes saved by another worker make this worker rebuild rather than
+    miss them. A save in this worker moves the generation on by one and
+    adds its questions to the index, which then stays valid.
+    """
+
+    def __init__(self, max_indexes: int = MAX_INDEXES):
+        self.max_indexes = max_indexes
+        self._indexes: "OrderedDict[Tuple[str, str], Tuple[int, QuestionIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(user_id: str, subject: str) -> Tuple[str, str]:
+        return user_id, subject.strip()
+
+    def get(self, user_id: str, subject: str, generation: Optional[int]) -> Optional[QuestionIndex]:
+        if generation is None:
+            return None
+        with self._lock:
+            key = self._key(user_id, subject)
+            entry = self._indexes.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self._indexes.move_to_end(key)
+            return entry[1]
+
+    def build(self, user_id: str, subject: str, questions: Iterable[str], generation: Optional[int]) -> QuestionIndex:
+        index = QuestionIndex()
+        for question in questions:
+            index.add(minhash(question))
+        if generation is None:
+            return index
+        with self._lock:
+            self._indexes[self._key(user_id, subject)] = (generation, index)
+            while len(self._indexes) > self.max_indexes:
+                self._indexes.popitem(last=False)
+        return index
+
+    def add_questions(self, user_id: str, subject: str, questions: Iterable[str], generation: Optional[int]):
+        """Add newly saved questions to the index, if it's loaded.
+
+        `generation` is what the save bumped the user's QUIZZES generation
+        to. An index built just before it takes the questions and moves to
+        that generation; one older than that has missed another write and
+        is dropped.
+        """
+        key = self._key(user_id, subject)
+        with self._lock:
+            entry = self._indexes.get(key)
+            if entry is None:
+                # Not loaded yet; the next build reads these from the database
+                return
+            if generation is None or entry[0] not in (generation - 1, generation):
+                del self._indexes[key]
+                return
+            self._indexes[key] = (generation, entry[1])
+            for question in questions:
+                entry[1].add(minhash(question))
+
+    def filter_new(self, index: QuestionIndex, questions: List[str], threshold: float = DUPLICATE_THRESHOLD) -> List[int]:
+        """Return positions of questions that aren't near-duplicates of stored ones or each other"""
+        batch = QuestionIndex()
+        keep = []
+        for position, question in enumerate(questions):
+            signature = minhash(question)
+            if index.find_duplicate(signature, threshold) or batch.find_duplicate(signature, threshold):
+                continue
+            batch.add(signature)
+            keep.append(position)
+        return keep
+
+# Create a singleton instance
+question_indexes = QuestionIndexRegistry()
@@ -0,0 +1,123 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+from fastapi import Depends, HTTPException, status
+from routes.auth import get_current_user
+from services.lifecycle import lifecycle
+
+# Buckets kept in memory before the least recently used are dropped
+MAX_BUCKETS = 100000
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, holding at most `capacity`"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """Take `cost` tokens if available; otherwise return seconds until they will be"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate
+
+class RateLimiter:
+    """Per-(user, endpoint) token buckets"""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, user_id: str, endpoint: str, per_minute: float, burst: float) -> Tuple[bool, float]:
+        with self._lock:
+            key = (user_id, endpoint)
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(per_minute / 60.0, burst)
+                if len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+            return bucket.try_acquire()
+
+class AdmissionController:
+    """Global cap on concurrent AI requests in this worker; excess is shed, not queued"""
+
+    def __init__(self, max_concurrent: int, retry_after: int):
+        self.max_concurrent = max_concurrent
+        self.retry_after = retry_after
+        self.active = 0
+        self.shed = 0
+
+    def try_admit(self) -> bool:
+        if self.active >= self.max_concurrent:
+            self.shed += 1
+            return False
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"active": self.active, "max_concurrent": self.max_concurrent, "shed": self.shed}
+
+# Create singleton instances
+rate_limiter = RateLimiter()
+ai_admission = AdmissionController(
+    max_concurrent=int(os.getenv("AI_MAX_CONCURRENT", 32)),
+    retry_after=int(os.getenv("AI_SHED_RETRY_AFTER", 5))
+)
+
+def ai_rate_limit(endpoint: str, per_minute: float, burst: float):
+    """Dependency that meters an AI endpoint per user and sheds load globally.
+
+    Runs before the route body, so rejected requests do no work:
+    429 when the user's bucket for this endpoint is empty, 503 when the
+    worker is already at its concurrent AI request limit or shutting down.
+    """
+    per_minute = float(os.getenv(f"AI_RATE_{endpoint.upper()}_PER_MINUTE", per_minute))
+    burst = float(os.getenv(f"AI_RATE_{endpoint.upper()}_BURST", burst))
+
+    async def dependency(current_user = Depends(get_current_user)):
+        if lifecycle.draining:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is restarting, please retry",
+                headers={"Retry-After": str(ai_admission.retry_after)}
+            )
+
+        # Admit first so a shed request doesn't also spend the user's tokens
+        if not ai_admission.try_admit():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="AI service is busy, please retry shortly",
+                headers={"Retry-After": str(ai_admission.retry_after)}
+            )
+
+        allowed, wait = rate_limiter.check(current_user.id, endpoint, per_minute, burst)
+        if not allowed:
+            ai_admission.release()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+        try:
+            yield
+        finally:
+            ai_admission.release()
+
+    return dependency
@@ -0,0 +1,133 @@
+import gzip
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+# Bodies smaller than this aren't worth compressing
+MIN_COMPRESS_SIZE = 1024
+# Compression runs inside the request handler on every cache miss, so use the
+# middle levels: gzip 9 takes ~6x and brotli 11 ~100x as long as these for
+# output only a few percent smaller
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Parse an Accept-Encoding header into {coding: q}"""
+    codings = {}
+    for part in header.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        coding, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        codings[coding.strip().lower()] = q
+    return codings
+
+class CachedBody:
+    """A serialized response body with its precompressed variants"""
+
+    def __init__(self, body: bytes, owner_id: Optional[str] = None, media_type: str = "application/json"):
+        self.owner_id = owner_id
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            if len(gzipped) < len(body):
+                self.variants["gzip"] = gzipped
+            if brotli is not None:
+                compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+                if len(compressed) < len(body):
+                    self.variants["br"] = compressed
+        self.size = sum(len(v) for v in self.variants.values())
+
+    def choose_encoding(self, accept_encoding: Optional[str]) -> str:
+        """Pick the smallest stored variant the client accepts"""
+        if not accept_encoding:
+            return "identity"
+        accepted = _parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best = "identity"
+        for coding in ("br", "gzip"):
+            if coding in self.variants and accepted.get(coding, wildcard) > 0:
+                if len(self.variants[coding]) < len(self.variants[best]):
+                    best = coding
+        return best
+
+    def response(self, request: Request, headers: Optional[Dict[str, str]] = None) -> Response:
+        encoding = self.choose_encoding(request.headers.get("accept-encoding"))
+        response_headers = dict(headers or {})
+        response_headers["Vary"] = "Accept-Encoding"
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.variants[encoding],
+            media_type=self.media_type,
+            headers=response_headers
+        )
+
+class ResponseCache:
+    """LRU cache of serialized, precompressed bodies for immutable resources.
+
+    Entries are compressed once when stored, so serving a hit costs no
+    serialization or compression work. Eviction is by the total bytes of
+    all stored variants rather than by entry count, since a long study
+    guide can be hundreds of times larger than a short quiz.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, body: bytes, owner_id: Optional[str] = None) -> CachedBody:
+        # Compress outside the lock; only the bookkeeping is serialized
+        entry = CachedBody(body, owner_id)
+        if entry.size > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+        return entry
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+# Create a singleton instance
+response_cache = ResponseCache(int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
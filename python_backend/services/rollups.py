@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+class DayTotals:
+    """Running totals for one (user, day, subject) rollup bucket"""
+
+    __slots__ = ("sessions", "duration", "score_sum", "scored_sessions")
+
+    def __init__(self):
+        self.sessions = 0
+        self.duration = 0
+        self.score_sum = 0.0
+        self.scored_sessions = 0
+
+    def add(self, duration: int, score: Optional[float]):
+        self.sessions += 1
+        self.duration += duration or 0
+        if score is not None:
+            self.score_sum += float(score)
+            self.scored_sessions += 1
+
+    def to_row(self, user_id: str, day: date, subject: str) -> Dict[str, Any]:
+        return {
+            "user_id": user_id,
+            "day": day.isoformat(),
+            "subject": subject,
+            "sessions": self.sessions,
+            "duration": self.duration,
+            "score_sum": round(self.score_sum, 2),
+            "scored_sessions": self.scored_sessions
+        }
+
+def activity_series(rows: List[Dict[str, Any]], first: date, last: date) -> List[Dict[str, Any]]:
+    """Fold rollup rows into one entry per day from `first` to `last`, with empty days included"""
+    days: Dict[str, Dict[str, Any]] = {}
+    current = first
+    while current <= last:
+        days[current.isoformat()] = {
+            "date": current.isoformat(),
+            "weekday": current.strftime("%a"),
+            "sessions": 0,
+            "minutes": 0,
+            "average_score": None,
+            "subjects": {},
+            "_score_sum": 0.0,
+            "_scored": 0
+        }
+        current += timedelta(days=1)
+
+    for row in rows:
+        day = days.get(str(row["day"])[:10])
+        if day is None:
+            continue
+        day["sessions"] += row["sessions"]
+        day["minutes"] += row["duration"]
+        day["subjects"][row["subject"]] = day["subjects"].get(row["subject"], 0) + row["duration"]
+        day["_score_sum"] += float(row["score_sum"] or 0)
+        day["_scored"] += row["scored_sessions"]
+
+    series = []
+    for day in days.values():
+        score_sum, scored = day.pop("_score_sum"), day.pop("_scored")
+        if scored:
+            day["average_score"] = round(score_sum / scored, 1)
+        series.append(day)
+    return series
@@ -0,0 +1,226 @@
+import heapq
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+# Title/front/question text counts this many times relative to body text
+TITLE_WEIGHT = 2
+# Seconds to wait for another worker's write lock before giving up
+BUSY_TIMEOUT = float(os.getenv("SEARCH_INDEX_BUSY_TIMEOUT", 1.0))
+
+STUDY_GUIDE = "study_guide"
+FLASHCARD = "flashcard"
+QUESTION = "question"
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were what when where which who why will with
+""".split())
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    user_id TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    doc_type TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    title TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (user_id, doc_key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS postings (
+    user_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    doc_key TEXT NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (user_id, term, doc_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(user_id, doc_key);
+CREATE TABLE IF NOT EXISTS indexed_users (
+    user_id TEXT PRIMARY KEY
+) WITHOUT ROWID;
+"""
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS]
+
+class SearchIndex:
+    """Persistent per-user inverted index with BM25 ranking.
+
+    Postings live in a local SQLite file, so the index survives restarts
+    and is shared by every worker on the host. Documents are re-indexed
+    individually as they are created, updated or deleted; a user's whole
+    collection is only read from Supabase the first time they search.
+
+    The methods block on SQLite, so async callers run them in a thread.
+    Incremental updates follow writes Supabase has already committed, so
+    they never raise: a failed update is logged and the user is marked
+    for a full rebuild on their next search instead.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Users whose index missed an update, in case the file couldn't record that either
+        self._stale: Set[str] = set()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    # Document keys
+    @staticmethod
+    def guide_key(guide_id: str) -> str:
+        return f"{STUDY_GUIDE}:{guide_id}"
+
+    @staticmethod
+    def flashcard_key(flashcard_id: str) -> str:
+        return f"{FLASHCARD}:{flashcard_id}"
+
+    @staticmethod
+    def question_key(quiz_id: str, position: int) -> str:
+        return f"{QUESTION}:{quiz_id}:{position}"
+
+    def _write(self, user_id: str, doc_key: str, doc_type: str, doc_id: str, title: str, body: str):
+        terms = Counter(tokenize(title) * TITLE_WEIGHT + tokenize(body))
+        self.conn.execute("DELETE FROM postings WHERE user_id = ? AND doc_key = ?", (user_id, doc_key))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)",
+            (user_id, doc_key, doc_type, doc_id, title[:200], sum(terms.values()))
+        )
+        self.conn.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?)",
+            [(user_id, term, doc_key, tf) for term, tf in terms.items()]
+        )
+
+    def _delete(self, user_id: str, doc_keys: Iterable[str]):
+        for doc_key in doc_keys:
+            self.conn.execute("DELETE FROM postings WHERE user_id = ? AND doc_key = ?", (user_id, doc_key))
+            self.conn.execute("DELETE FROM documents WHERE user_id = ? AND doc_key = ?", (user_id, doc_key))
+
+    # Incremental updates
+    def _update(self, user_id: str, write: Callable[[], None]):
+        try:
+            with self._lock, self.conn:
+                write()
+        except sqlite3.Error as e:
+            logger.warning("Search index update for %s failed, rebuilding on next search: %s", user_id, e)
+            self._stale.add(user_id)
+            try:
+                with self._lock, self.conn:
+                    self.conn.execute("DELETE FROM indexed_users WHERE user_id = ?", (user_id,))
+            except sqlite3.Error:
+                pass
+
+    def index_study_guide(self, user_id: str, guide_id: str, title: str, content: str, key_topics: List[str]):
+        self._update(user_id, lambda: self._write(
+            user_id, self.guide_key(guide_id), STUDY_GUIDE, guide_id, title, " ".join([content, *key_topics])
+        ))
+
+    def index_flashcard(self, user_id: str, flashcard_id: str, front: str, back: str, tags: List[str]):
+        self._update(user_id, lambda: self._write(
+            user_id, self.flashcard_key(flashcard_id), FLASHCARD, flashcard_id, front, " ".join([back, *tags])
+        ))
+
+    def index_quiz(self, user_id: str, quiz_id: str, questions: List[str]):
+        def write():
+            for position, question in enumerate(questions):
+                self._write(user_id, self.question_key(quiz_id, position), QUESTION, quiz_id, question, "")
+        self._update(user_id, write)
+
+    def remove_study_guide(self, user_id: str, guide_id: str):
+        self._update(user_id, lambda: self._delete(user_id, [self.guide_key(guide_id)]))
+
+    def remove_flashcard(self, user_id: str, flashcard_id: str):
+        self._update(user_id, lambda: self._delete(user_id, [self.flashcard_key(flashcard_id)]))
+
+    # Initial load
+    def is_indexed(self, user_id: str) -> bool:
+        if user_id in self._stale:
+            return False
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM indexed_users WHERE user_id = ?", (user_id,)).fetchone()
+            return row is not None
+
+    def rebuild_user(self, user_id: str, guides: Iterable[Any], flashcards: Iterable[Any], quizzes: Iterable[Any]):
+        """Replace everything indexed for a user with the given collections"""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM postings WHERE user_id = ?", (user_id,))
+            self.conn.execute("DELETE FROM documents WHERE user_id = ?", (user_id,))
+            for guide in guides:
+                self._write(user_id, self.guide_key(guide.id), STUDY_GUIDE, guide.id, guide.title,
+                            " ".join([guide.content, *guide.key_topics]))
+            for card in flashcards:
+                self._write(user_id, self.flashcard_key(card.id), FLASHCARD, card.id, card.front,
+                            " ".join([card.back, *(card.tags or [])]))
+            for quiz in quizzes:
+                for position, question in enumerate(quiz.questions):
+                    self._write(user_id, self.question_key(quiz.id, position), QUESTION, quiz.id, question.question, "")
+            self.conn.execute("INSERT OR IGNORE INTO indexed_users VALUES (?)", (user_id,))
+        self._stale.discard(user_id)
+
+    # Queries
+    def search(self, user_id: str, query: str, doc_types: Optional[List[str]] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Rank the user's documents against the query with BM25"""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            total_docs, total_length = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM documents WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if not total_docs:
+                return []
+            placeholders = ",".join("?" * len(terms))
+            rows = self.conn.execute(
+                f"""SELECT p.term, p.doc_key, p.tf, d.length, d.doc_type, d.doc_id, d.title
+                    FROM postings p JOIN documents d ON d.user_id = p.user_id AND d.doc_key = p.doc_key
+                    WHERE p.user_id = ? AND p.term IN ({placeholders})""",
+                (user_id, *terms)
+            ).fetchall()
+
+        avg_length = total_length / total_docs
+        doc_freq = Counter(term for term, *_ in rows)
+        scores: Dict[str, float] = {}
+        meta: Dict[str, Tuple[str, str, str]] = {}
+        for term, doc_key, tf, length, doc_type, doc_id, title in rows:
+            if doc_types and doc_type not in doc_types:
+                continue
+            df = doc_freq[term]
+            idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+            norm = tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+            scores[doc_key] = scores.get(doc_key, 0.0) + idf * norm
+            meta[doc_key] = (doc_type, doc_id, title)
+
+        results = []
+        for doc_key, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+            doc_type, doc_id, title = meta[doc_key]
+            result = {"type": doc_type, "id": doc_id, "title": title, "score": round(score, 4)}
+            if doc_type == QUESTION:
+                # Keys hold 0-based positions; questions are addressed 1-based (GET /quizzes/{id}/questions/{n})
+                result["question_index"] = int(doc_key.rsplit(":", 1)[1]) + 1
+            results.append(result)
+        return results
+
+# Create a singleton instance
+search_index = SearchIndex(os.getenv(
+    "SEARCH_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "search_index.db")
+))
@@ -0,0 +1,421 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Which backend the process-wide cache uses: "memory" (per worker) or
+# "sqlite" (one file shared by every worker on the host, behind a small
+# per-worker memory tier)
+BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv(
+    "CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared_cache.db")
+)
+# Byte budgets for the shared file and for each worker's memory tier
+MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", 256 * 1024 * 1024))
+MEMORY_MAX_BYTES = int(os.getenv("CACHE_MEMORY_MAX_BYTES", 32 * 1024 * 1024))
+# Longest a shared entry is trusted from the memory tier before it is re-read
+MEMORY_TTL = float(os.getenv("CACHE_MEMORY_TTL", 60))
+# Reads only refresh an entry's recency once per this many seconds, so hot
+# keys don't turn every read into a write
+TOUCH_SECONDS = 30
+# Sets between sweeps of expired and over-budget entries
+SWEEP_EVERY = 200
+# Seconds a sweep, which runs in its own thread, waits for the write lock
+SWEEP_BUSY_TIMEOUT = 5.0
+# Seconds a cache call waits for another worker's write lock before giving up.
+# Calls run on the event loop, so this stays short: a busy file costs a miss,
+# not a stalled worker.
+BUSY_TIMEOUT = float(os.getenv("CACHE_BUSY_TIMEOUT", 0.05))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_entries_expires ON entries(expires_at);
+CREATE TABLE IF NOT EXISTS generations (
+    name TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+def cache_key(namespace: str, *parts: Any) -> str:
+    """Stable key for a cached value, the same in every worker and across restarts.
+
+    Python's hash() is randomized per process, so keys are a SHA-256 of the
+    namespace and the JSON-encoded parts instead.
+    """
+    raw = orjson.dumps([namespace, *parts], option=orjson.OPT_SORT_KEYS, default=str)
+    return f"{namespace}:{hashlib.sha256(raw).hexdigest()}"
+
+class CacheBackend(ABC):
+    """Byte values by key, each with its own time to live.
+
+    Values under one key are treated as immutable: a changed value gets a
+    new key (built from a generation counter, see `generation`) rather than
+    being overwritten, so no tier can serve one worker's stale copy after
+    another worker's write.
+    """
+
+    @property
+    @abstractmethod
+    def epoch(self) -> Optional[str]:
+        """Identifies this store of generations, or None if it can't be read.
+
+        It changes whenever the store is recreated, since the counters then
+        restart from zero and would otherwise repeat earlier values.
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def generation(self, name: str) -> Optional[int]:
+        """Current generation of `name`, or None if it can't be read right now.
+
+        Callers must treat None as "don't cache": a guessed generation could
+        match entries written before the last bump.
+        """
+
+    @abstractmethod
+    def bump(self, name: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        ...
+
+    # JSON helpers for the common case
+    def get_json(self, key: str) -> Any:
+        value = self.get(key)
+        return orjson.loads(value) if value is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: float):
+        self.set(key, orjson.dumps(value), ttl)
+
+class MemoryBackend(CacheBackend):
+    """In-process LRU, evicting by the total bytes of stored values"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._epoch = uuid.uuid4().hex[:8]
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def epoch(self) -> Optional[str]:
+        return self._epoch
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.time():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes or ttl <= 0:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, time.time() + ttl)
+            self.current_bytes += len(value)
+            while self.current_bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.current_bytes -= len(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= len(entry[0])
+
+    def generation(self, name: str) -> Optional[int]:
+        return self._generations.get(name, 0)
+
+    def bump(self, name: str) -> Optional[int]:
+        with self._lock:
+            generation = self._generations[name] = self._generations.get(name, 0) + 1
+            return generation
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+class SqliteBackend(CacheBackend):
+    """Cache in a local SQLite file, shared by every worker process on the host.
+
+    WAL mode lets workers read while one of them writes. Expired entries are
+    skipped on read and deleted by a periodic background sweep, which also evicts the
+    least recently read entries once the stored values exceed max_bytes.
+    Generation counters live in the same file, so a bump in one worker
+    changes the keys every other worker builds.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._epoch: Optional[str] = None
+        self._sets = 0
+        self._sweeping = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.failed_bumps = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Opened on first use, so each forked worker gets its own connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=BUSY_TIMEOUT)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            with conn:
+                conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],))
+            self._epoch = conn.execute("SELECT value FROM meta WHERE name = 'epoch'").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    @property
+    def epoch(self) -> Optional[str]:
+        try:
+            with self._lock:
+                self.conn
+        except sqlite3.Error as e:
+            logger.warning("Shared cache unavailable: %s", e)
+        return self._epoch
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self.lookup(key)
+        return entry[0] if entry else None
+
+    def lookup(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """(value, expires_at) for a live entry"""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self.conn.execute(
+                    "SELECT value, expires_at, accessed_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now and now - row[2] > TOUCH_SECONDS:
+                    with self.conn:
+                        self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error as e:
+                # A busy or broken cache file is a miss, never a failed request
+                logger.warning("Shared cache read failed: %s", e)
+                row = None
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], row[1]
+
+    def set(self, key: str, value: bytes, ttl: float):
+        if len(value) > self.max_bytes or ttl <= 0:
+            return
+        now = time.time()
+        try:
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now + ttl, now)
+                )
+                self._sets += 1
+        except sqlite3.Error as e:
+            logger.warning("Shared cache write failed: %s", e)
+            return
+        if self._sets % SWEEP_EVERY == 0:
+            self._start_sweep()
+
+    def delete(self, key: str):
+        try:
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning("Shared cache delete failed: %s", e)
+
+    def _start_sweep(self):
+        """Sweep in a background thread, so its table scan never holds up the event loop"""
+        with self._lock:
+            if self._sweeping:
+                return
+            self._sweeping = True
+        threading.Thread(target=self.sweep, name="shared-cache-sweep", daemon=True).start()
+
+    def sweep(self):
+        """Delete expired entries, then the least recently read ones until under max_bytes.
+
+        Uses a connection of its own rather than the one behind self._lock,
+        so cache calls on the event loop only ever wait BUSY_TIMEOUT for it.
+        """
+        try:
+            conn = sqlite3.connect(self.path, timeout=SWEEP_BUSY_TIMEOUT)
+            try:
+                with conn:
+                    self._sweep(conn, time.time())
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Shared cache sweep failed: %s", e)
+        finally:
+            self._sweeping = False
+
+    def _sweep(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Walk entries oldest-read first until enough bytes are freed
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def generation(self, name: str) -> Optional[int]:
+        try:
+            with self._lock:
+                row = self.conn.execute("SELECT generation FROM generations WHERE name = ?", (name,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning("Shared cache generation read failed: %s", e)
+            return None
+        return row[0] if row else 0
+
+    def bump(self, name: str) -> Optional[int]:
+        # Runs after the database write succeeded, so a failure here is logged,
+        # not raised; other workers may serve the old generation until its TTL
+        try:
+            with self._lock, self.conn:
+                return self.conn.execute(
+                    "INSERT INTO generations (name, generation) VALUES (?, 1) "
+                    "ON CONFLICT(name) DO UPDATE SET generation = generation + 1 RETURNING generation",
+                    (name,)
+                ).fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error("Shared cache generation bump for %s failed: %s", name, e)
+            self.failed_bumps += 1
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            with self._lock:
+                entries, stored = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except sqlite3.Error:
+            entries = stored = None
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "bytes": stored,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "failed_bumps": self.failed_bumps
+        }
+
+class TieredCache(CacheBackend):
+    """A per-worker MemoryBackend in front of a shared SqliteBackend.
+
+    Hits in the shared file are copied into the memory tier for at most
+    MEMORY_TTL seconds; generations are always read from the shared file.
+    """
+
+    def __init__(self, local: MemoryBackend, shared: SqliteBackend, local_ttl: float = MEMORY_TTL):
+        self.local = local
+        self.shared = shared
+        self.local_ttl = local_ttl
+
+    @property
+    def epoch(self) -> Optional[str]:
+        return self.shared.epoch
+
+    def get(self, key: str) -> Optional[bytes]:
+        value = self.local.get(key)
+        if value is None:
+            entry = self.shared.lookup(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            self.local.set(key, value, min(self.local_ttl, expires_at - time.time()))
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        self.shared.set(key, value, ttl)
+        self.local.set(key, value, min(self.local_ttl, ttl))
+
+    def delete(self, key: str):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def generation(self, name: str) -> Optional[int]:
+        return self.shared.generation(name)
+
+    def bump(self, name: str) -> Optional[int]:
+        return self.shared.bump(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "tiered", "memory": self.local.stats(), "shared": self.shared.stats()}
+
+def create_cache(backend: str = BACKEND) -> CacheBackend:
+    if backend == "memory":
+        return MemoryBackend(MEMORY_MAX_BYTES)
+    if backend == "sqlite":
+        return TieredCache(MemoryBackend(MEMORY_MAX_BYTES), SqliteBackend(CACHE_PATH, MAX_BYTES))
+    raise ValueError(f"Unknown CACHE_BACKEND {backend!r}; expected 'memory' or 'sqlite'")
+
+# Create a singleton instance
+shared_cache = create_cache()
@@ -0,0 +1,133 @@
+import os
+import re
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional
+
+# Similarity at or above which an answer gets full credit
+FULL_CREDIT = float(os.getenv("SHORT_ANSWER_FULL_CREDIT", 0.85))
+# Similarity at or above which an answer gets partial credit (its similarity, rounded)
+PARTIAL_CREDIT = float(os.getenv("SHORT_ANSWER_PARTIAL_CREDIT", 0.5))
+# A misspelled token may differ from the key by one edit per this many characters
+CHARS_PER_TYPO = 6
+# Leading characters that must match before a misspelling is forgiven: prefixes
+# carry meaning (hypo-/hyper-, endo-/exo-, in-/de-crease), typos rarely sit there
+FIXED_PREFIX = 4
+# Recall counts this many times as much as precision when comparing token sets,
+# so a right answer wrapped in extra words still scores well
+RECALL_WEIGHT = 2.0
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+_NUMBER = re.compile(r"^\d+(?:\.\d+)?$")
+# Words that carry no meaning in a short answer ("the mitochondria", "it is Paris")
+_FILLER = frozenset("a an the it its is are was were this that these those answer".split())
+_NEGATIONS = frozenset("not no never none without".split())
+
+class AnswerProfile(NamedTuple):
+    """Precomputed comparison forms of one answer"""
+    normalized: str
+    tokens: FrozenSet[str]
+
+    @property
+    def numbers(self) -> FrozenSet[str]:
+        return frozenset(token for token in self.tokens if _NUMBER.match(token))
+
+    @property
+    def negated(self) -> bool:
+        return not _NEGATIONS.isdisjoint(self.tokens)
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"normalized": self.normalized, "tokens": sorted(self.tokens)}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, Any]) -> "AnswerProfile":
+        # Profiles stored before grading went token-only also carry "ngrams"; it's ignored
+        return cls(data["normalized"], frozenset(data["tokens"]))
+
+def normalize_answer(text: str) -> str:
+    text = _NON_WORD.sub(" ", text.lower().replace("'", ""))
+    words = [word for word in _SPACES.split(text) if word and word not in _FILLER]
+    return " ".join(words)
+
+def profile(text: str) -> AnswerProfile:
+    normalized = normalize_answer(text)
+    return AnswerProfile(normalized, frozenset(normalized.split()))
+
+def _edit_distance(a: str, b: str, limit: int) -> int:
+    """Levenshtein distance, giving up (returning limit + 1) once it must exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, start=1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+def _token_match(token: str, candidates: FrozenSet[str]) -> float:
+    """Best match for a token: 1 if present, partial for a close misspelling, 0 otherwise.
+
+    A misspelling must keep the first FIXED_PREFIX characters and stay within
+    one edit per CHARS_PER_TYPO characters, so "photosynthesys" matches
+    "photosynthesis" but "hyperthyroidism" never matches "hypothyroidism".
+    """
+    if token in candidates:
+        return 1.0
+    limit = len(token) // CHARS_PER_TYPO
+    if _NUMBER.match(token) or not limit:
+        return 0.0
+    best = 0.0
+    for candidate in candidates:
+        if candidate[:FIXED_PREFIX] != token[:FIXED_PREFIX]:
+            continue
+        distance = _edit_distance(token, candidate, limit)
+        if distance <= limit:
+            best = max(best, 1.0 - distance / max(len(token), len(candidate)))
+    return best
+
+def _token_score(expected: AnswerProfile, given: AnswerProfile) -> float:
+    expected_matches = [_token_match(token, given.tokens) for token in expected.tokens]
+    given_matches = [_token_match(token, expected.tokens) for token in given.tokens]
+    # A key word swapped for another word ("ionic bond" for "covalent bond") makes
+    # a different answer; only missing or extra words earn partial credit
+    if 0.0 in expected_matches and 0.0 in given_matches:
+        return 0.0
+    recall = sum(expected_matches) / len(expected_matches)
+    precision = sum(given_matches) / len(given_matches)
+    if not recall or not precision:
+        return 0.0
+    beta2 = RECALL_WEIGHT ** 2
+    return (1 + beta2) * precision * recall / (beta2 * precision + recall)
+
+def similarity(expected: AnswerProfile, given: AnswerProfile) -> float:
+    if not expected.normalized or not given.normalized:
+        return 1.0 if expected.normalized == given.normalized else 0.0
+    if expected.normalized == given.normalized:
+        return 1.0
+    # Near-identical spelling can't make a wrong number or a flipped statement right
+    if expected.numbers != given.numbers or expected.negated != given.negated:
+        return 0.0
+    return _token_score(expected, given)
+
+def credit_for(score: float) -> float:
+    if score >= FULL_CREDIT:
+        return 1.0
+    if score >= PARTIAL_CREDIT:
+        return round(score, 2)
+    return 0.0
+
+def grade_batch(pairs: List[tuple]) -> List[float]:
+    """Credit for each (expected profile, user answer text) pair, in one pass"""
+    profiles: Dict[str, AnswerProfile] = {}
+    credits = []
+    for expected, user_answer in pairs:
+        given = profiles.get(user_answer)
+        if given is None:
+            given = profiles[user_answer] = profile(user_answer)
+        credits.append(credit_for(similarity(expected, given)))
+    return credits
+
+def profile_or_none(data: Optional[Dict[str, Any]]) -> Optional[AnswerProfile]:
+    return AnswerProfile.from_json(data) if data else None
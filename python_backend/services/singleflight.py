@@ -0,0 +1,73 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+class SingleFlight:
+    """Collapse concurrent identical calls into one upstream call.
+
+    The first caller for a key starts the work in its own task; callers
+    that arrive while it is running await the same task and receive the
+    same result (or exception). Results are shared objects, so callers
+    must not mutate them. A cancelled caller only stops waiting; the
+    upstream call is cancelled only once every waiter has gone. The key is
+    forgotten as soon as the call finishes, so nothing is cached.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = self._calls[key] = _Call(task)
+            task.add_done_callback(functools.partial(self._finished, key, call))
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _finished(self, key: Hashable, call: _Call, task: "asyncio.Task"):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception retrieved even if every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self):
+        return len(self._calls)
+
+def coalesce(flight: SingleFlight, key: Callable[..., Hashable] = None):
+    """Decorate an async method so concurrent calls with the same arguments share one execution"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if key is not None:
+                call_key = (method.__name__, key(*args, **kwargs))
+            else:
+                call_key = (method.__name__, args, tuple(sorted(kwargs.items())))
+            return await flight.do(call_key, lambda: method(self, *args, **kwargs))
+        return wrapper
+    return decorator
+
+# Shared flights for database reads and AI completions
+db_flight = SingleFlight()
+ai_flight = SingleFlight()
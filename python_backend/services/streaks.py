@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Users whose last counted day is remembered in this worker
+MAX_CACHED_USERS = 100000
+
+class StreakState(NamedTuple):
+    last_day: Optional[date]
+    current: int
+    longest: int
+
+    @classmethod
+    def from_row(cls, row: Dict[str, Any]) -> "StreakState":
+        last_day = row.get("streak_last_day")
+        if isinstance(last_day, str):
+            last_day = date.fromisoformat(last_day[:10])
+        return cls(last_day, row.get("study_streak") or 0, row.get("longest_streak") or 0)
+
+    def to_row(self) -> Dict[str, Any]:
+        return {
+            "streak_last_day": self.last_day.isoformat() if self.last_day else None,
+            "study_streak": self.current,
+            "longest_streak": self.longest
+        }
+
+def local_day(moment: datetime, tz_name: Optional[str]) -> date:
+    """Calendar day of `moment` in the user's timezone (UTC if unset or unknown)"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    try:
+        tz = ZoneInfo(tz_name) if tz_name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        tz = timezone.utc
+    return moment.astimezone(tz).date()
+
+def advance(state: StreakState, day: date) -> StreakState:
+    """Fold one day of activity into the streak.
+
+    Activity on the last counted day (or an older one arriving late)
+    changes nothing, the next day extends the streak and any later day
+    starts a new one.
+    """
+    if state.last_day is not None and day <= state.last_day:
+        return state
+    if state.last_day is not None and day == state.last_day + timedelta(days=1):
+        current = state.current + 1
+    else:
+        current = 1
+    return StreakState(day, current, max(state.longest, current))
+
+def current_streak(profile: Any, now: Optional[datetime] = None) -> int:
+    """Streak as of today: the stored run only counts if it reached yesterday or today"""
+    state = StreakState.from_row(dict(profile))
+    if state.last_day is None:
+        return state.current
+    today = local_day(now or datetime.now(timezone.utc), getattr(profile, "timezone", None))
+    return state.current if state.last_day >= today - timedelta(days=1) else 0
+
+class StreakDays:
+    """Per-user (timezone, last counted day), so repeat activity on the same day skips the database"""
+
+    def __init__(self, max_users: int = MAX_CACHED_USERS):
+        self.max_users = max_users
+        self._days: "OrderedDict[str, Tuple[Optional[str], date]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[Tuple[Optional[str], date]]:
+        with self._lock:
+            return self._days.get(user_id)
+
+    def put(self, user_id: str, tz_name: Optional[str], day: date):
+        with self._lock:
+            self._days[user_id] = (tz_name, day)
+            self._days.move_to_end(user_id)
+            if len(self._days) > self.max_users:
+                self._days.popitem(last=False)
+
+# Create a singleton instance
+streak_days = StreakDays()
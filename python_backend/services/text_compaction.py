@@ -0,0 +1,187 @@
+import heapq
+import math
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; fall back to a character-based estimate
+    tiktoken = None
+
+# Default token budget for document content embedded in a prompt
+CONTENT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTENT_TOKEN_BUDGET", 2000))
+# Lines at the top/bottom of each page that are checked for repeated headers/footers
+FURNITURE_LINES = 3
+# A header/footer line must repeat on at least this share of pages to be stripped
+FURNITURE_MIN_SHARE = 0.5
+# Target size of the chunks the budgeter selects from
+CHUNK_TOKENS = 120
+
+PAGE_BREAK = "\f"
+
+_PAGE_NUMBER = re.compile(r"^\s*(?:page\s*)?[-–]?\s*\d{1,4}\s*[-–]?\s*(?:(?:of|/)\s*\d{1,4})?\s*$", re.IGNORECASE)
+_HYPHEN_BREAK = re.compile(r"(\w)-\n\s*([a-z])")
+_DIGITS = re.compile(r"\d+")
+_INLINE_SPACE = re.compile(r"[ \t ]+")
+_SENTENCE_END = re.compile(r"[.!?:;\"')\]]$")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z][a-z0-9]+")
+_STOPWORDS = frozenset("""
+a about above after again all also an and any are as at be because been before being below between both but by can could
+did do does doing during each few for from further had has have having he her here hers him his how i if in into is it its
+itself just me more most my no nor not of off on once only or other our out over own same she should so some such than that
+the their them then there these they this those through to too under until up very was we were what when where which while
+who whom why will with would you your
+""".split())
+
+def _furniture_key(line: str) -> str:
+    # Page numbers inside a running header shouldn't make each page's copy unique
+    return _DIGITS.sub("#", line.strip().lower())
+
+def compact_text(text: str) -> str:
+    """Strip PDF page furniture and normalize whitespace without dropping content.
+
+    Expects pages separated by form feeds (as produced by
+    AIService.extract_text_from_pdf). Removes headers/footers that repeat
+    across pages and bare page numbers, re-joins words hyphenated across
+    line breaks, unwraps hard-wrapped lines and collapses whitespace runs.
+    """
+    pages = [page.splitlines() for page in text.split(PAGE_BREAK)]
+
+    furniture = set()
+    if len(pages) > 1:
+        counts = Counter()
+        for lines in pages:
+            candidates = [line for line in lines if line.strip()]
+            edge = candidates[:FURNITURE_LINES] + candidates[-FURNITURE_LINES:]
+            counts.update({_furniture_key(line) for line in edge})
+        threshold = max(2, math.ceil(len(pages) * FURNITURE_MIN_SHARE))
+        furniture = {key for key, count in counts.items() if count >= threshold and key}
+
+    kept_pages = []
+    for lines in pages:
+        kept = [
+            line for line in lines
+            if _furniture_key(line) not in furniture and not _PAGE_NUMBER.match(line)
+        ]
+        kept_pages.append("\n".join(kept))
+    body = "\n".join(kept_pages)
+
+    body = _HYPHEN_BREAK.sub(r"\1\2", body)
+
+    paragraphs = []
+    current: List[str] = []
+    for line in body.split("\n"):
+        line = _INLINE_SPACE.sub(" ", line).strip()
+        if not line:
+            if current:
+                paragraphs.append(" ".join(current))
+                current = []
+            continue
+        current.append(line)
+        # Treat a line ending a sentence that falls short of the wrap width as a paragraph end
+        if _SENTENCE_END.search(line) and len(line) < 60:
+            paragraphs.append(" ".join(current))
+            current = []
+    if current:
+        paragraphs.append(" ".join(current))
+
+    return "\n\n".join(paragraphs)
+
+@lru_cache(maxsize=None)
+def _encoding():
+    """The o200k_base encoding, loaded on first use (it may download its BPE file)"""
+    if tiktoken is not None:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            pass
+    return None
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode_ordinary(text))
+    # Roughly four characters per token for English text
+    return max(1, (len(text) + 3) // 4)
+
+def _chunks(text: str) -> List[str]:
+    """Split text into paragraph-aligned chunks of roughly CHUNK_TOKENS tokens"""
+    chunks = []
+    for paragraph in text.split("\n\n"):
+        if count_tokens(paragraph) <= CHUNK_TOKENS:
+            chunks.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_SPLIT.split(paragraph):
+            candidate = f"{current} {sentence}" if current else sentence
+            if current and count_tokens(candidate) > CHUNK_TOKENS:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = candidate
+        if current:
+            chunks.append(current)
+    return [chunk for chunk in chunks if chunk.strip()]
+
+def fit_to_budget(text: str, max_tokens: Optional[int] = None) -> str:
+    """Pack the most informative chunks of text into a token budget.
+
+    Text that already fits is returned unchanged. Otherwise chunks are
+    scored by the document-level weight of the content words they add that
+    earlier picks haven't covered yet, per token, and picked greedily;
+    leftover budget is filled in document order and the chosen chunks are
+    emitted in their original order.
+    """
+    max_tokens = max_tokens or CONTENT_TOKEN_BUDGET
+    if count_tokens(text) <= max_tokens:
+        return text
+
+    chunks = _chunks(text)
+    chunk_terms = [Counter(w for w in _WORD.findall(chunk.lower()) if w not in _STOPWORDS) for chunk in chunks]
+    chunk_tokens = [count_tokens(chunk) for chunk in chunks]
+    document_tf = Counter()
+    for terms in chunk_terms:
+        document_tf.update(terms.keys())
+    # Terms recurring across the document are its key concepts; log-damp so no single term dominates
+    weight = {term: 1.0 + math.log(count) for term, count in document_tf.items()}
+
+    def score(i: int) -> float:
+        return sum(weight[term] for term in chunk_terms[i] if term not in covered) / chunk_tokens[i]
+
+    # Lazy greedy: a chunk's score only falls as coverage grows, so a
+    # re-scored chunk that still beats the next stale score is the best pick
+    covered = set()
+    selected = []
+    used = 0
+    heap = [(-score(i), i) for i in range(len(chunks))]
+    heapq.heapify(heap)
+    while heap:
+        _, i = heapq.heappop(heap)
+        if used + chunk_tokens[i] > max_tokens:
+            continue
+        current = score(i)
+        if current <= 0:
+            continue
+        if heap and current < -heap[0][0]:
+            heapq.heappush(heap, (-current, i))
+            continue
+        selected.append(i)
+        covered.update(chunk_terms[i])
+        used += chunk_tokens[i]
+
+    # Once nothing adds new terms, spend any leftover budget in document order
+    chosen = set(selected)
+    for i in range(len(chunks)):
+        if i not in chosen and used + chunk_tokens[i] <= max_tokens:
+            chosen.add(i)
+            used += chunk_tokens[i]
+
+    return "\n\n".join(chunks[i] for i in sorted(chosen))
+
+def prepare_content(text: str, max_tokens: Optional[int] = None) -> str:
+    """Compact extracted text and fit it to the prompt's content budget"""
+    return fit_to_budget(compact_text(text), max_tokens)
@@ -9,11 +9,19 @@ CREATE TABLE IF NOT EXISTS public.profiles (
     total_quizzes INTEGER DEFAULT 0,
     average_score DECIMAL(5,2) DEFAULT 0.0,
     study_streak INTEGER DEFAULT 0,
+    longest_streak INTEGER DEFAULT 0,
+    streak_last_day DATE, -- last day counted towards study_streak, in the user's timezone
+    timezone TEXT, -- IANA timezone name; UTC when NULL
     total_study_time DECIMAL(10,2) DEFAULT 0.0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Streak columns for databases created before they were added
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS longest_streak INTEGER DEFAULT 0;
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS streak_last_day DATE;
+ALTER TABLE public.profiles ADD COLUMN IF NOT EXISTS timezone TEXT;
+
 -- Create quizzes table
 CREATE TABLE IF NOT EXISTS public.quizzes (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -28,6 +36,35 @@ CREATE TABLE IF NOT EXISTS public.quizzes (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Create quiz_questions table (one row per question, served one at a time)
+CREATE TABLE IF NOT EXISTS public.quiz_questions (
+    id TEXT NOT NULL DEFAULT gen_random_uuid()::text, -- stable id, also stored in quizzes.questions
+    quiz_id UUID REFERENCES public.quizzes(id) ON DELETE CASCADE NOT NULL,
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    position INTEGER NOT NULL, -- 1-based
+    question TEXT NOT NULL,
+    options JSONB,
+    correct_answer TEXT NOT NULL,
+    explanation TEXT,
+    difficulty TEXT NOT NULL CHECK (difficulty IN ('easy', 'medium', 'hard')),
+    question_type TEXT NOT NULL CHECK (question_type IN ('multiple_choice', 'true_false', 'short_answer')),
+    answer_profile JSONB, -- precomputed comparison forms for grading short answers
+    PRIMARY KEY (quiz_id, id),
+    UNIQUE (quiz_id, position)
+);
+
+ALTER TABLE public.quiz_questions ADD COLUMN IF NOT EXISTS answer_profile JSONB;
+
+-- Create user_mastery table (online skill / item difficulty model, one row per user)
+CREATE TABLE IF NOT EXISTS public.user_mastery (
+    user_id UUID REFERENCES auth.users(id) PRIMARY KEY,
+    state JSONB NOT NULL, -- parallel arrays of subject skills and item difficulties
+    version INTEGER DEFAULT 1 NOT NULL, -- bumped on every save; writers update only the version they read
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
+);
+
+ALTER TABLE public.user_mastery ADD COLUMN IF NOT EXISTS version INTEGER DEFAULT 1 NOT NULL;
+
 -- Create quiz_attempts table
 CREATE TABLE IF NOT EXISTS public.quiz_attempts (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -41,6 +78,18 @@ CREATE TABLE IF NOT EXISTS public.quiz_attempts (
     completed_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Create live_answers table (answers given in live quiz rooms, written once per question)
+CREATE TABLE IF NOT EXISTS public.live_answers (
+    room_id UUID NOT NULL,
+    quiz_id UUID REFERENCES public.quizzes(id) ON DELETE CASCADE NOT NULL,
+    question_id TEXT NOT NULL,
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    user_answer TEXT NOT NULL,
+    credit REAL NOT NULL, -- 0-1
+    answered_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (room_id, question_id, user_id)
+);
+
 -- Create flashcards table
 CREATE TABLE IF NOT EXISTS public.flashcards (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
@@ -91,14 +140,31 @@ CREATE TABLE IF NOT EXISTS public.study_sessions (
     completed_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL
 );
 
+-- Create study_daily_rollups table (study_sessions pre-aggregated per user, day and subject)
+CREATE TABLE IF NOT EXISTS public.study_daily_rollups (
+    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    day DATE NOT NULL, -- in the user's timezone
+    subject TEXT NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    duration INTEGER NOT NULL DEFAULT 0, -- in minutes
+    score_sum DECIMAL(12,2) NOT NULL DEFAULT 0,
+    scored_sessions INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT timezone('utc'::text, now()) NOT NULL,
+    PRIMARY KEY (user_id, day, subject)
+);
+
 -- Enable Row Level Security on all tables
 ALTER TABLE public.profiles ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.quizzes ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.quiz_questions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.quiz_attempts ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.flashcards ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.flashcard_reviews ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.study_guides ENABLE ROW LEVEL SECURITY;
 ALTER TABLE public.study_sessions ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.study_daily_rollups ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.user_mastery ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.live_answers ENABLE ROW LEVEL SECURITY;
 
 -- Create policies for profiles
 CREATE POLICY "Users can view own profile" ON public.profiles
@@ -123,6 +189,23 @@ CREATE POLICY "Users can update own quizzes" ON public.quizzes
 CREATE POLICY "Users can delete own quizzes" ON public.quizzes
     FOR DELETE USING (auth.uid() = user_id);
 
+-- Create policies for quiz_questions
+CREATE POLICY "Users can view own quiz questions" ON public.quiz_questions
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can create quiz questions" ON public.quiz_questions
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+-- Create policies for user_mastery
+CREATE POLICY "Users can view own mastery" ON public.user_mastery
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can create own mastery" ON public.user_mastery
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update own mastery" ON public.user_mastery
+    FOR UPDATE USING (auth.uid() = user_id);
+
 -- Create policies for quiz_attempts
 CREATE POLICY "Users can view own quiz attempts" ON public.quiz_attempts
     FOR SELECT USING (auth.uid() = user_id);
@@ -130,6 +213,18 @@ CREATE POLICY "Users can view own quiz attempts" ON public.quiz_attempts
 CREATE POLICY "Users can create quiz attempts" ON public.quiz_attempts
     FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+-- Create policies for live_answers
+-- Live rooms write every player's answers and attempts in one batch, so the
+-- backend makes those writes with the service role key, which bypasses RLS
+CREATE POLICY "Users can view own live answers" ON public.live_answers
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can create own live answers" ON public.live_answers
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Quiz owners can view live answers" ON public.live_answers
+    FOR SELECT USING (auth.uid() = (SELECT user_id FROM public.quizzes WHERE id = quiz_id));
+
 -- Create policies for flashcards
 CREATE POLICY "Users can view own flashcards" ON public.flashcards
     FOR SELECT USING (auth.uid() = user_id);
@@ -170,6 +265,16 @@ CREATE POLICY "Users can view own study sessions" ON public.study_sessions
 CREATE POLICY "Users can create study sessions" ON public.study_sessions
     FOR INSERT WITH CHECK (auth.uid() = user_id);
 
+-- Create policies for study_daily_rollups
+CREATE POLICY "Users can view own study rollups" ON public.study_daily_rollups
+    FOR SELECT USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can create study rollups" ON public.study_daily_rollups
+    FOR INSERT WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update own study rollups" ON public.study_daily_rollups
+    FOR UPDATE USING (auth.uid() = user_id);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_quizzes_user_id ON public.quizzes(user_id);
 CREATE INDEX IF NOT EXISTS idx_quizzes_subject ON public.quizzes(subject);
@@ -179,6 +284,12 @@ CREATE INDEX IF NOT EXISTS idx_flashcards_user_id ON public.flashcards(user_id);
 CREATE INDEX IF NOT EXISTS idx_flashcards_subject ON public.flashcards(subject);
 CREATE INDEX IF NOT EXISTS idx_study_guides_user_id ON public.study_guides(user_id);
 CREATE INDEX IF NOT EXISTS idx_study_sessions_user_id ON public.study_sessions(user_id);
+-- Keyset pagination for history export: (user_id, completed_at, id)
+CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user_completed ON public.quiz_attempts(user_id, completed_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_user_completed ON public.study_sessions(user_id, completed_at, id);
+-- Keyset pagination for the bulk analytics export: (completed_at, id)
+CREATE INDEX IF NOT EXISTS idx_quiz_attempts_completed ON public.quiz_attempts(completed_at, id);
+CREATE INDEX IF NOT EXISTS idx_study_sessions_completed ON public.study_sessions(completed_at, id);
 
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -189,6 +300,21 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+-- Count one study session into its daily rollup in a single atomic statement
+CREATE OR REPLACE FUNCTION public.increment_study_rollup(
+    p_user_id UUID, p_day DATE, p_subject TEXT, p_duration INTEGER, p_score DECIMAL
+)
+RETURNS void AS $$
+    INSERT INTO public.study_daily_rollups (user_id, day, subject, sessions, duration, score_sum, scored_sessions)
+    VALUES (p_user_id, p_day, p_subject, 1, p_duration, COALESCE(p_score, 0), CASE WHEN p_score IS NULL THEN 0 ELSE 1 END)
+    ON CONFLICT (user_id, day, subject) DO UPDATE SET
+        sessions = study_daily_rollups.sessions + 1,
+        duration = study_daily_rollups.duration + EXCLUDED.duration,
+        score_sum = study_daily_rollups.score_sum + EXCLUDED.score_sum,
+        scored_sessions = study_daily_rollups.scored_sessions + EXCLUDED.scored_sessions,
+        updated_at = timezone('utc'::text, now());
+$$ LANGUAGE sql;
+
 -- Create triggers for updated_at
 CREATE TRIGGER update_profiles_updated_at BEFORE UPDATE ON public.profiles
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
@@ -200,4 +326,21 @@ CREATE TRIGGER update_flashcards_updated_at BEFORE UPDATE ON public.flashcards
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
 CREATE TRIGGER update_study_guides_updated_at BEFORE UPDATE ON public.study_guides
-    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
\ No newline at end of file
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Split questions of quizzes created before quiz_questions existed into rows
+INSERT INTO public.quiz_questions (id, quiz_id, user_id, position, question, options, correct_answer, explanation, difficulty, question_type)
+SELECT
+    COALESCE(e.value->>'id', gen_random_uuid()::text),
+    q.id,
+    q.user_id,
+    e.position,
+    e.value->>'question',
+    e.value->'options',
+    e.value->>'correct_answer',
+    e.value->>'explanation',
+    COALESCE(e.value->>'difficulty', q.difficulty),
+    COALESCE(e.value->>'question_type', q.quiz_type)
+FROM public.quizzes q
+CROSS JOIN LATERAL jsonb_array_elements(q.questions) WITH ORDINALITY AS e(value, position)
+ON CONFLICT DO NOTHING;
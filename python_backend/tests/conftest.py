@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the backend the way main.py does, with python_backend on the path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
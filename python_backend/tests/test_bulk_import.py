@@ -0,0 +1,40 @@
+import asyncio
+
+from postgrest.exceptions import APIError
+from pydantic import BaseModel
+
+from services.bulk_import import insert_in_batches
+
+class Row(BaseModel):
+    value: int
+
+def make_insert(fail):
+    calls = []
+
+    async def insert_batch(items):
+        calls.append([item.value for item in items])
+        return fail(items) or [f"id-{item.value}" for item in items]
+
+    return insert_batch, calls
+
+def test_rejected_batch_is_retried_row_by_row():
+    def fail(items):
+        if any(item.value == 2 for item in items):
+            raise APIError({"message": "violates check constraint", "code": "23514"})
+
+    insert_batch, calls = make_insert(fail)
+    result = asyncio.run(insert_in_batches([Row(value=i) for i in range(1, 4)], insert_batch))
+    assert calls == [[1, 2, 3], [1], [2], [3]]
+    assert result["ids"] == ["id-1", "id-3"]
+    assert [error["row"] for error in result["errors"]] == [2]
+
+def test_batch_with_unknown_outcome_is_not_inserted_again():
+    def fail(items):
+        raise TimeoutError("read timed out")
+
+    insert_batch, calls = make_insert(fail)
+    result = asyncio.run(insert_in_batches([Row(value=i) for i in range(1, 4)], insert_batch))
+    assert calls == [[1, 2, 3]]
+    assert result["created"] == 0
+    assert [error["row"] for error in result["errors"]] == [1, 2, 3]
+    assert "outcome unknown" in result["errors"][0]["errors"][0]
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, LastGood, openai_breaker, serve_stale
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def ok():
+    return "ok"
+
+async def boom():
+    raise ConnectionError("down")
+
+def call(breaker, fn):
+    try:
+        return run(breaker.call(fn))
+    except (ConnectionError, CircuitOpenError) as exc:
+        return exc
+
+def test_opens_after_failure_share_and_rejects_without_calling():
+    breaker = CircuitBreaker("test", failure_threshold=0.5, min_calls=4, open_seconds=60)
+    for fn in (ok, boom, ok, boom):
+        call(breaker, fn)
+    assert breaker.state == OPEN
+    rejected = call(breaker, ok)
+    assert isinstance(rejected, CircuitOpenError)
+    assert rejected.status_code == 503 and "Retry-After" in rejected.headers
+    assert breaker.stats["rejected"] == 1
+
+def test_half_open_probe_closes_or_reopens():
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=0)
+    call(breaker, boom)
+    assert breaker.snapshot()["state"] == HALF_OPEN
+    call(breaker, boom)
+    assert breaker.state == OPEN
+    assert call(breaker, ok) == "ok"
+    assert breaker.state == CLOSED
+
+def test_errors_the_upstream_answered_do_not_count():
+    breaker = CircuitBreaker("test", min_calls=1, is_failure=lambda exc: not isinstance(exc, ValueError))
+
+    async def rejected():
+        raise ValueError("bad request")
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            run(breaker.call(rejected))
+    assert breaker.state == CLOSED
+
+def test_slow_calls_count_as_failures():
+    breaker = CircuitBreaker("test", min_calls=2, slow_call_seconds=0.001)
+
+    async def slow():
+        await asyncio.sleep(0.01)
+
+    call(breaker, slow)
+    call(breaker, slow)
+    assert breaker.state == OPEN
+    assert breaker.stats["slow_calls"] == 2
+
+def test_openai_breakers_are_per_task(monkeypatch):
+    monkeypatch.setenv("AI_TEST_TASK_BREAKER_SLOW_CALL_SECONDS", "7")
+    quiz = openai_breaker("quiz_generation")
+    assert openai_breaker("quiz_generation") is quiz
+    assert openai_breaker("motivation") is not quiz
+    assert openai_breaker("motivation").slow_call_seconds < quiz.slow_call_seconds
+    assert openai_breaker("test_task").slow_call_seconds == 7
+
+def test_last_good_is_bounded_by_bytes():
+    store = LastGood(1000)
+    store.put("small", "x" * 50)
+    store.put("huge", "x" * 500)
+    assert store.get("huge") is LastGood._MISSING
+    for i in range(20):
+        store.put(i, "y" * 100)
+    assert store.stats()["bytes"] <= 1000
+    assert store.get("small") is LastGood._MISSING
+    assert store.get(19) == "y" * 100
+
+def test_serve_stale_answers_from_last_good_only_while_open():
+    store = LastGood(10_000)
+    breaker = CircuitBreaker("test", min_calls=1, open_seconds=60)
+
+    class Repository:
+        @serve_stale(store, key=lambda user_id: user_id)
+        async def rows(self, user_id):
+            return await breaker.call(ok)
+
+    repo = Repository()
+    assert run(repo.rows("u1")) == "ok"
+    call(breaker, boom)
+    assert run(repo.rows("u1")) == "ok"
+    assert store.served == 1
+    with pytest.raises(CircuitOpenError):
+        run(repo.rows("u2"))
+
+def test_list_results_are_sized_from_a_sample(monkeypatch):
+    from services import circuit_breaker
+    dumped = []
+    real_dump = circuit_breaker.dump_json
+    monkeypatch.setattr(circuit_breaker, "dump_json", lambda value: dumped.append(value) or real_dump(value))
+    rows = [{"id": i, "front": "x" * 20} for i in range(1000)]
+    size = LastGood.estimate_size(rows)
+    assert len(dumped[0]) == LastGood.SIZE_SAMPLES
+    assert abs(size - len(real_dump(rows))) < len(real_dump(rows)) * 0.1
@@ -0,0 +1,22 @@
+from services.collection_versions import QUIZZES, CollectionVersions
+from services.shared_cache import SqliteBackend
+
+def test_write_in_one_worker_changes_every_workers_etag(tmp_path):
+    path = str(tmp_path / "cache.db")
+    worker_a = CollectionVersions(SqliteBackend(path, 10_000))
+    worker_b = CollectionVersions(SqliteBackend(path, 10_000))
+    issued = worker_a.etag("u1", QUIZZES)
+    assert issued == worker_b.etag("u1", QUIZZES)
+    worker_b.bump("u1", QUIZZES)
+    assert worker_a.etag("u1", QUIZZES) != issued
+    assert worker_a.etag("u1", QUIZZES, "quiz-1") != worker_a.etag("u1", QUIZZES)
+
+def test_recreated_store_never_repeats_a_tag(tmp_path):
+    first = CollectionVersions(SqliteBackend(str(tmp_path / "a.db"), 10_000))
+    second = CollectionVersions(SqliteBackend(str(tmp_path / "b.db"), 10_000))
+    assert first.etag("u1", QUIZZES) != second.etag("u1", QUIZZES)
+
+def test_no_etag_while_versions_are_unavailable(tmp_path):
+    versions = CollectionVersions(SqliteBackend(str(tmp_path / "missing" / "cache.db"), 10_000))
+    assert versions.get("u1", QUIZZES) is None
+    assert versions.etag("u1", QUIZZES) is None
@@ -0,0 +1,157 @@
+import asyncio
+
+import orjson
+import pytest
+
+from services import live_rooms as live_rooms_module
+from services.answer_keys import AnswerKey
+from services.live_rooms import FINISHED, MAX_ANSWER_CHARS, LiveRoomRegistry
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = None
+
+    async def send_text(self, message):
+        self.sent.append(orjson.loads(message))
+
+    async def close(self, code=1000):
+        self.closed = code
+
+    def of_type(self, kind):
+        return [message for message in self.sent if message["type"] == kind]
+
+class FakeDatabase:
+    def __init__(self):
+        self.answers = []
+        self.attempts = []
+        self.outcomes = {}
+
+    async def save_live_answers(self, rows):
+        self.answers.append(rows)
+
+    async def record_live_attempts(self, rows, outcomes):
+        self.attempts.extend(rows)
+        self.outcomes.update(outcomes)
+        return [str(i) for i in range(len(rows))]
+
+def make_room(registry, db, count=3):
+    key = AnswerKey.from_rows("quiz-1", "host", [
+        {"id": f"q{i}", "position": i, "correct_answer": "B", "question_type": "multiple_choice", "difficulty": "easy"}
+        for i in range(1, count + 1)
+    ], "biology")
+    questions = [{"id": f"q{i}", "position": i, "question": f"Q{i}?", "options": ["A", "B"]} for i in range(1, count + 1)]
+    return registry.create("quiz-1", "host", key, questions, 30, db)
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = LiveRoomRegistry()
+    monkeypatch.setattr(live_rooms_module, "live_rooms", registry)
+    return registry
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_game_writes_one_batch_per_question_and_one_for_attempts(registry):
+    async def game():
+        db = FakeDatabase()
+        room = make_room(registry, db)
+        host, alice, bob = FakeSocket(), FakeSocket(), FakeSocket()
+        room.join("host", "Host", host)
+        room.join("alice", "Alice", alice)
+        room.join("bob", "Bob", bob)
+        for _ in range(3):
+            room.handle("host", {"type": "next"})
+            room.handle("alice", {"type": "answer", "answer": "B"})
+            room.handle("bob", {"type": "answer", "answer": "A"})
+        room.handle("host", {"type": "next"})
+        await registry.flush()
+        await asyncio.sleep(0)
+        return room, db, alice
+
+    room, db, alice = run(game())
+    assert room.state == FINISHED
+    assert len(db.answers) == 3 and all(len(batch) == 2 for batch in db.answers)
+    scores = {row["user_id"]: row["score"] for row in db.attempts}
+    assert scores == {"alice": 100.0, "bob": 0.0}
+    assert [outcome.outcome for outcome in db.outcomes["alice"]] == [1.0, 1.0, 1.0]
+    assert db.outcomes["bob"][0].subject == "biology"
+    assert alice.of_type("finished")[0]["scoreboard"][0]["name"] == "Alice"
+
+def test_shutdown_finishes_games_in_progress(registry):
+    async def game():
+        db = FakeDatabase()
+        room = make_room(registry, db)
+        room.join("host", "Host", FakeSocket())
+        room.join("alice", "Alice", FakeSocket())
+        room.handle("host", {"type": "start"})
+        room.handle("alice", {"type": "answer", "answer": "B"})
+        room.handle("host", {"type": "next"})
+        await registry.shutdown()
+        return room, db
+
+    room, db = run(game())
+    assert room.state == FINISHED
+    # Only the two questions asked count; the unanswered one scores zero
+    assert len(db.attempts) == 1
+    assert db.attempts[0]["total_questions"] == 2
+    assert db.attempts[0]["score"] == 50.0
+
+def test_idle_rooms_are_finished_before_they_are_discarded(registry, monkeypatch):
+    async def game():
+        db = FakeDatabase()
+        room = make_room(registry, db)
+        connection = room.join("alice", "Alice", FakeSocket())
+        room.handle("host", {"type": "start"})
+        room.handle("alice", {"type": "answer", "answer": "B"})
+        room.leave("alice", connection)
+        monkeypatch.setattr(live_rooms_module, "IDLE_SECONDS", -1)
+        make_room(registry, FakeDatabase())
+        await registry.flush()
+        return room, db
+
+    room, db = run(game())
+    assert room.code not in registry.rooms
+    assert [row["user_id"] for row in db.attempts] == ["alice"]
+
+def test_game_that_never_started_saves_no_attempts(registry):
+    async def game():
+        db = FakeDatabase()
+        room = make_room(registry, db)
+        room.join("host", "Host", FakeSocket())
+        room.join("alice", "Alice", FakeSocket())
+        room.handle("host", {"type": "end"})
+        await registry.flush()
+        return db
+
+    assert run(game()).attempts == []
+
+def test_oversized_and_non_text_answers_are_rejected(registry):
+    async def game():
+        db = FakeDatabase()
+        room = make_room(registry, db)
+        alice = FakeSocket()
+        room.join("host", "Host", FakeSocket())
+        room.join("alice", "Alice", alice)
+        room.handle("host", {"type": "start"})
+        room.handle("alice", {"type": "answer", "answer": "B" * (MAX_ANSWER_CHARS + 1)})
+        room.handle("alice", {"type": "answer", "answer": {"nested": "B"}})
+        await asyncio.sleep(0)
+        return room, alice
+
+    room, alice = run(game())
+    assert room.players["alice"].answers == {}
+    assert len(alice.of_type("error")) == 2
+
+def test_only_the_host_controls_the_room(registry):
+    async def game():
+        room = make_room(registry, FakeDatabase())
+        alice = FakeSocket()
+        room.join("alice", "Alice", alice)
+        room.handle("alice", {"type": "start"})
+        await asyncio.sleep(0)
+        return room, alice
+
+    room, alice = run(game())
+    assert room.position == 0
+    assert alice.of_type("error")
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import database as database_module
+from database import SupabaseDatabase
+from services import mastery as mastery_module
+from services.collection_versions import CollectionVersions
+from services.mastery import MasteryCache, MasteryModel, Outcome, flashcard_item, question_item, rating_outcome
+from services.shared_cache import SqliteBackend
+
+def test_answers_move_skill_and_difficulty_in_opposite_directions():
+    model = MasteryModel("u1")
+    item = question_item("quiz-1", "q1")
+    model.update([Outcome(item, "biology", 1.0, "medium")], at=0)
+    assert model.skill[0] > 0 and model.difficulty[0] < 0
+    model.update([Outcome(item, "biology", 0.0)] * 3, at=0)
+    assert model.skill[0] < 0
+
+def test_recommend_ranks_weakest_first():
+    model = MasteryModel("u1")
+    model.update([Outcome(question_item("q", "easy"), "biology", 1.0, "easy")] * 3, at=0)
+    model.update([Outcome(question_item("q", "hard"), "chemistry", 0.0, "hard")] * 3, at=0)
+    model.update([Outcome(flashcard_item("c1"), "biology", rating_outcome(5))], at=0)
+    plan = model.recommend(limit=5, now=0)
+    assert [s["subject"] for s in plan["subjects"]] == ["chemistry", "biology"]
+    assert plan["questions"][0]["question_id"] == "hard"
+    assert plan["flashcards"][0]["flashcard_id"] == "c1"
+    # A card's predicted recall decays until it is reviewed again
+    later = model.recommend(limit=5, now=30 * 86400)
+    assert later["flashcards"][0]["recall_probability"] < plan["flashcards"][0]["recall_probability"]
+
+def test_state_round_trip_and_copy_are_independent():
+    model = MasteryModel("u1", version=3)
+    model.update([Outcome(flashcard_item("c1"), "biology", 1.0)], at=10)
+    restored = MasteryModel.from_state("u1", model.to_state(), 3)
+    assert restored.to_state() == model.to_state() and restored.version == 3
+    copy = model.copy()
+    copy.update([Outcome(flashcard_item("c2"), "chemistry", 0.0)], at=20)
+    assert len(model) == 1 and len(copy) == 2
+
+def test_items_are_bounded_by_forgetting_the_oldest(monkeypatch):
+    monkeypatch.setattr(mastery_module, "MAX_ITEMS", 10)
+    model = MasteryModel("u1")
+    for i in range(25):
+        model.update([Outcome(flashcard_item(f"c{i}"), "biology", 1.0)], at=i)
+    assert len(model) <= 10
+    assert model.knows(flashcard_item("c24"))
+    assert not model.knows(flashcard_item("c0"))
+    assert model.subject_of(flashcard_item("c24")) == "biology"
+
+def test_cache_only_returns_models_read_at_the_current_generation():
+    cache = MasteryCache(max_models=1)
+    model = MasteryModel("u1")
+    cache.put(model, 4)
+    assert cache.get("u1", 4) is model
+    assert cache.get("u1", 5) is None
+    assert cache.get("u1", None) is None
+    cache.put(MasteryModel("u2"), 1)
+    assert cache.get("u1", 4) is None
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.filters = []
+        self.op = "select"
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.filters.append((column, value))
+        return self
+
+    def update(self, row):
+        self.op, self.row = "update", row
+        return self
+
+    def upsert(self, row, on_conflict=None, ignore_duplicates=False):
+        self.op, self.row = "upsert", row
+        return self
+
+    def execute(self):
+        matched = [row for row in self.rows if all(row.get(k) == v for k, v in self.filters)]
+        if self.op == "update":
+            for row in matched:
+                row.update(self.row)
+            return FakeResult(matched)
+        if self.op == "upsert":
+            if any(row["user_id"] == self.row["user_id"] for row in self.rows):
+                return FakeResult([])
+            self.rows.append(dict(self.row))
+            return FakeResult([self.row])
+        return FakeResult([dict(row) for row in matched])
+
+class FakeClient:
+    def __init__(self):
+        self.rows = []
+
+    def table(self, name):
+        assert name == "user_mastery"
+        return FakeQuery(self.rows)
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_module, "collection_versions", CollectionVersions(SqliteBackend(str(tmp_path / "cache.db"), 10_000)))
+    monkeypatch.setattr(database_module, "mastery_models", MasteryCache())
+    return SupabaseDatabase(FakeClient())
+
+def test_save_conflict_reloads_and_reapplies(db):
+    card = flashcard_item("c1")
+    seed = MasteryModel("u1")
+    seed.update([Outcome(card, "biology", 1.0)], at=0)
+    assert asyncio.run(db.save_mastery(seed))
+    row = db.client.rows[0]
+    assert row["version"] == 1
+
+    # Another worker saves without this worker's copy noticing
+    other = MasteryModel.from_state("u1", row["state"], row["version"])
+    other.update([Outcome(flashcard_item("c2"), "biology", 0.0)], at=1)
+    row.update(state=other.to_state(), version=2)
+
+    asyncio.run(db.record_mastery("u1", [Outcome(flashcard_item("c3"), "chemistry", 1.0)]))
+    assert row["version"] == 3
+    assert row["state"]["items"] == [card, flashcard_item("c2"), flashcard_item("c3")]
+    assert row["state"]["skill_n"] == [2, 1]
+
+def test_stale_model_is_never_saved_over_a_newer_row(db):
+    model = MasteryModel("u1")
+    assert asyncio.run(db.save_mastery(model))
+    db.client.rows[0]["version"] = 5
+    assert not asyncio.run(db.save_mastery(model.copy()))
+    assert db.client.rows[0]["version"] == 5
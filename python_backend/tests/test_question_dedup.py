@@ -0,0 +1,40 @@
+from services.question_dedup import QuestionIndexRegistry, estimated_similarity, minhash
+
+def test_reworded_question_is_a_duplicate_and_a_new_one_is_not():
+    registry = QuestionIndexRegistry()
+    index = registry.build("u1", "biology", ["What organelle produces most of the cell's ATP?"], 1)
+    keep = registry.filter_new(index, [
+        "What organelle produces most of the cells ATP?",
+        "Which molecule carries amino acids to the ribosome?",
+    ])
+    assert keep == [1]
+
+def test_duplicates_within_one_batch_are_dropped():
+    registry = QuestionIndexRegistry()
+    index = registry.build("u1", "biology", [], 1)
+    question = "Name the process plants use to turn light into chemical energy."
+    assert registry.filter_new(index, [question, question.upper(), "What is osmosis?"]) == [0, 2]
+
+def test_indexes_are_per_user_and_subject():
+    registry = QuestionIndexRegistry()
+    registry.build("u1", "biology", ["What is osmosis?"], 1)
+    assert registry.get("u1", "chemistry", 1) is None
+    assert registry.get("u2", "biology", 1) is None
+    registry.add_questions("u1", "biology", ["What is diffusion?"], 2)
+    assert len(registry.get("u1", "biology", 2)) == 2
+
+def test_index_is_dropped_once_another_worker_saves_quizzes():
+    registry = QuestionIndexRegistry()
+    registry.build("u1", "biology", ["What is osmosis?"], 3)
+    assert registry.get("u1", "biology", 3) is not None
+    # Another worker saved a quiz (generation 4); this one's save lands at 5
+    assert registry.get("u1", "biology", 4) is None
+    registry.add_questions("u1", "biology", ["What is diffusion?"], 5)
+    assert registry.get("u1", "biology", 5) is None
+    # Without a readable generation nothing is cached
+    registry.build("u1", "biology", [], None)
+    assert registry.get("u1", "biology", None) is None
+
+def test_signatures_are_deterministic():
+    assert minhash("What is osmosis?") == minhash("what is OSMOSIS")
+    assert estimated_similarity(minhash("What is osmosis?"), minhash("Describe the Krebs cycle.")) < 0.3
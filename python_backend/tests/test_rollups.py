@@ -0,0 +1,30 @@
+from datetime import date
+
+from services.rollups import DayTotals, activity_series
+
+def test_day_totals_only_average_scored_sessions():
+    totals = DayTotals()
+    totals.add(30, 80)
+    totals.add(15, None)
+    totals.add(None, 90.5)
+    row = totals.to_row("u1", date(2025, 3, 1), "biology")
+    assert row == {
+        "user_id": "u1", "day": "2025-03-01", "subject": "biology",
+        "sessions": 3, "duration": 45, "score_sum": 170.5, "scored_sessions": 2
+    }
+
+def test_activity_series_fills_empty_days_and_merges_subjects():
+    rows = [
+        {"day": "2025-03-01", "subject": "biology", "sessions": 2, "duration": 40, "score_sum": 150, "scored_sessions": 2},
+        {"day": "2025-03-01T00:00:00", "subject": "chemistry", "sessions": 1, "duration": 20, "score_sum": 60, "scored_sessions": 1},
+        {"day": "2025-03-03", "subject": "biology", "sessions": 1, "duration": 10, "score_sum": None, "scored_sessions": 0},
+        {"day": "2025-02-01", "subject": "biology", "sessions": 9, "duration": 99, "score_sum": 0, "scored_sessions": 0},
+    ]
+    series = activity_series(rows, date(2025, 3, 1), date(2025, 3, 3))
+    assert [day["date"] for day in series] == ["2025-03-01", "2025-03-02", "2025-03-03"]
+    first, empty, last = series
+    assert (first["sessions"], first["minutes"], first["average_score"]) == (3, 60, 70.0)
+    assert first["subjects"] == {"biology": 40, "chemistry": 20}
+    assert (empty["sessions"], empty["average_score"], empty["subjects"]) == (0, None, {})
+    assert (last["minutes"], last["average_score"]) == (10, None)
+    assert "_score_sum" not in first
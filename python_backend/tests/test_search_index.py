@@ -0,0 +1,67 @@
+import sqlite3
+from types import SimpleNamespace
+
+from services.search_index import FLASHCARD, QUESTION, STUDY_GUIDE, SearchIndex
+
+def make_index(tmp_path):
+    return SearchIndex(str(tmp_path / "search.db"))
+
+def test_title_matches_rank_above_body_matches(tmp_path):
+    index = make_index(tmp_path)
+    index.index_study_guide("u1", "g1", "Photosynthesis", "Plants convert light into sugar.", [])
+    index.index_study_guide("u1", "g2", "Cell biology", "Chloroplasts carry out photosynthesis in plant cells.", [])
+    results = index.search("u1", "photosynthesis")
+    assert [r["id"] for r in results] == ["g1", "g2"]
+    assert results[0]["score"] > results[1]["score"]
+
+def test_users_only_see_their_own_documents(tmp_path):
+    index = make_index(tmp_path)
+    index.index_flashcard("u1", "c1", "Mitochondria", "Powerhouse of the cell", ["biology"])
+    assert index.search("u2", "mitochondria") == []
+    assert [r["type"] for r in index.search("u1", "mitochondria")] == [FLASHCARD]
+
+def test_type_filter_removal_and_question_positions(tmp_path):
+    index = make_index(tmp_path)
+    index.index_flashcard("u1", "c1", "Osmosis", "Water across a membrane", [])
+    index.index_quiz("u1", "q1", ["What is diffusion?", "What drives osmosis?"])
+    results = index.search("u1", "osmosis", doc_types=[QUESTION])
+    assert [(r["id"], r["question_index"]) for r in results] == [("q1", 2)]
+    index.remove_flashcard("u1", "c1")
+    assert [r["type"] for r in index.search("u1", "osmosis")] == [QUESTION]
+
+def test_rebuild_replaces_a_users_documents(tmp_path):
+    index = make_index(tmp_path)
+    index.index_flashcard("u1", "old", "Stale card", "gone", [])
+    guide = SimpleNamespace(id="g1", title="Genetics", content="DNA and genes", key_topics=["heredity"])
+    assert not index.is_indexed("u1")
+    index.rebuild_user("u1", [guide], [], [])
+    assert index.is_indexed("u1")
+    assert index.search("u1", "stale") == []
+    assert [r["type"] for r in index.search("u1", "heredity")] == [STUDY_GUIDE]
+
+def test_stopword_only_query_finds_nothing(tmp_path):
+    index = make_index(tmp_path)
+    index.index_flashcard("u1", "c1", "The cell", "is what it is", [])
+    assert index.search("u1", "the is what") == []
+
+def test_failed_update_never_raises_and_forces_a_rebuild(tmp_path, monkeypatch):
+    index = make_index(tmp_path)
+    index.rebuild_user("u1", [], [], [])
+    assert index.is_indexed("u1")
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(index, "_write", locked)
+    index.index_flashcard("u1", "c1", "Osmosis", "Water across a membrane", [])
+    assert not index.is_indexed("u1")
+    monkeypatch.undo()
+    index.rebuild_user("u1", [], [SimpleNamespace(id="c1", front="Osmosis", back="Water", tags=[])], [])
+    assert index.is_indexed("u1")
+    assert [r["id"] for r in index.search("u1", "osmosis")] == ["c1"]
+
+def test_unusable_index_file_does_not_fail_writes(tmp_path):
+    index = SearchIndex(str(tmp_path / "missing" / "search.db"))
+    index.index_study_guide("u1", "g1", "Genetics", "DNA", [])
+    index.remove_flashcard("u1", "c1")
+    assert not index.is_indexed("u1")
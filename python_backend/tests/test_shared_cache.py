@@ -0,0 +1,120 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from services import shared_cache as shared_cache_module
+from services.shared_cache import CacheBackend, MemoryBackend, SqliteBackend, TieredCache, cache_key
+
+def test_cache_key_is_stable_across_processes():
+    key = cache_key("ai", {"b": 1, "a": [1, 2]})
+    assert key == cache_key("ai", {"a": [1, 2], "b": 1})
+    assert key.startswith("ai:")
+    other = subprocess.run(
+        [sys.executable, "-c", "from services.shared_cache import cache_key; print(cache_key('ai', {'a': [1, 2], 'b': 1}))"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(shared_cache_module.__file__)), check=True
+    )
+    assert other.stdout.strip() == key
+
+def test_memory_backend_evicts_least_recent_by_bytes():
+    cache = MemoryBackend(1000)
+    for i in range(3):
+        cache.set(f"k{i}", b"x" * 300, 60)
+    cache.get("k0")
+    cache.set("k3", b"x" * 300, 60)
+    assert cache.get("k1") is None
+    assert cache.get("k0") is not None
+    assert cache.stats()["bytes"] == 900
+
+def test_memory_backend_ttl():
+    cache = MemoryBackend(1000)
+    cache.set("short", b"v", 0.05)
+    assert cache.get("short") == b"v"
+    time.sleep(0.1)
+    assert cache.get("short") is None
+
+def test_sqlite_values_and_generations_are_shared(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first, second = SqliteBackend(path, 10_000), SqliteBackend(path, 10_000)
+    first.set("k", b"value", 60)
+    assert second.get("k") == b"value"
+    assert second.generation("quizzes:u1") == 0
+    assert first.bump("quizzes:u1") == 1
+    assert second.generation("quizzes:u1") == 1
+
+def test_sqlite_sweep_evicts_oldest_read_until_under_budget(tmp_path):
+    cache = SqliteBackend(str(tmp_path / "cache.db"), 2000)
+    for i in range(10):
+        cache.set(f"k{i}", b"x" * 400, 60)
+        with cache.conn:
+            cache.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (i, f"k{i}"))
+    cache.sweep()
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000
+    assert cache.get("k0") is None
+    assert cache.get("k9") is not None
+
+def test_sqlite_expired_entries_are_misses(tmp_path):
+    cache = SqliteBackend(str(tmp_path / "cache.db"), 10_000)
+    cache.set("k", b"v", 0.05)
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+def test_locked_file_fails_fast_without_raising(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache_module, "BUSY_TIMEOUT", 0.05)
+    path = str(tmp_path / "cache.db")
+    cache = SqliteBackend(path, 10_000)
+    cache.set("k", b"v", 60)
+    holder = sqlite3.connect(path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        assert cache.bump("quizzes:u1") is None
+        cache.set("other", b"v", 60)
+        assert time.perf_counter() - started < 1
+        # WAL readers aren't blocked by the writer
+        assert cache.get("k") == b"v"
+        assert cache.generation("quizzes:u1") == 0
+        assert cache.stats()["failed_bumps"] == 1
+    finally:
+        holder.execute("ROLLBACK")
+        holder.close()
+
+def test_unusable_file_is_a_miss_and_generation_is_unknown(tmp_path):
+    cache = SqliteBackend(str(tmp_path / "missing" / "cache.db"), 10_000)
+    cache.set("k", b"v", 60)
+    assert cache.get("k") is None
+    assert cache.generation("quizzes:u1") is None
+    assert cache.bump("quizzes:u1") is None
+
+def test_tiered_cache_reads_through_and_shares_generations(tmp_path):
+    shared = SqliteBackend(str(tmp_path / "cache.db"), 10_000)
+    writer = TieredCache(MemoryBackend(1000), shared)
+    reader = TieredCache(MemoryBackend(1000), SqliteBackend(shared.path, 10_000))
+    writer.set_json("k", {"a": 1}, 60)
+    assert reader.get_json("k") == {"a": 1}
+    assert reader.local.get("k") is not None
+    writer.bump("g")
+    assert reader.generation("g") == 1
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+
+def test_periodic_sweep_runs_off_the_calling_thread(tmp_path, monkeypatch):
+    monkeypatch.setattr(shared_cache_module, "SWEEP_EVERY", 2)
+    cache = SqliteBackend(str(tmp_path / "cache.db"), 10_000)
+    threads = []
+    real_sweep = cache._sweep
+    monkeypatch.setattr(cache, "_sweep", lambda conn, now: threads.append(threading.current_thread()) or real_sweep(conn, now))
+    cache.set("a", b"1", 60)
+    cache.set("b", b"2", 60)
+    for _ in range(100):
+        if threads and not cache._sweeping:
+            break
+        time.sleep(0.01)
+    assert threads and threads[0] is not threading.current_thread()
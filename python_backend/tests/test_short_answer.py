@@ -0,0 +1,51 @@
+import pytest
+
+from services.short_answer import AnswerProfile, grade_batch, profile, similarity
+
+def credit(expected: str, given: str) -> float:
+    return grade_batch([(profile(expected), given)])[0]
+
+@pytest.mark.parametrize("expected, given", [
+    ("hypothyroidism", "hyperthyroidism"),
+    ("hyperparathyroidism", "hypoparathyroidism"),
+    ("endothermic", "exothermic"),
+    ("Anaphase", "Metaphase"),
+    ("intracellular", "intercellular"),
+    ("increase", "decrease"),
+    ("ionic bond", "covalent bond"),
+    ("covalent bond", "ionic bond"),
+])
+def test_near_miss_opposites_get_no_credit(expected, given):
+    assert credit(expected, given) == 0.0
+
+@pytest.mark.parametrize("expected, given", [
+    ("Photosynthesis", "photosynthesis"),
+    ("Photosynthesis", "the photosynthesis."),
+    ("photosynthesis", "photosynthesys"),
+    ("mitochondria", "mitocondria"),
+    ("Paris", "It is Paris"),
+])
+def test_same_answer_and_typos_get_full_credit(expected, given):
+    assert credit(expected, given) == 1.0
+
+def test_extra_or_missing_words_get_partial_credit():
+    assert 0.5 <= credit("mitochondria", "mitochondria of the cell") < 1.0
+    assert 0.5 <= credit("George Washington", "Washington") < 1.0
+
+def test_short_words_need_exact_spelling():
+    assert credit("acid", "acd") == 0.0
+
+def test_numbers_and_negations_must_agree():
+    assert credit("1945", "1946") == 0.0
+    assert credit("it is not soluble", "it is soluble") == 0.0
+    assert credit("not soluble", "not soluble") == 1.0
+
+def test_empty_answers():
+    assert similarity(profile(""), profile("")) == 1.0
+    assert credit("Paris", "") == 0.0
+
+def test_profile_round_trips_and_reads_old_rows():
+    stored = profile("The Treaty of Versailles")
+    assert AnswerProfile.from_json(stored.to_json()) == stored
+    legacy = {**stored.to_json(), "ngrams": {" tr": 1}}
+    assert AnswerProfile.from_json(legacy) == stored
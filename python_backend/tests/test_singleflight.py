@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from services.singleflight import SingleFlight, coalesce
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"rows": [1, 2]}
+
+        results = await asyncio.gather(*[flight.do("k", fetch) for _ in range(5)])
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+        assert flight.coalesced == 4
+        assert len(flight) == 0
+        # Nothing is cached once the call is done
+        await flight.do("k", fetch)
+        assert len(calls) == 2
+    run(scenario())
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("down")
+
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+    run(scenario())
+
+def test_one_cancelled_waiter_does_not_cancel_the_call():
+    async def scenario():
+        flight = SingleFlight()
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+    run(scenario())
+
+def test_coalesce_keys_on_arguments():
+    class Repository:
+        def __init__(self):
+            self.calls = []
+
+        @coalesce(SingleFlight(), key=lambda user_id: user_id)
+        async def load(self, user_id):
+            self.calls.append(user_id)
+            await asyncio.sleep(0.01)
+            return user_id
+
+    async def scenario():
+        repo = Repository()
+        await asyncio.gather(repo.load("a"), repo.load("a"), repo.load("b"))
+        assert sorted(repo.calls) == ["a", "b"]
+    run(scenario())
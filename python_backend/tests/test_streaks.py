@@ -0,0 +1,36 @@
+from datetime import date, datetime, timezone
+
+from services.streaks import StreakState, advance, current_streak, local_day
+
+def test_consecutive_days_extend_and_a_gap_restarts():
+    state = StreakState(None, 0, 0)
+    for day in (date(2025, 3, 1), date(2025, 3, 2), date(2025, 3, 3)):
+        state = advance(state, day)
+    assert state == StreakState(date(2025, 3, 3), 3, 3)
+    state = advance(state, date(2025, 3, 5))
+    assert state == StreakState(date(2025, 3, 5), 1, 3)
+
+def test_same_day_and_late_activity_change_nothing():
+    state = StreakState(date(2025, 3, 3), 2, 5)
+    assert advance(state, date(2025, 3, 3)) is state
+    assert advance(state, date(2025, 3, 1)) is state
+
+def test_local_day_uses_the_users_timezone():
+    moment = datetime(2025, 3, 2, 2, 30, tzinfo=timezone.utc)
+    assert local_day(moment, "America/New_York") == date(2025, 3, 1)
+    assert local_day(moment, "Not/AZone") == date(2025, 3, 2)
+    assert local_day(moment.replace(tzinfo=None), None) == date(2025, 3, 2)
+
+def test_current_streak_lapses_after_a_missed_day():
+    row = {"streak_last_day": "2025-03-01", "study_streak": 4, "longest_streak": 4}
+
+    class Profile(dict):
+        timezone = None
+
+    assert current_streak(Profile(row), datetime(2025, 3, 2, 12, tzinfo=timezone.utc)) == 4
+    assert current_streak(Profile(row), datetime(2025, 3, 3, 12, tzinfo=timezone.utc)) == 0
+
+def test_state_round_trips_through_a_profile_row():
+    state = StreakState(date(2025, 3, 3), 2, 5)
+    assert StreakState.from_row(state.to_row()) == state
+    assert StreakState.from_row({}) == StreakState(None, 0, 0)
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+from services import text_compaction
+from services.text_compaction import PAGE_BREAK, compact_text, count_tokens, fit_to_budget, prepare_content
+
+def test_encoding_is_not_loaded_at_import():
+    probe = (
+        "from services import text_compaction; "
+        "print(text_compaction._encoding.cache_info().currsize)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(text_compaction.__file__)), check=True
+    )
+    assert result.stdout.strip() == "0"
+
+def test_count_tokens_is_positive_and_grows_with_text():
+    assert count_tokens("") >= 0
+    assert count_tokens("one two three four five six") < count_tokens("one two three four five six " * 10)
+
+def test_compact_text_drops_repeated_headers_and_page_numbers():
+    topics = ["Mitosis splits a cell in two.", "Meiosis makes gametes.", "DNA replicates first.", "Chromosomes condense."]
+    pages = [f"Biology 101 Lecture Notes\n{topic}\nPage {n} of 4" for n, topic in enumerate(topics, start=1)]
+    text = compact_text(PAGE_BREAK.join(pages))
+    assert text == "\n\n".join(topics)
+
+def test_compact_text_rejoins_hyphenation_and_unwraps_lines():
+    text = compact_text("The mito-\nchondria produce energy for the cell through a process\ncalled respiration.")
+    assert text == "The mitochondria produce energy for the cell through a process called respiration."
+
+def test_text_that_fits_is_unchanged():
+    text = "Short paragraph about osmosis."
+    assert fit_to_budget(text, 100) == text
+    assert prepare_content(text, 100) == text
+
+def test_fit_to_budget_keeps_distinct_content_in_order():
+    paragraphs = [
+        "Photosynthesis converts light into chemical energy in chloroplasts.",
+        "Photosynthesis converts light into chemical energy in chloroplasts.",
+        "Respiration releases energy from glucose in mitochondria.",
+        "Transcription copies DNA into messenger RNA in the nucleus.",
+    ]
+    text = "\n\n".join(paragraphs)
+    packed = fit_to_budget(text, count_tokens(text) - count_tokens(paragraphs[0]))
+    assert packed.count("Photosynthesis") == 1
+    assert packed.index("Respiration") < packed.index("Transcription")
+    assert count_tokens(packed) <= count_tokens(text) - count_tokens(paragraphs[0])
@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
 Run the Python FastAPI backend for AI Quiz & Study Assistant
+
+Set SERVER_MODE=production (or pass --production) for the multi-worker
+launcher; see python_backend/start_server.py for its settings.
 """
-import uvicorn
 import os
-from python_backend.main import app
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_backend"))
+
+from start_server import run
 
 if __name__ == "__main__":
     # Load environment variables
@@ -15,10 +21,4 @@ if __name__ == "__main__":
     print(f"Backend will be available at: http://{host}:{port}")
     print(f"API documentation will be available at: http://{host}:{port}/docs")
     
-    uvicorn.run(
-        app,
-        host=host,
-        port=port,
-        reload=True,  # Enable auto-reload during development
-        log_level="info"
-    )
\ No newline at end of file
+    run()